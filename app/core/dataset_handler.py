@@ -6,10 +6,14 @@ app_dir = os.path.dirname(os.path.realpath(__file__))
 project_dir = os.path.dirname(app_dir)
 sys.path.insert(0, project_dir)
 
+from functools import partial
+
+import pandas as pd
 import streamlit as st
 
 from app.core.system import AutoMLSystem
 from autoop.core.ml.dataset import Dataset
+from autoop.core.ml.dataset_format import convert_csv
 
 
 class DatasetHandler:
@@ -20,22 +24,32 @@ class DatasetHandler:
         self._automl = AutoMLSystem.get_instance()
 
     def upload_csv_file(self) -> None:
-        """Upload a file csv file and save it to the registry.
+        """Upload a file csv file and save it to the registry. The csv is
+        converted to the default (columnar) dataset format on upload, a block
+        of rows at a time.
         """
         csv_file = st.file_uploader(
             label="Click here to upload a file",
         )
 
         if csv_file is not None:
-            binary_data = csv_file.getvalue()
-
-            dataset = Dataset(
-                name=csv_file.name,
-                asset_path=f"datasets/{csv_file.name}",
-                data=binary_data,
-            )
-
-            self._automl.registry.register(dataset)
+            try:
+                dataset = self._automl.registry.register_stream(
+                    partial(convert_csv, csv_file),
+                    type="dataset",
+                    name=csv_file.name,
+                    asset_path=f"datasets/{csv_file.name}",
+                )
+            except ValueError:
+                # Blocks with differently typed columns do not stream, let
+                # pandas infer the types from the whole csv instead.
+                csv_file.seek(0)
+                dataset = Dataset.from_dataframe(
+                    pd.read_csv(csv_file),
+                    name=csv_file.name,
+                    asset_path=f"datasets/{csv_file.name}",
+                )
+                self._automl.registry.register(dataset)
             st.write(f"Registered csv file {dataset.name}!")
 
     def show_datasets(self) -> None:
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import logging
 import sys
+from typing import List
 
+import pandas as pd
 import streamlit as st
 
 from app.core.system import AutoMLSystem
@@ -14,7 +16,9 @@ from autoop.core.ml.metric import (
 )
 from autoop.core.ml.model import CLASSIFICATION_MODELS, REGRESSION_MODELS
 from autoop.core.ml.pipeline import Pipeline
-from autoop.functional.feature import detect_feature_types
+from autoop.core.ml.feature import Feature
+from autoop.functional.feature import infer_feature_types
+from autoop.functional.split import SPLIT_STRATEGIES
 
 logger = logging.getLogger()
 
@@ -33,6 +37,8 @@ class PipelineHandler:
         self._model = None
         self._model_name = None
         self._split = None
+        self._split_strategy = "sequential"
+        self._random_state = None
         self._metrics = None
         self._results = None
         self._pipeline_saved = False
@@ -81,10 +87,13 @@ class PipelineHandler:
         """Nicely write out the results."""
         # Obviously, get is way safer to acces session state items...
         if st.session_state.get("results available", None):
-            metrics = self._results["metrics"]
-            for metric, result in metrics:
-                st.write(f"{metric.to_string()}: {result}")
-        
+            for split, results in self._results["splits"].items():
+                st.write(f"Metrics on the {split} data:")
+                for metric, result in results["metrics"]:
+                    st.write(f"{metric.to_string()}: {result}")
+            for stage, seconds in self._results["timings"].items():
+                st.write(f"Time to {stage}: {seconds:.3f} s")
+
             if st.checkbox("show prediction on test data"):
                 st.write(self._results["test_predictions"])
             if st.checkbox("show prediction of training data"):
@@ -107,6 +116,53 @@ class PipelineHandler:
                 self._results = self._pipeline.execute()
                 st.session_state["results available"] = True
 
+    def race(self) -> None:
+        """Train all models of the task type on the same data at once and
+        show a leaderboard"""
+        if all((
+            self._chosen_dataset,
+            self._output_feature,
+            self._input_features,
+            self._task_type,
+            self._model,
+            self._split,
+            self._metrics,
+            self._pipeline
+        )):
+            if st.button("Press to race all models"):
+                models = (
+                    REGRESSION_MODELS if self._task_type == "regression"
+                    else CLASSIFICATION_MODELS
+                )
+                names = {Model: name for name, Model in models.items()}
+                # Only models that can fit the target feature are raced,
+                # Pipeline.race refuses the others
+                model_type = (
+                    "regression" if self._task_type == "regression"
+                    else "classification"
+                )
+                candidates = [
+                    model for model in (Model() for Model in models.values())
+                    if model.type == model_type
+                ]
+                # Pipeline.race starts its own worker processes on every
+                # click: they map the split matrices of this pipeline, which
+                # are written for the race and removed when it ends, and no
+                # idle processes are kept around in the server between
+                # races. Starting them is cheap next to fitting the models.
+                leaderboard = self._pipeline.race(candidates)
+                rows = []
+                for entry in leaderboard:
+                    row = {
+                        "model": names[type(entry["model"])],
+                        "fit time (s)": entry["fit_time"],
+                    }
+                    for metric, result in entry["metrics"]:
+                        row[metric.to_string()] = result
+                    row["error"] = entry["error"]
+                    rows.append(row)
+                st.table(pd.DataFrame(rows))
+
     def summary(self) -> None:
         """Summarize variables"""
         if all((
@@ -127,7 +183,7 @@ class PipelineHandler:
             st.write(f"Output feature: {self._output_feature.name}")
             st.write(f"Task type: {self._task_type}")
             st.write(f"Model: {self._model_name}")
-            st.write(f"Split: {self._split}")
+            st.write(f"Split: {self._split} ({self._split_strategy})")
             st.write(f"Metrics: {self._metrics}")
 
     def initialize_pipeline(self) -> None:
@@ -150,6 +206,8 @@ class PipelineHandler:
                 input_features=self._input_features,
                 target_feature=self._output_feature,
                 split=self._split,
+                split_strategy=self._split_strategy,
+                random_state=self._random_state,
             )
 
     def choose_metric(self) -> None:
@@ -173,6 +231,17 @@ class PipelineHandler:
                 "Enter what percentage of the dataset will be used for "
                 "training")
             self._split = percentage / 100
+            strategies = list(SPLIT_STRATEGIES)
+            if self._task_type != "classification":
+                strategies.remove("stratified")
+            self._split_strategy = st.selectbox(
+                label="Select which rows are used for training",
+                options=strategies,
+            )
+            if self._split_strategy != "sequential":
+                self._random_state = int(st.number_input(
+                    "Enter the random seed of the split", value=0, step=1
+                ))
 
     def choose_model(self) -> None:
         """Produce options for choosing model from available ones"""
@@ -225,25 +294,50 @@ class PipelineHandler:
     def _select_features(self) -> None:
         """Produce options for choosing input and output features"""
         # TODO Make sure output feature is not in the list of input features
-        features = detect_feature_types(self._chosen_dataset)
+        features = {
+            feature.name: feature for feature in self._detect_features()
+        }
 
-        acceptable_input_features = filter(
-            lambda x: x.type == "numerical",
-            features
-        )  # Only numerical input features are allowed
+        # The options are the names, not the features, such that the choices
+        # survive the sampled features being replaced by the scanned ones.
+        acceptable_input_features = [
+            name for name, feature in features.items()
+            if feature.type == "numerical"
+        ]  # Only numerical input features are allowed
         chosen_features = st.multiselect(
             label="Select input features",
             options=acceptable_input_features,
-            format_func=lambda x: x.name,
         )
-        self._input_features = chosen_features
+        self._input_features = [features[name] for name in chosen_features]
 
-        self._output_feature = st.selectbox(
+        output_feature = st.selectbox(
             label="Select output feature",
-            options=features,
-            format_func=lambda x: x.name,
+            options=list(features),
             index=None
         )  # Output feature can be anything.
+        self._output_feature = features.get(output_feature, None)
+
+    def _detect_features(self) -> List[Feature]:
+        """Get the features of the chosen dataset. Until the full scan of the
+        dataset in the background is done, the types are inferred from a
+        sample of the rows."""
+        key = f"feature scan {self._chosen_dataset.id}"
+        full_scan = st.session_state.get(key, None)
+        if full_scan is not None and full_scan.done():
+            return full_scan.result()
+
+        # A fixed seed, such that every rerun infers the same types
+        features, new_scan = infer_feature_types(
+            self._chosen_dataset, random_state=0, full_scan=full_scan is None
+        )
+        if new_scan is not None:
+            st.session_state[key] = new_scan
+        if features and features[0].confidence < 1:
+            st.write(
+                f"Feature types inferred from {features[0].rows_checked} "
+                "rows, checking the remaining rows in the background."
+            )
+        return features
 
     def _ask_task_type(self) -> None:
         """Produce option for choosing feature type"""
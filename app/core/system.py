@@ -1,10 +1,27 @@
 from __future__ import annotations
 
-from typing import List
+from bisect import bisect_left, insort
+from functools import partial
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple
 
 from autoop.core.database import Database
 from autoop.core.ml.artifact import Artifact
-from autoop.core.storage import LocalStorage, Storage
+from autoop.core.ml.dataset import enable_frame_cache, evict_frame_cache
+from autoop.core.storage import (
+    CompressedStorage,
+    ContentAddressedStorage,
+    LocalStorage,
+    Storage,
+)
+
+
+# Orders `ArtifactRegistry.query' can sort by, as the entry fields compared
+ORDERS = {
+    "name": ("name", "version"),
+    "version": ("version", "name"),
+    "type": ("type", "name", "version"),
+    "id": (),
+}
 
 
 class ArtifactRegistry:
@@ -12,12 +29,26 @@ class ArtifactRegistry:
     def __init__(self, database: Database, storage: Storage) -> None:
         """Registry that can store Artifacts.
 
+        The registry keeps indexes of the artifacts by type, name, tag and
+        (name, version) in memory, such that listing and querying them does
+        not walk every entry of the database. The indexes are built from the
+        database here and on `refresh', and kept up to date by `register'
+        and `delete'.
+
         Args:
             database (Database): Database to store the Artifacts in RAM
             storage (Storage): Storage to store the Artifacts on the disk
         """
         self._database = database
         self._storage = storage
+        self._build_indexes()
+
+    def refresh(self) -> None:
+        """Reload the database from its storage and rebuild the indexes, to
+        see artifacts registered by other processes. Does nothing if no
+        other process wrote to the database, see `Database.refresh'."""
+        if self._database.refresh():
+            self._build_indexes()
 
     def register(self, artifact: Artifact) -> None:
         """Register an artifact into the registry.
@@ -26,23 +57,75 @@ class ArtifactRegistry:
             artifact (Artifact): Artifact to register. It's asset path should
             be collection/name_of_artifact. (TODO Confirm this!)
         """
+        if artifact.writer is not None:
+            # Stream the data to the storage instead of producing it in
+            # memory first
+            self.register_stream(
+                artifact.writer,
+                type=artifact.type,
+                name=artifact.name,
+                asset_path=artifact.asset_path,
+                version=artifact.version,
+                tags=artifact.tags,
+                metadata=artifact.metadata,
+            )
+            return
         # GW: NOTE I don't like this implementation. Database.set should be
         # responsible for saving the data into the storage.
         # Save the artifact in the storage.
         self._storage.save(artifact.data, artifact.asset_path)
+        # Re-registering replaces the data, so parsed frames are stale.
+        evict_frame_cache(artifact.id)
         # Save the metadata in the database.
-        entry = {
-            "name": artifact.name,
-            "version": artifact.version,
-            "asset_path": artifact.asset_path,
-            "tags": artifact.tags,
-            "metadata": artifact.metadata,
-            "type": artifact.type,
-        }
-        assert isinstance(artifact.id, str), "Id must be a string."
-        self._database.set("artifacts", artifact.id, entry)
+        self._set_entry(artifact)
+
+    def register_stream(
+        self,
+        write: Callable[[BinaryIO], object],
+        *,
+        type: str,
+        name: str,
+        asset_path: str,
+        version: str = "v0.00",
+        tags: list[str] = [],
+        metadata: dict[str, str] = dict(),
+    ) -> Artifact:
+        """Register an artifact whose data is written to the storage as a
+        stream, such that it never has to be in memory as a whole. E.g.
+        `register_stream(partial(pickle.dump, model), type="model", ...)'.
+
+        If `write' raises, the artifact is not registered and data already
+        stored at `asset_path' is kept.
+
+        Args:
+            write (Callable[[BinaryIO], object]): Function that writes the
+                data of the artifact to the file it is given
+            type (str): Type of the artifact
+            name (str): Name of the artifact
+            asset_path (str): Path to store the data at
+            version (str): Version of the artifact. Default to "v0.00"
+            tags (list[str]): Tags of the artifact. Defaults to empy list
+            metadata (dict[str, str]): Metadata. Defaults to empty dictionary
 
-    def list(self, type: str | None = None) -> List[Artifact]:
+        Returns:
+            Artifact: The registered artifact, which reads its data from the
+            storage on first access
+        """
+        with self._storage.open_writer(asset_path) as file:
+            write(file)
+        artifact = self._to_artifact({
+            "name": name,
+            "version": version,
+            "asset_path": asset_path,
+            "tags": tags,
+            "metadata": metadata,
+            "type": type,
+        })
+        evict_frame_cache(artifact.id)
+        self._set_entry(artifact)
+        return artifact
+
+    def list(self, type: Optional[str] = None) -> List[Artifact]:
         """Get a list of all stored Artifacts. Optinally get a list of the
         artifacts of a specified type.
 
@@ -52,24 +135,106 @@ class ArtifactRegistry:
 
         Returns:
             List[Artifact]: List of stored artifacts (with type `type' if
-            specified.)
+            specified.) The data of the artifacts is only read from the
+            storage when it is accessed.
         """
-        entries = self._database.list("artifacts")
-        artifacts = []
-        for id, data in entries:
-            if type is not None and data["type"] != type:
-                continue
-            artifact = Artifact(
-                name=data["name"],
-                version=data["version"],
-                asset_path=data["asset_path"],
-                tags=data["tags"],
-                metadata=data["metadata"],
-                data=self._storage.load(data["asset_path"]),
-                type=data["type"],
+        if type is None:
+            return [
+                self._to_artifact(data)
+                for _, data in self._database.list("artifacts")
+            ]
+        return [
+            self._to_artifact(self._database.get("artifacts", id))
+            for id in self._by_type.get(type, {})
+        ]
+
+    def query(
+        self,
+        *,
+        type: Optional[str] = None,
+        name: Optional[str] = None,
+        version: Optional[str] = None,
+        tags: Iterable[str] = (),
+        order_by: str = "name",
+        descending: bool = False,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Artifact]:
+        """Find artifacts by their fields, sorted and a page at a time.
+
+        The filters are looked up in the indexes, so a query only touches
+        the artifacts that match. A query without filters ordered by name
+        only touches the requested page.
+
+        Args:
+            type (str, optional): Only artifacts of this type
+            name (str, optional): Only artifacts with this name
+            version (str, optional): Only artifacts of this version. Without
+                `name' this filter is not indexed
+            tags (Iterable[str]): Only artifacts that have all these tags.
+                Defaults to no tags
+            order_by (str): Field to sort by, one of `ORDERS'. Ties are
+                broken by the other fields and the id. Defaults to "name"
+            descending (bool): Sort from high to low. Defaults to False
+            offset (int): Number of matching artifacts to skip. Defaults to 0
+            limit (int, optional): Maximum number of artifacts to return.
+                Defaults to all
+
+        Returns:
+            List[Artifact]: The page of matching artifacts. Their data is
+            only read from the storage when it is accessed.
+        """
+        if order_by not in ORDERS:
+            raise ValueError(
+                f"Can not order by {order_by!r}, choose from {list(ORDERS)}"
+            )
+        stop = None if limit is None else offset + limit
+        ids = self._find(type, name, version, tags)
+        if ids is None and order_by == "name":
+            # The name order is kept sorted, so only the page is read
+            if descending:
+                end = len(self._by_order) - offset
+                start = None if stop is None else max(
+                    len(self._by_order) - stop, 0
+                )
+                keys = self._by_order[start:max(end, 0)][::-1]
+            else:
+                keys = self._by_order[offset:stop]
+            entries = [
+                self._database.get("artifacts", id) for *_, id in keys
+            ]
+        else:
+            if ids is None:
+                ids = (id for id, _ in self._database.list("artifacts"))
+            fields = ORDERS[order_by]
+            found = [(id, self._database.get("artifacts", id)) for id in ids]
+            found.sort(
+                key=lambda item: (
+                    *(item[1][field] for field in fields), item[0]
+                ),
+                reverse=descending,
             )
-            artifacts.append(artifact)
-        return artifacts
+            entries = [data for _, data in found[offset:stop]]
+        return [self._to_artifact(data) for data in entries]
+
+    def count(
+        self,
+        *,
+        type: Optional[str] = None,
+        name: Optional[str] = None,
+        version: Optional[str] = None,
+        tags: Iterable[str] = (),
+    ) -> int:
+        """Count the artifacts `query' would find with these filters, e.g.
+        to know the number of pages.
+
+        Returns:
+            int: Number of matching artifacts
+        """
+        ids = self._find(type, name, version, tags)
+        if ids is None:
+            return len(self._by_order)
+        return len(ids)
 
     def get(self, artifact_id: str) -> Artifact:
         """Get artifact from database by ID.
@@ -78,15 +243,7 @@ class ArtifactRegistry:
             artifact_id (String): ID of artifact to be retrieved
         """
         data = self._database.get("artifacts", artifact_id)
-        return Artifact(
-            name=data["name"],
-            version=data["version"],
-            asset_path=data["asset_path"],
-            tags=data["tags"],
-            metadata=data["metadata"],
-            data=self._storage.load(data["asset_path"]),
-            type=data["type"],
-        )
+        return self._to_artifact(data)
 
     def delete(self, artifact_id: str) -> None:
         """Delete artifact from database by ID.
@@ -98,13 +255,128 @@ class ArtifactRegistry:
         data = self._database.get("artifacts", artifact_id)
         self._storage.delete(data["asset_path"])
         self._database.delete("artifacts", artifact_id)
+        self._unindex(artifact_id, data)
+        evict_frame_cache(artifact_id)
+
+    def _set_entry(self, artifact: Artifact) -> None:
+        """Save the metadata of an artifact in the database"""
+        entry = {
+            "name": artifact.name,
+            "version": artifact.version,
+            "asset_path": artifact.asset_path,
+            "tags": artifact.tags,
+            "metadata": artifact.metadata,
+            "type": artifact.type,
+        }
+        assert isinstance(artifact.id, str), "Id must be a string."
+        old = self._database.get("artifacts", artifact.id)
+        if old is not None:
+            self._unindex(artifact.id, old)
+        self._database.set("artifacts", artifact.id, entry)
+        self._index(artifact.id, entry)
+
+    def _build_indexes(self) -> None:
+        """Index all artifacts in the database"""
+        # Ids are kept as the keys of dicts, which are sets that remember
+        # the order the artifacts were registered in.
+        self._by_type: Dict[str, Dict[str, None]] = {}
+        self._by_name: Dict[str, Dict[str, None]] = {}
+        self._by_tag: Dict[str, Dict[str, None]] = {}
+        self._by_name_version: Dict[Tuple[str, str], Dict[str, None]] = {}
+        entries = self._database.list("artifacts")
+        for id, data in entries:
+            for index, key in self._buckets(data):
+                index.setdefault(key, {})[id] = None
+        # (name, version, id) of every artifact, sorted. Sorted at once,
+        # inserting one by one would take quadratic time.
+        self._by_order: List[Tuple[str, str, str]] = sorted(
+            (data["name"], data["version"], id) for id, data in entries
+        )
+
+    def _buckets(self, data: dict) -> List[Tuple[dict, object]]:
+        """The indexes an entry is in, with the key it has in each"""
+        return [
+            (self._by_type, data["type"]),
+            (self._by_name, data["name"]),
+            (self._by_name_version, (data["name"], data["version"])),
+        ] + [(self._by_tag, tag) for tag in set(data["tags"])]
+
+    def _index(self, id: str, data: dict) -> None:
+        """Add a database entry to the indexes"""
+        for index, key in self._buckets(data):
+            index.setdefault(key, {})[id] = None
+        insort(self._by_order, (data["name"], data["version"], id))
+
+    def _unindex(self, id: str, data: dict) -> None:
+        """Remove a database entry from the indexes"""
+        for index, key in self._buckets(data):
+            bucket = index.get(key, {})
+            bucket.pop(id, None)
+            if not bucket:
+                index.pop(key, None)
+        order = (data["name"], data["version"], id)
+        position = bisect_left(self._by_order, order)
+        if self._by_order[position:position + 1] == [order]:
+            del self._by_order[position]
+
+    def _find(
+        self,
+        type: Optional[str],
+        name: Optional[str],
+        version: Optional[str],
+        tags: Iterable[str],
+    ) -> Optional[Dict[str, None]]:
+        """Ids of the artifacts that match the filters of `query', in the
+        order they were registered, or None if there are no filters"""
+        buckets = [self._by_tag.get(tag, {}) for tag in tags]
+        if type is not None:
+            buckets.append(self._by_type.get(type, {}))
+        if name is not None and version is not None:
+            buckets.append(self._by_name_version.get((name, version), {}))
+        elif name is not None:
+            buckets.append(self._by_name.get(name, {}))
+        if not buckets and version is None:
+            return None
+        if buckets:
+            # Walk the smallest bucket and look its ids up in the others
+            buckets.sort(key=len)
+            ids = {
+                id: None for id in buckets[0]
+                if all(id in bucket for bucket in buckets[1:])
+            }
+        else:
+            ids = {id: None for id, _ in self._database.list("artifacts")}
+        if version is not None and name is None:
+            ids = {
+                id: None for id in ids
+                if self._database.get("artifacts", id)["version"] == version
+            }
+        return ids
+
+    def _to_artifact(self, data: dict) -> Artifact:
+        """Create an artifact from a database entry that reads its data from
+        the storage on first access.
+
+        Args:
+            data (dict): Database entry of the artifact
+        """
+        return Artifact(
+            name=data["name"],
+            version=data["version"],
+            asset_path=data["asset_path"],
+            tags=data["tags"],
+            metadata=data["metadata"],
+            loader=partial(self._storage.load, data["asset_path"]),
+            view_loader=partial(self._storage.load_view, data["asset_path"]),
+            type=data["type"],
+        )
 
 
 class AutoMLSystem:
     """"""
     _instance = None
 
-    def __init__(self, storage: LocalStorage, database: Database) -> None:
+    def __init__(self, storage: Storage, database: Database) -> None:
         """Registry that can store Artifacts.
 
         Args:
@@ -119,11 +391,17 @@ class AutoMLSystem:
     def get_instance() -> AutoMLSystem:
         """Get instance of AutoMLSystem"""
         if AutoMLSystem._instance is None:
+            # Let streamlit reruns reuse the parsed datasets.
+            enable_frame_cache()
+            # Artifacts with the same data, e.g. a dataset uploaded twice,
+            # share one blob, which is compressed.
             AutoMLSystem._instance = AutoMLSystem(
-                LocalStorage("./assets/objects"),
+                ContentAddressedStorage(
+                    CompressedStorage(LocalStorage("./assets/objects"))
+                ),
                 Database(LocalStorage("./assets/dbo")),
             )
-        AutoMLSystem._instance._database.refresh()
+        AutoMLSystem._instance.registry.refresh()
         return AutoMLSystem._instance
 
     @property
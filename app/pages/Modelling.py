@@ -40,6 +40,7 @@ def main() -> None:
     handler.initialize_pipeline()
     handler.summary()
     handler.train()
+    handler.race()
     handler.save()
     handler.handle_results()
 
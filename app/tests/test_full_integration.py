@@ -1,13 +1,34 @@
 from __future__ import annotations
 
+import io
+import tempfile
 import unittest
 from typing import TYPE_CHECKING
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
+
+from app.core.system import AutoMLSystem
+from autoop.core.database import Database
+from autoop.core.storage import (
+    CompressedStorage,
+    ContentAddressedStorage,
+    LocalStorage,
+)
 
 if TYPE_CHECKING:
     import streamlit
 
 class TestFullIntegration(unittest.TestCase):
+    def setUp(self):
+        # Keep the test out of the assets of the app
+        system = AutoMLSystem(
+            ContentAddressedStorage(
+                CompressedStorage(LocalStorage(tempfile.mkdtemp()))
+            ),
+            Database(LocalStorage(tempfile.mkdtemp())),
+        )
+        patcher = patch.object(AutoMLSystem, "_instance", system)
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     @patch("app.Welcome.st")
     @patch("app.Welcome.st.file_uploader")
@@ -21,10 +42,9 @@ class TestFullIntegration(unittest.TestCase):
         with open("test_assets/iris.csv", mode="rb") as file:
             bytes = file.read()
 
-        # Let st.file_uploader return an object which return bytes when
-        # getvalue() is called
-        file_object_mock = MagicMock()
-        file_object_mock.getvalue.return_value = bytes
+        # Let st.file_uploader return a named file object, like streamlit's
+        # UploadedFile, which is a BytesIO
+        file_object_mock = io.BytesIO(bytes)
         file_object_mock.name = "iris.csv"
         file_uploader_mock.return_value = file_object_mock
 
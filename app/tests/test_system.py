@@ -1,15 +1,39 @@
+import pickle
+import tempfile
 import unittest
+from functools import partial
+from unittest.mock import patch
 
+import numpy as np
 import pandas as pd
 from sklearn.datasets import fetch_openml, load_iris
 
 from app.core.system import ArtifactRegistry, AutoMLSystem
 from autoop.core.database import Database
+from autoop.core.ml.artifact import Artifact
 from autoop.core.ml.dataset import Dataset
-from autoop.core.storage import LocalStorage
+from autoop.core.ml.model import MultipleLinearRegression
+from autoop.core.ml.model.model import Model
+from autoop.core.storage import (
+    CompressedStorage,
+    ContentAddressedStorage,
+    LocalStorage,
+)
 
 
 class TestAutoMLSystem(unittest.TestCase):
+    def setUp(self):
+        # Keep the test out of the assets of the app
+        system = AutoMLSystem(
+            ContentAddressedStorage(
+                CompressedStorage(LocalStorage(tempfile.mkdtemp()))
+            ),
+            Database(LocalStorage(tempfile.mkdtemp())),
+        )
+        patcher = patch.object(AutoMLSystem, "_instance", system)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_save_and_delete(self):
         automl = AutoMLSystem.get_instance()
 
@@ -27,3 +51,150 @@ class TestAutoMLSystem(unittest.TestCase):
         )
         automl.registry.register(iris_artifact)
         automl.registry.delete(iris_artifact.id)
+
+
+class TestArtifactRegistry(unittest.TestCase):
+    def test_list_is_lazy(self):
+        storage = LocalStorage(tempfile.mkdtemp())
+        registry = ArtifactRegistry(
+            Database(LocalStorage(tempfile.mkdtemp())), storage
+        )
+        dataset = Dataset(
+            name="test", asset_path="datasets/test", data=b"a,b\n1,2\n"
+        )
+        registry.register(dataset)
+        storage.delete("datasets/test")  # Listing must not read the data
+        artifacts = registry.list(type="dataset")
+        self.assertEqual([artifact.name for artifact in artifacts], ["test"])
+        self.assertFalse(artifacts[0].is_loaded)
+
+    def test_register_stream(self):
+        storage = LocalStorage(tempfile.mkdtemp())
+        registry = ArtifactRegistry(
+            Database(LocalStorage(tempfile.mkdtemp())), storage
+        )
+        artifact = registry.register_stream(
+            partial(pickle.dump, {"weights": [1, 2, 3]}),
+            type="model", name="model", asset_path="models/model",
+            tags=["test"],
+        )
+        self.assertEqual(registry.get(artifact.id).tags, ["test"])
+        self.assertEqual(
+            pickle.loads(registry.get(artifact.id).data),
+            {"weights": [1, 2, 3]},
+        )
+
+        def fail(file):
+            file.write(b"half")
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            registry.register_stream(
+                fail, type="model", name="other", asset_path="models/other"
+            )
+        self.assertEqual(len(registry.list()), 1)
+
+    def test_register_streams_model(self):
+        storage = LocalStorage(tempfile.mkdtemp())
+        registry = ArtifactRegistry(
+            Database(LocalStorage(tempfile.mkdtemp())), storage
+        )
+        model = MultipleLinearRegression()
+        model.fit(np.array([[0.0], [1.0], [2.0]]), np.array([1.0, 3.0, 5.0]))
+        artifact = model.to_artifact(asset_path="models/model")
+        with patch.object(storage, "save") as save:
+            registry.register(artifact)
+            save.assert_not_called()  # Pickled straight into the storage
+        loaded = Model.from_artifact(registry.get(artifact.id))
+        np.testing.assert_allclose(loaded.predict(np.array([[3.0]])), [7.0])
+
+    def test_query(self):
+        registry = ArtifactRegistry(
+            Database(LocalStorage(tempfile.mkdtemp())),
+            LocalStorage(tempfile.mkdtemp()),
+        )
+        for index in range(20):
+            registry.register(Artifact(
+                type="model" if index % 2 else "dataset",
+                name=f"artifact {index % 5}",
+                version=f"v{index // 5}",
+                asset_path=f"artifacts/{index}",
+                tags=["even"] if index % 2 == 0 else ["odd", "test"],
+                data=b"",
+            ))
+
+        def names(artifacts):
+            return [(a.name, a.version) for a in artifacts]
+
+        self.assertEqual(len(registry.query(type="model")), 10)
+        self.assertEqual(
+            names(registry.query(name="artifact 1")),
+            [("artifact 1", f"v{version}") for version in range(4)],
+        )
+        self.assertEqual(
+            names(registry.query(name="artifact 2", version="v1")),
+            [("artifact 2", "v1")],
+        )
+        self.assertEqual(
+            len(registry.query(type="dataset", tags=["odd"])), 0
+        )
+        self.assertEqual(len(registry.query(tags=["odd", "test"])), 10)
+        self.assertEqual(registry.count(type="model", version="v0"), 2)
+        self.assertEqual(registry.count(), 20)
+
+        # Pages of the whole registry, in both directions
+        everything = names(registry.query())
+        self.assertEqual(everything, sorted(everything))
+        self.assertEqual(names(registry.query(offset=3, limit=4)),
+                         everything[3:7])
+        self.assertEqual(
+            names(registry.query(descending=True, offset=3, limit=4)),
+            everything[::-1][3:7],
+        )
+        self.assertEqual(registry.query(offset=30), [])
+        by_version = names(registry.query(
+            type="model", order_by="version", descending=True, limit=3
+        ))
+        self.assertEqual([version for _, version in by_version],
+                         ["v3", "v3", "v3"])
+        with self.assertRaises(ValueError):
+            registry.query(order_by="size")
+
+    def test_indexes_follow_changes(self):
+        database = Database(LocalStorage(tempfile.mkdtemp()))
+        registry = ArtifactRegistry(database, LocalStorage(tempfile.mkdtemp()))
+        artifact = Artifact(type="model", name="a", asset_path="a", data=b"",
+                            tags=["old"])
+        registry.register(artifact)
+        # Registering again replaces the entry in the indexes
+        registry.register(Artifact(type="dataset", name="b", asset_path="a",
+                                   data=b"", tags=["new"]))
+        self.assertEqual(registry.query(type="model"), [])
+        self.assertEqual(registry.query(tags=["old"]), [])
+        self.assertEqual(len(registry.query(name="b", tags=["new"])), 1)
+        self.assertEqual(len(registry.list(type="dataset")), 1)
+        # A new registry on the same database indexes what is stored
+        reopened = ArtifactRegistry(database, LocalStorage(tempfile.mkdtemp()))
+        self.assertEqual(len(reopened.query(type="dataset")), 1)
+        registry.delete(artifact.id)
+        self.assertEqual(registry.query(name="b"), [])
+        self.assertEqual(registry.count(), 0)
+        self.assertEqual(registry.list(type="dataset"), [])
+
+    def test_refresh_rebuilds_only_after_changes(self):
+        database_storage = LocalStorage(tempfile.mkdtemp())
+        storage = LocalStorage(tempfile.mkdtemp())
+        registry = ArtifactRegistry(Database(database_storage), storage)
+        other = ArtifactRegistry(Database(database_storage), storage)
+        registry.register(Artifact(
+            type="model", name="a", asset_path="a", data=b""
+        ))
+        with patch.object(
+            ArtifactRegistry, "_build_indexes", autospec=True,
+            side_effect=ArtifactRegistry._build_indexes,
+        ) as build:
+            registry.refresh()
+            build.assert_not_called()
+            other.refresh()
+            self.assertEqual(build.call_count, 1)
+        self.assertEqual(len(other.query(type="model")), 1)
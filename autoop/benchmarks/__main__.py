@@ -0,0 +1,106 @@
+"""Run the benchmarks of the autoop core and compare them with a baseline.
+
+Usage:
+    python -m autoop.benchmarks --rows 10000 --output results.json
+    python -m autoop.benchmarks --baseline autoop/benchmarks/baseline.json
+
+baseline.json holds the results of the default run on one machine. The
+timings are compared relative to a calibration benchmark that is run every
+time, which takes out most of the difference in speed between machines, but
+not all of it. So the baseline is machine-local and not a gate: regenerate
+it with --output on the machine that compares changes. Exits with status 1
+if a benchmark got slower than the tolerance allows.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import warnings
+from typing import List, Optional
+
+from autoop.benchmarks.cases import Workload
+from autoop.benchmarks.harness import (
+    calibration_scale,
+    compare,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks from the command line.
+
+    Args:
+        argv (List[str], optional): Command line arguments. Defaults to
+            sys.argv
+
+    Returns:
+        int: Exit status
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m autoop.benchmarks",
+        description="Benchmark the hot paths of the autoop core.",
+    )
+    parser.add_argument("--rows", type=int, default=10000,
+                        help="rows of each synthetic dataset")
+    parser.add_argument("--entries", type=int, default=1000,
+                        help="entries in the database and registry")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed calls of each benchmark")
+    parser.add_argument("--select", default=None,
+                        help="only run benchmarks whose name contains this")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the synthetic data")
+    parser.add_argument("--output", default=None,
+                        help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None,
+                        help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="fraction a benchmark may be slower")
+    args = parser.parse_args(argv)
+
+    # Convergence and conversion warnings of the models would flood the table
+    warnings.simplefilter("ignore")
+    with Workload(args.rows, args.entries, random_state=args.seed) as work:
+        results = run_benchmarks(work, args.repeat, args.select)
+    if args.output is not None:
+        save_results(results, args.output)
+
+    if args.baseline is None:
+        for name, result in results["results"].items():
+            if "error" in result:
+                print(f"{name:50} error: {result['error']}")
+            else:
+                print(f"{name:50} {result['min'] * 1000:10.3f} ms")
+        return 0
+
+    baseline = load_results(args.baseline)
+    for key in ("n_rows", "n_entries"):
+        if baseline["config"][key] != results["config"][key]:
+            print(f"Warning: the baseline has {key}="
+                  f"{baseline['config'][key]}, this run "
+                  f"{results['config'][key]}", file=sys.stderr)
+    if args.select is not None:
+        baseline["results"] = {
+            name: result for name, result in baseline["results"].items()
+            if args.select in name
+        }
+    scale = calibration_scale(results, baseline)
+    print(f"This machine is {scale:.2f}x as slow as the baseline's, the "
+          "ratios are relative to that")
+    comparison = compare(results, baseline, args.tolerance)
+    for row in comparison:
+        times = [
+            "-" if row[key] is None else f"{row[key] * 1000:.3f} ms"
+            for key in ("baseline", "current")
+        ]
+        ratio = "-" if row["ratio"] is None else f"{row['ratio']:.2f}x"
+        print(f"{row['name']:50} {times[0]:>14} {times[1]:>14} "
+              f"{ratio:>8} {row['status']}")
+    slower = [row for row in comparison if row["status"] == "slower"]
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+from functools import cached_property, partial
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.core.system import ArtifactRegistry
+from autoop.benchmarks.data import synthetic_adult, synthetic_iris
+from autoop.core.database import Database
+from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.dataset import Dataset, evict_frame_cache
+from autoop.core.ml.dataset_format import DATASET_FORMATS, DEFAULT_FORMAT
+from autoop.core.ml.feature import Feature
+from autoop.core.ml.metric import METRICS
+from autoop.core.ml.model import CLASSIFICATION_MODELS, REGRESSION_MODELS
+from autoop.core.storage import LocalStorage
+from autoop.functional.feature import (
+    detect_feature_types,
+    infer_feature_types,
+)
+from autoop.functional.preprocessing import (
+    preprocess_dataset,
+    preprocess_features,
+)
+
+# The datasets and targets the models are benchmarked on
+CLASSIFICATION_TARGET = "income"  # Of adult
+REGRESSION_TARGET = "petal_width"  # Of iris
+
+
+class Workload:
+    """The synthetic data the benchmarks run on. Everything is generated the
+    first time a benchmark needs it and then shared by all benchmarks. Use as
+    a context manager to remove the temporary storage afterwards."""
+
+    def __init__(
+        self,
+        n_rows: int = 10000,
+        n_entries: int = 1000,
+        split: float = 0.8,
+        random_state: int = 0,
+    ) -> None:
+        """Create a workload.
+
+        Args:
+            n_rows (int): Number of rows of each synthetic dataset. Defaults
+                to 10000
+            n_entries (int): Number of entries in the database and the
+                artifact registry before they are benchmarked. Defaults to
+                1000
+            split (float): Fraction of the rows the models are fitted on,
+                they predict the others. Defaults to 0.8
+            random_state (int): Seed of the synthetic data. Defaults to 0
+        """
+        self.n_rows = n_rows
+        self.n_entries = n_entries
+        self.split = split
+        self.random_state = random_state
+        self._directory = None
+
+    def __enter__(self) -> Workload:
+        """Return this workload"""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Remove the temporary storage"""
+        self.close()
+
+    def close(self) -> None:
+        """Remove the temporary storage"""
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def storage(self, name: str) -> LocalStorage:
+        """Get an empty local storage in a temporary directory.
+
+        Args:
+            name (str): Name of the storage, unique within the workload
+        """
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="autoop-benchmark-")
+        return LocalStorage(f"{self._directory}/{name}")
+
+    @cached_property
+    def iris(self) -> pd.DataFrame:
+        """Synthetic iris dataset of `n_rows' rows"""
+        return synthetic_iris(self.n_rows, self.random_state)
+
+    @cached_property
+    def adult(self) -> pd.DataFrame:
+        """Synthetic adult dataset of `n_rows' rows"""
+        return synthetic_adult(self.n_rows, self.random_state)
+
+    @cached_property
+    def adult_dataset(self) -> Dataset:
+        """The synthetic adult dataset as a Dataset artifact"""
+        return Dataset.from_dataframe(
+            self.adult, name="adult", asset_path="adult"
+        )
+
+    @cached_property
+    def adult_features(self) -> List[Feature]:
+        """Features of the synthetic adult dataset"""
+        return detect_feature_types(self.adult_dataset)
+
+    @cached_property
+    def classification(self) -> Dict[str, np.ndarray]:
+        """Train ("X", "y") and test ("X_test", "y_test") matrices of the
+        adult dataset with a one-hot `CLASSIFICATION_TARGET'"""
+        return self._matrices(self.adult_dataset, CLASSIFICATION_TARGET)
+
+    @cached_property
+    def regression(self) -> Dict[str, np.ndarray]:
+        """Train and test matrices of the iris dataset with the numerical
+        `REGRESSION_TARGET'"""
+        dataset = Dataset.from_dataframe(
+            self.iris, name="iris", asset_path="iris"
+        )
+        return self._matrices(dataset, REGRESSION_TARGET)
+
+    def _matrices(
+        self, dataset: Dataset, target: str
+    ) -> Dict[str, np.ndarray]:
+        features = {
+            feature.name: feature
+            for feature in detect_feature_types(dataset)
+        }
+        target_feature = features.pop(target)
+        X, y, _ = preprocess_dataset(
+            list(features.values()), target_feature, dataset
+        )
+        n_train = int(self.split * len(X))
+        return {
+            "X": X[:n_train], "y": y[:n_train],
+            "X_test": X[n_train:], "y_test": y[n_train:],
+        }
+
+
+def dataset_cases(workload: Workload) -> Dict[str, Callable[[], object]]:
+    """Encoding with `Dataset.save' and decoding with `Dataset.read' of the
+    adult dataset in each format. Every read is of a new Dataset, such that
+    the memoized frame is not measured."""
+    cases = {}
+    for format in DATASET_FORMATS:
+        stored = Dataset.from_dataframe(
+            workload.adult, format, name="adult", asset_path="adult"
+        )
+
+        def save(format: str = format) -> bytes:
+            dataset = Dataset(name="adult", asset_path="adult", data=b"")
+            return dataset.save(workload.adult, format)
+
+        def read(data: bytes = stored.data) -> pd.DataFrame:
+            return Dataset(
+                name="adult", asset_path="adult", data=data
+            ).read()
+
+        cases[f"dataset.save[{format}]"] = save
+        cases[f"dataset.read[{format}]"] = read
+    return cases
+
+
+def feature_cases(workload: Workload) -> Dict[str, Callable[[], object]]:
+    """Feature type detection and inference and preprocessing of the adult
+    dataset. Every call reads a new Dataset from the storage, such that the
+    decoding and scanning of the data are measured instead of a memoized
+    frame. Inference is measured in each format, since how much of the data
+    it decodes depends on the format."""
+    storage = workload.storage("features")
+    for format in DATASET_FORMATS:
+        stored = Dataset.from_dataframe(
+            workload.adult, format, name="adult", asset_path=format
+        )
+        storage.save(stored.data, format)
+
+    def fresh(format: str = DEFAULT_FORMAT) -> Dataset:
+        dataset = Dataset(
+            name="adult",
+            asset_path=format,
+            loader=partial(storage.load, format),
+            view_loader=partial(storage.load_view, format),
+        )
+        # Another benchmark may have enabled the process-wide cache
+        evict_frame_cache(dataset.id)
+        return dataset
+
+    features = workload.adult_features
+    target = next(
+        feature for feature in features
+        if feature.name == CLASSIFICATION_TARGET
+    )
+    inputs = [feature for feature in features if feature is not target]
+    cases = {
+        "features.detect_feature_types": lambda: detect_feature_types(
+            fresh()
+        ),
+        "preprocessing.preprocess_features": lambda: preprocess_features(
+            features, fresh()
+        ),
+        "preprocessing.preprocess_dataset": lambda: preprocess_dataset(
+            inputs, target, fresh()
+        ),
+    }
+    for format in DATASET_FORMATS:
+        cases[f"features.infer_feature_types[{format}]"] = (
+            lambda format=format: infer_feature_types(
+                fresh(format), random_state=0
+            )
+        )
+    return cases
+
+
+def metric_cases(workload: Workload) -> Dict[str, Callable[[], object]]:
+    """Every metric on `n_rows' one-hot labels of 3 classes (classification
+    metrics) or numbers (regression metrics), of which about 80% are
+    predicted right."""
+    rng = np.random.default_rng(workload.random_state)
+    labels = rng.integers(0, 3, size=workload.n_rows)
+    predicted = np.where(
+        rng.random(workload.n_rows) < 0.8,
+        labels, rng.integers(0, 3, size=workload.n_rows),
+    )
+    values = rng.normal(size=(workload.n_rows, 1))
+    data = {
+        "classification": (np.eye(3)[labels], np.eye(3)[predicted]),
+        "regression": (values, values + rng.normal(0, 0.5, values.shape)),
+    }
+    cases = {}
+    for name, Metric in METRICS.items():
+        ground_truth, predictions = data[Metric.statistics]
+        metric = Metric()
+        cases[f"metric[{name}]"] = (
+            lambda metric=metric, ground_truth=ground_truth,
+            predictions=predictions: metric(ground_truth, predictions)
+        )
+    return cases
+
+
+def model_cases(workload: Workload) -> Dict[str, Callable[[], object]]:
+    """`fit' and `predict' of every model, the classification models on the
+    adult dataset and the regression models on the iris dataset. The model
+    that predicts is fitted on its first call."""
+    cases = {}
+    models = [
+        (name, Model, "classification")
+        for name, Model in CLASSIFICATION_MODELS.items()
+    ] + [
+        (name, Model, "regression")
+        for name, Model in REGRESSION_MODELS.items()
+    ]
+    for name, Model, task in models:
+
+        def fit(Model: type = Model, task: str = task) -> object:
+            matrices = getattr(workload, task)
+            model = Model()
+            model.fit(matrices["X"], matrices["y"])
+            return model
+
+        def predict(fit: Callable = fit, fitted: list = []) -> np.ndarray:
+            if not fitted:
+                fitted.append(fit())
+            matrices = getattr(workload, fitted[0].type)
+            return fitted[0].predict(matrices["X_test"])
+
+        cases[f"model.fit[{name}]"] = fit
+        cases[f"model.predict[{name}]"] = predict
+    return cases
+
+
+def registry_cases(workload: Workload) -> Dict[str, Callable[[], object]]:
+    """`Database.set' of a new entry into a database and `ArtifactRegistry'
+    listing and querying, each with `n_entries' entries already stored."""
+    database = Database(workload.storage("database"))
+    for index in range(workload.n_entries):
+        database.set("entries", f"entry-{index}", {"index": index})
+    n_set = [workload.n_entries]
+
+    def set() -> dict:
+        n_set[0] += 1
+        return database.set("entries", f"entry-{n_set[0]}", {"index": 0})
+
+    storage = workload.storage("registry")
+    registry = ArtifactRegistry(
+        Database(workload.storage("registry-database")), storage
+    )
+    for index in range(workload.n_entries):
+        registry.register(Artifact(
+            type="dataset" if index % 2 else "model",
+            name=f"artifact {index % 100}",
+            version=f"v{index // 100}",
+            asset_path=f"artifacts/{index}",
+            data=b"",
+        ))
+    return {
+        "database.set": set,
+        "registry.list": lambda: registry.list(),
+        "registry.list[type]": lambda: registry.list("dataset"),
+        "registry.query[name]": lambda: registry.query(name="artifact 7"),
+        "registry.query[name, version]": lambda: registry.query(
+            name="artifact 7", version="v0"
+        ),
+        "registry.query[page]": lambda: registry.query(
+            offset=workload.n_entries // 2, limit=20
+        ),
+    }
+
+
+SUITES = {
+    "dataset": dataset_cases,
+    "features": feature_cases,
+    "metrics": metric_cases,
+    "models": model_cases,
+    "registry": registry_cases,
+}
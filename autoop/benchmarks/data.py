@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import os
+from typing import Union
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_float_dtype, is_integer_dtype
+
+ASSETS_DIRECTORY = os.path.join(
+    os.path.dirname(__file__), "..", "..", "test_assets"
+)
+
+
+def synthetic_iris(
+    n_rows: int, random_state: Union[int, np.random.Generator, None] = None
+) -> pd.DataFrame:
+    """Scaled up version of test_assets/iris.csv, see `scale_up'.
+
+    Args:
+        n_rows (int): Number of rows
+        random_state (Union[int, np.random.Generator], optional): Seed or
+            generator of the sampling
+
+    Returns:
+        pd.DataFrame: Synthetic iris dataset
+    """
+    return scale_up(_read_asset("iris.csv"), n_rows, random_state)
+
+
+def synthetic_adult(
+    n_rows: int, random_state: Union[int, np.random.Generator, None] = None
+) -> pd.DataFrame:
+    """Scaled up (or down) version of test_assets/adult.csv, see `scale_up'.
+
+    Args:
+        n_rows (int): Number of rows
+        random_state (Union[int, np.random.Generator], optional): Seed or
+            generator of the sampling
+
+    Returns:
+        pd.DataFrame: Synthetic adult dataset
+    """
+    return scale_up(_read_asset("adult.csv"), n_rows, random_state)
+
+
+def scale_up(
+    frame: pd.DataFrame,
+    n_rows: int,
+    random_state: Union[int, np.random.Generator, None] = None,
+) -> pd.DataFrame:
+    """Sample rows with replacement and add noise to the numerical columns,
+    such that the result has the same columns, types and categories as
+    `frame' but any number of rows that are not all duplicates.
+
+    Args:
+        frame (pd.DataFrame): Dataset to imitate
+        n_rows (int): Number of rows
+        random_state (Union[int, np.random.Generator], optional): Seed or
+            generator of the sampling
+
+    Returns:
+        pd.DataFrame: The synthetic dataset
+    """
+    rng = np.random.default_rng(random_state)
+    rows = rng.integers(0, len(frame), size=n_rows)
+    synthetic = frame.iloc[rows].reset_index(drop=True)
+    for name in synthetic.columns:
+        column = synthetic[name]
+        if not (is_float_dtype(column) or is_integer_dtype(column)):
+            continue
+        # Noise of 5% of the spread of the column keeps its distribution
+        noise = rng.normal(0, 0.05 * frame[name].std(), size=n_rows)
+        values = np.clip(
+            column.to_numpy(dtype=float) + noise,
+            frame[name].min(), frame[name].max(),
+        )
+        if is_integer_dtype(column):
+            values = np.rint(values)
+        synthetic[name] = values.astype(column.dtype)
+    return synthetic
+
+
+def _read_asset(name: str) -> pd.DataFrame:
+    return pd.read_csv(os.path.join(ASSETS_DIRECTORY, name))
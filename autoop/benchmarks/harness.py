@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from autoop.benchmarks.cases import SUITES, Workload
+
+
+def time_case(function: Callable[[], object], repeat: int = 5) -> dict:
+    """Time a benchmark. It is called once untimed first, to warm up caches
+    and lazy setup, and then `repeat' times.
+
+    Args:
+        function (Callable[[], object]): The benchmark
+        repeat (int): Number of timed calls. Defaults to 5
+
+    Returns:
+        dict: The "min", "median" and "mean" seconds of a call and the
+        number of calls "repeat"
+    """
+    function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "repeat": repeat,
+    }
+
+
+def calibration() -> None:
+    """Fixed work that does not depend on autoop, sorting numbers with
+    numpy and a loop in plain Python. Its time is a measure of the speed of
+    the machine, against which `compare' relates the other benchmarks."""
+    numbers = np.random.default_rng(0).random(500000)
+    np.sort(numbers)
+    sum(index * index for index in range(200000))
+
+
+def run_benchmarks(
+    workload: Workload,
+    repeat: int = 5,
+    select: Optional[str] = None,
+    suites: Dict[str, Callable[[Workload], dict]] = SUITES,
+) -> dict:
+    """Run benchmarks on a workload.
+
+    A benchmark that raises is recorded with its "error" instead of its
+    times, such that one broken model does not stop the whole run.
+
+    Args:
+        workload (Workload): Data to run the benchmarks on
+        repeat (int): Number of timed calls of each benchmark. Defaults to 5
+        select (str, optional): Only run the benchmarks whose name contains
+            this. Defaults to all
+        suites (Dict[str, Callable[[Workload], dict]]): Functions that
+            create the benchmarks by name. Defaults to `SUITES'
+
+    Returns:
+        dict: JSON serializable results, with the "config" of the run, the
+        times of the "calibration" and the "results" of each benchmark by
+        name
+    """
+    results = {}
+    for suite in suites.values():
+        try:
+            cases = suite(workload)
+        except Exception as error:
+            results[suite.__name__] = {"error": repr(error)}
+            continue
+        for name, function in cases.items():
+            if select is not None and select not in name:
+                continue
+            try:
+                results[name] = time_case(function, repeat)
+            except Exception as error:
+                results[name] = {"error": repr(error)}
+    return {
+        "config": {
+            "n_rows": workload.n_rows,
+            "n_entries": workload.n_entries,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "machine": platform.machine(),
+        },
+        "calibration": time_case(calibration, repeat),
+        "results": results,
+    }
+
+
+def compare(
+    results: dict, baseline: dict, tolerance: float = 0.5
+) -> List[dict]:
+    """Compare the fastest time of each benchmark with a baseline. If both
+    have a calibration, the times are compared relative to the calibration
+    of their run, which takes out most of the difference in speed between
+    the machines they ran on.
+
+    Args:
+        results (dict): Results of `run_benchmarks'
+        baseline (dict): Earlier results of `run_benchmarks'
+        tolerance (float): Fraction a benchmark may be slower or faster than
+            the baseline before it counts as a change. Defaults to 0.5
+
+    Returns:
+        List[dict]: For each benchmark in either, sorted by name, its "name",
+        "baseline" and "current" seconds (None if not timed), "ratio" of
+        current over baseline, relative to their calibrations, and
+        "status": "slower", "faster", "same",
+        "new" (not in the baseline), "missing" (not in the results) or
+        "error" (failed in the results)
+    """
+    current = results["results"]
+    before = baseline["results"]
+    scale = calibration_scale(results, baseline)
+    comparison = []
+    for name in sorted(set(current) | set(before)):
+        new = current.get(name, {}).get("min")
+        old = before.get(name, {}).get("min")
+        ratio = None
+        if name not in current:
+            status = "missing"
+        elif new is None:
+            status = "error"
+        elif old is None:
+            status = "new"
+        else:
+            ratio = new / (old * scale) if old > 0 else float("inf")
+            if ratio > 1 + tolerance:
+                status = "slower"
+            elif ratio < 1 - tolerance:
+                status = "faster"
+            else:
+                status = "same"
+        comparison.append({
+            "name": name,
+            "baseline": old,
+            "current": new,
+            "ratio": ratio,
+            "status": status,
+        })
+    return comparison
+
+
+def calibration_scale(results: dict, baseline: dict) -> float:
+    """Get how many times slower the machine of `results' is than that of
+    `baseline', by their calibrations. 1 if either has none.
+
+    Args:
+        results (dict): Results of `run_benchmarks'
+        baseline (dict): Earlier results of `run_benchmarks'
+
+    Returns:
+        float: Calibration time of the results over that of the baseline
+    """
+    if "calibration" not in results or "calibration" not in baseline:
+        return 1.0
+    return results["calibration"]["min"] / baseline["calibration"]["min"]
+
+
+def save_results(results: dict, path: str) -> None:
+    """Write results of `run_benchmarks' to a JSON file"""
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> dict:
+    """Read results of `run_benchmarks' from a JSON file"""
+    with open(path) as file:
+        return json.load(file)
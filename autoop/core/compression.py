@@ -0,0 +1,466 @@
+from __future__ import annotations
+
+import io
+import lzma
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from functools import partial
+from itertools import chain
+from typing import BinaryIO, Callable, Iterator, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # Optional, the stdlib codecs are used instead
+    zstandard = None
+
+# Every compressed payload starts with a header of the magic, the id of its
+# codec and the size of the uncompressed data. The first byte is not ASCII,
+# such that text (csv, json) never starts with the magic.
+MAGIC = b"\x93AOZ"
+HEADER = struct.Struct("<4sBQ")
+# Size in the header of data that was compressed as a stream
+UNKNOWN_SIZE = 2 ** 64 - 1
+
+
+class Codec(ABC):
+    """Base class for the compression algorithms of stored data."""
+
+    # Identifies the codec in the header, must be unique and never change
+    id: int = 0
+
+    @abstractmethod
+    def compressor(self) -> object:
+        """Get a new streaming compressor, with `compress(chunk) -> bytes'
+        and `flush() -> bytes' like zlib.compressobj."""
+        pass
+
+    @abstractmethod
+    def decompressor(self) -> object:
+        """Get a new streaming decompressor, with `decompress(chunk) ->
+        bytes' like zlib.decompressobj."""
+        pass
+
+    def decompress(
+        self, data: Union[bytes, memoryview], size: Optional[int]
+    ) -> bytes:
+        """Decompress data. Codecs that can allocate the output at once
+        when the size is known should override this.
+
+        Args:
+            data (Union[bytes, memoryview]): Compressed data, without the
+                header
+            size (int, optional): Size of the uncompressed data, None if
+                it is not known
+
+        Returns:
+            bytes: The uncompressed data
+        """
+        return self.decompressor().decompress(data)
+
+
+class StoredCodec(Codec):
+    """No compression. Only used for data that would be mistaken for
+    compressed data because it starts with the magic."""
+
+    id = 0
+
+    def compressor(self) -> object:
+        """Get a compressor that passes the data through"""
+        return _PassThrough()
+
+    def decompressor(self) -> object:
+        """Get a decompressor that passes the data through"""
+        return _PassThrough()
+
+
+class _PassThrough:
+    def compress(self, data: memoryview) -> bytes:
+        return bytes(data)
+
+    def decompress(self, data: memoryview) -> bytes:
+        return bytes(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class ZlibCodec(Codec):
+    """Deflate of the standard library. Fast and always available."""
+
+    id = 1
+
+    def __init__(self, level: int = 6) -> None:
+        """Create the codec.
+
+        Args:
+            level (int): Compression level from 1 (fast) to 9 (small).
+                Defaults to 6
+        """
+        self._level = level
+
+    def compressor(self) -> object:
+        """Get a zlib compressobj"""
+        return zlib.compressobj(self._level)
+
+    def decompressor(self) -> object:
+        """Get a zlib decompressobj"""
+        return zlib.decompressobj()
+
+    def decompress(
+        self, data: Union[bytes, memoryview], size: Optional[int]
+    ) -> bytes:
+        """Decompress into a buffer of exactly the uncompressed size"""
+        if size is None:
+            return zlib.decompress(data)
+        return zlib.decompress(data, bufsize=max(size, 1))
+
+
+class LZMACodec(Codec):
+    """LZMA (xz) of the standard library. Smaller but a lot slower than
+    zlib, for data that is written once and rarely read."""
+
+    id = 2
+
+    def __init__(self, preset: int = 6) -> None:
+        """Create the codec.
+
+        Args:
+            preset (int): Compression preset from 0 (fast) to 9 (small).
+                Defaults to 6
+        """
+        self._preset = preset
+
+    def compressor(self) -> object:
+        """Get an LZMACompressor"""
+        return lzma.LZMACompressor(preset=self._preset)
+
+    def decompressor(self) -> object:
+        """Get an LZMADecompressor"""
+        return lzma.LZMADecompressor()
+
+
+class ZstdCodec(Codec):
+    """Zstandard, if the zstandard package is installed. About as small as
+    zlib at several times the speed."""
+
+    id = 3
+
+    def __init__(self, level: int = 3) -> None:
+        """Create the codec.
+
+        Args:
+            level (int): Compression level from 1 (fast) to 22 (small).
+                Defaults to 3
+
+        Raises:
+            ImportError: If zstandard is not installed
+        """
+        if zstandard is None:
+            raise ImportError("The zstd codec needs the zstandard package")
+        self._level = level
+
+    def compressor(self) -> object:
+        """Get a zstandard compressobj"""
+        return zstandard.ZstdCompressor(level=self._level).compressobj()
+
+    def decompressor(self) -> object:
+        """Get a zstandard decompressobj"""
+        return zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(
+        self, data: Union[bytes, memoryview], size: Optional[int]
+    ) -> bytes:
+        """Decompress into a buffer of exactly the uncompressed size"""
+        if size is None:  # The frame does not have the size either
+            return self.decompressor().decompress(data)
+        return zstandard.ZstdDecompressor().decompress(
+            data, max_output_size=size
+        )
+
+
+CODECS = {
+    "none": StoredCodec,
+    "zlib": ZlibCodec,
+    "lzma": LZMACodec,
+    "zstd": ZstdCodec,
+}
+
+DEFAULT_CODEC = "zstd" if zstandard is not None else "zlib"
+
+
+def get_codec(name: str) -> Codec:
+    """Factory function to get a codec by name."""
+    if name not in CODECS:
+        raise ValueError(
+            f"{name} is not an available codec. Choose one of "
+            f"{list(CODECS)}"
+        )
+    return CODECS[name]()
+
+
+def compress(
+    data: Union[bytes, memoryview], codec: Codec, chunk_size: int = 1024 ** 2
+) -> bytes:
+    """Compress data and prepend the header.
+
+    Args:
+        data (Union[bytes, memoryview]): Data to compress
+        codec (Codec): Codec to compress with
+        chunk_size (int): Bytes passed to the compressor at once. The data is
+            never copied, only the compressed output is held in memory.
+            Defaults to 1 MiB
+
+    Returns:
+        bytes: Header and compressed data
+    """
+    return b"".join(iter_compress(data, codec, chunk_size))
+
+
+def iter_compress(
+    data: Union[bytes, memoryview], codec: Codec, chunk_size: int = 1024 ** 2
+) -> Iterator[bytes]:
+    """Compress data chunk by chunk, see `compress'.
+
+    Yields:
+        bytes: The header and then consecutive pieces of compressed data
+    """
+    view = memoryview(data).cast("B")
+    yield HEADER.pack(MAGIC, codec.id, len(view))
+    compressor = codec.compressor()
+    for start in range(0, len(view), chunk_size):
+        piece = compressor.compress(view[start:start + chunk_size])
+        if piece:
+            yield piece
+    yield compressor.flush()
+
+
+def is_compressed(data: Union[bytes, memoryview]) -> bool:
+    """Whether data starts with the header of `compress'"""
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def decompress(data: Union[bytes, memoryview]) -> bytes:
+    """Decompress data of `compress'. Data without the header is returned
+    as is, such that uncompressed data can be read the same way.
+
+    Args:
+        data (Union[bytes, memoryview]): Data with header
+
+    Raises:
+        ValueError: If the codec in the header is unknown or unavailable
+
+    Returns:
+        bytes: The uncompressed data
+    """
+    if not is_compressed(data):
+        return data
+    codec, size = _read_header(data)
+    return codec.decompress(memoryview(data)[HEADER.size:], size)
+
+
+def _read_header(
+    header: Union[bytes, memoryview]
+) -> tuple[Codec, Optional[int]]:
+    """Codec and uncompressed size (None if unknown) of a header"""
+    _, id, size = HEADER.unpack_from(header)
+    if size == UNKNOWN_SIZE:
+        size = None
+    for Codec in CODECS.values():
+        if Codec.id == id:
+            try:
+                return Codec(), size
+            except ImportError as error:
+                raise ValueError(
+                    f"Data is compressed with {Codec.__name__}, which is not "
+                    f"available: {error}"
+                ) from error
+    raise ValueError(f"Data is compressed with an unknown codec ({id})")
+
+
+def open_decompressed(
+    source: BinaryIO, chunk_size: int = 1024 ** 2
+) -> BinaryIO:
+    """Read a stream of `compress' or `CompressingWriter' data as its
+    uncompressed data, one chunk at a time. A stream without the header is
+    read as is.
+
+    Args:
+        source (BinaryIO): Stream of the stored data. Closed when the
+            returned stream is closed
+        chunk_size (int): Bytes read from the source at once. Defaults to
+            1 MiB
+
+    Returns:
+        BinaryIO: Stream of the uncompressed data
+    """
+    head = source.read(HEADER.size)
+    if not is_compressed(head):
+        if source.seekable():
+            source.seek(0)
+            return source
+        chunks = chain([head], iter(partial(source.read, chunk_size), b""))
+        return io.BufferedReader(_ChunkReader(chunks, source.close))
+    codec, _ = _read_header(head)
+    decompressor = codec.decompressor()
+    chunks = (
+        decompressor.decompress(chunk)
+        for chunk in iter(partial(source.read, chunk_size), b"")
+    )
+    return io.BufferedReader(_ChunkReader(chunks, source.close))
+
+
+class CompressingWriter(io.RawIOBase):
+    """Stream that compresses what is written to it into another stream,
+    without holding more than one chunk. The header gets `UNKNOWN_SIZE', as
+    the size is only known at the end.
+
+    The codec is chosen from the first `min_size' bytes. Streams that end
+    before that are written as is, like `CompressedStorage.save' does with
+    small payloads. Call `finish' after the last write.
+    """
+
+    def __init__(
+        self,
+        sink: BinaryIO,
+        choose_codec: Callable[[bytes], Optional[Codec]],
+        min_size: int = 1024,
+    ) -> None:
+        """Create the writer.
+
+        Args:
+            sink (BinaryIO): Stream to write the compressed data to
+            choose_codec (Callable[[bytes], Optional[Codec]]): Gets the first
+                bytes and returns the codec, or None to write the data as is
+            min_size (int): Bytes to collect before choosing the codec.
+                Defaults to 1024
+        """
+        self._sink = sink
+        self._choose_codec = choose_codec
+        self._min_size = min_size
+        self._head = bytearray()
+        self._compressor = None
+        self._started = False
+        self._position = 0
+
+    def writable(self) -> bool:
+        """Return True"""
+        return True
+
+    def tell(self) -> int:
+        """Return the number of uncompressed bytes written so far"""
+        return self._position
+
+    def write(self, data: Union[bytes, memoryview]) -> int:
+        """Compress data into the sink.
+
+        Args:
+            data (Union[bytes, memoryview]): Data to write
+
+        Returns:
+            int: Number of bytes written, all of them
+        """
+        view = memoryview(data).cast("B")
+        self._position += len(view)
+        if not self._started:
+            self._head += view
+            if len(self._head) >= self._min_size:
+                self._start(self._choose_codec(bytes(self._head)))
+            return len(view)
+        if self._compressor is None:
+            self._sink.write(view)
+        else:
+            self._sink.write(self._compressor.compress(view))
+        return len(view)
+
+    def finish(self) -> None:
+        """Write the end of the compressed stream to the sink."""
+        if not self._started:
+            self._start(None)
+        if self._compressor is not None:
+            self._sink.write(self._compressor.flush())
+
+    def _start(self, codec: Optional[Codec]) -> None:
+        """Write the collected first bytes with the chosen codec"""
+        self._started = True
+        if codec is None and is_compressed(self._head):
+            codec = StoredCodec()  # Would be decompressed when read
+        if codec is None:
+            self._sink.write(self._head)
+        else:
+            self._compressor = codec.compressor()
+            self._sink.write(HEADER.pack(MAGIC, codec.id, UNKNOWN_SIZE))
+            self._sink.write(self._compressor.compress(self._head))
+        self._head = bytearray()
+
+
+class _ChunkReader(io.RawIOBase):
+    """Raw stream that reads from an iterator of chunks"""
+
+    def __init__(
+        self, chunks: Iterator[bytes], on_close: Callable[[], None]
+    ) -> None:
+        self._chunks = chunks
+        self._on_close = on_close
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: memoryview) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._on_close()
+        super().close()
+
+
+# Payloads that start with these are compressed already and do not shrink
+COMPRESSED_MAGICS = [
+    MAGIC,
+    b"PAR1",  # Parquet
+    b"\x1f\x8b",  # Gzip
+    b"PK\x03\x04",  # Zip
+    b"\xfd7zXZ\x00",  # Xz
+    b"\x28\xb5\x2f\xfd",  # Zstandard
+    b"BZh",  # Bzip2
+    b"\x89PNG",
+    b"\xff\xd8\xff",  # JPEG
+]
+
+
+def payload_kind(data: Union[bytes, memoryview]) -> str:
+    """Guess what kind of artifact data is by its first bytes, such that a
+    codec can be chosen per kind.
+
+    Args:
+        data (Union[bytes, memoryview]): The data
+
+    Returns:
+        str: "compressed" for already compressed formats, "feather" for
+        Arrow files, "pickle" for pickled objects (models, pipelines),
+        "text" for e.g. csv or json and "binary" otherwise
+    """
+    start = bytes(data[:8])
+    if any(start.startswith(magic) for magic in COMPRESSED_MAGICS):
+        return "compressed"
+    if start.startswith(b"ARROW1"):
+        return "feather"
+    if len(start) > 1 and start[0] == 0x80 and 2 <= start[1] <= 5:
+        return "pickle"  # The PROTO opcode of protocol 2 and higher
+    try:
+        bytes(data[:1024]).decode("utf-8")
+    except UnicodeDecodeError as error:
+        # The sample may end in the middle of a character
+        if error.reason != "unexpected end of data":
+            return "binary"
+    return "text"
@@ -1,20 +1,38 @@
+import hashlib
 import json
-from typing import List, Tuple, Union
+import uuid
+from typing import List, Set, Tuple, Union
 
-from autoop.core.storage import Storage
+from autoop.core.storage import NotFoundError, Storage
+
+JOURNAL_KEY = ".journal/wal"
 
 
 class Database:
     """Database class to store json serializable dictionaries"""
 
-    def __init__(self, storage: Storage) -> None:
+    def __init__(self, storage: Storage, compact_every: int = 100) -> None:
         """Database to store json serializable dictionaries.
 
+        Every `set' and `delete' is appended to a write-ahead journal instead
+        of rewriting the whole database. After `compact_every' journaled
+        operations the changed keys are written to their own entry in the
+        storage and the journal is restarted. The journal thus changes with
+        every write, which lets `refresh' skip reloading when nothing was
+        written by another instance.
+
         Args:
             storage (Storage): Storage object representing the place where to
-                               store data"""
+                               store data
+            compact_every (int): Number of journaled operations after which
+                                 the journal is compacted. Defaults to 100"""
         self._storage = storage
+        self._compact_every = compact_every
         self._data = {}
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._journal_length = 0
+        # Hash of the journal as this instance last read or wrote it
+        self._journal_hash = hashlib.sha256()
         self._load()
 
     def set(self, collection: str, id: str, entry: dict) -> dict:
@@ -34,7 +52,8 @@ class Database:
         if not self._data.get(collection, None):
             self._data[collection] = {}
         self._data[collection][id] = entry
-        self._persist()
+        self._journal({"op": "set", "collection": collection, "id": id,
+                       "entry": entry})
         return entry
 
     def get(self, collection: str, id: str) -> Union[dict, None]:
@@ -62,9 +81,10 @@ class Database:
         """
         if not self._data.get(collection, None):
             return
-        if self._data[collection].get(id, None):
-            del self._data[collection][id]
-        self._persist()
+        if id not in self._data[collection]:
+            return
+        del self._data[collection][id]
+        self._journal({"op": "delete", "collection": collection, "id": id})
 
     def list(self, collection: str) -> List[Tuple[str, dict]]:
         """Lists all data in a collection.
@@ -79,37 +99,116 @@ class Database:
             return []
         return [(id, data) for id, data in self._data[collection].items()]
 
-    def refresh(self) -> None:
-        """Refresh the database by loading the data from storage"""
-        self._load()
+    def refresh(self) -> bool:
+        """Refresh the database by loading the data from storage, if another
+        instance wrote to it since this one last read or wrote it. Checking
+        only reads the journal, which is short.
 
-    def _persist(self) -> None:
-        """Persist the data to storage"""
-        for collection, data in self._data.items():
-            if not data:
+        Returns:
+            bool: Whether the data was reloaded
+        """
+        try:
+            journal = self._storage.load(JOURNAL_KEY)
+        except NotFoundError:
+            journal = b""
+        if hashlib.sha256(journal).hexdigest() == (
+            self._journal_hash.hexdigest()
+        ):
+            return False
+        self._load()
+        return True
+
+    def compact(self) -> None:
+        """Write the keys changed since the last compaction to storage and
+        clear the journal.
+
+        The data is refreshed first, such that operations other instances
+        journaled since this one last read the journal are written as well
+        instead of being dropped with the journal."""
+        reloaded = self.refresh()
+        for collection, id in self._dirty:
+            key = f"{collection}/{id}"
+            entry = self._data.get(collection, {}).get(id, None)
+            if entry is not None:
+                self._storage.save(json.dumps(entry).encode(), key)
                 continue
-            for id, item in data.items():
-                self._storage.save(
-                    json.dumps(item).encode(), f"{collection}/{id}"
-                )
-
-        # for things that were deleted, we need to remove them from the storage
-        keys = self._storage.list("")
-        for key in keys:
-            collection, id = key.split("/")[-2:]
-            if not self._data.get(collection, id):
-                self._storage.delete(f"{collection}/{id}")
+            try:
+                self._storage.delete(key)
+            except NotFoundError:
+                pass  # Was set and deleted before it ever got compacted
+        self._dirty = set()
+        # Clear the journal only after the keys are written, such that a
+        # crash during compaction can be recovered by replaying the journal.
+        # The new journal starts with a unique marker, such that it differs
+        # from every earlier journal, see `refresh'.
+        marker = json.dumps({"op": "compacted", "id": uuid.uuid4().hex})
+        marker = (marker + "\n").encode()
+        self._storage.save(marker, JOURNAL_KEY)
+        self._journal_hash = hashlib.sha256(marker)
+        if reloaded:
+            # Let the next `refresh' report the changes of other instances
+            # picked up here, to whoever keeps state derived from the data
+            self._journal_hash = hashlib.sha256()
+        self._journal_length = 0
+
+    def _journal(self, record: dict) -> None:
+        """Append an operation to the journal and compact if the journal
+        became too long.
 
-            # GW: How does this code work, id will always be != None
-            # so nothing gets deleted.
+        Args:
+            record (dict): The operation, with keys "op", "collection", "id"
+                           and for "set" operations also "entry"
+        """
+        # Start on a fresh line, in case a crashed write left a torn line
+        line = ("\n" + json.dumps(record) + "\n").encode()
+        self._storage.append(line, JOURNAL_KEY)
+        self._journal_hash.update(line)
+        self._dirty.add((record["collection"], record["id"]))
+        self._journal_length += 1
+        if self._journal_length >= self._compact_every:
+            self.compact()
+
+    def _replay_journal(self) -> None:
+        """Apply the operations in the journal on top of the loaded data."""
+        try:
+            journal = self._storage.load(JOURNAL_KEY)
+        except NotFoundError:
+            return
+        if not journal.endswith(b"\n"):
+            # Cut off the torn write of a crash at the end of the journal
+            journal = journal[:journal.rfind(b"\n") + 1]
+            self._storage.save(journal, JOURNAL_KEY)
+        self._journal_hash = hashlib.sha256(journal)
+        for line in journal.decode().splitlines():
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn write, later records start on a new line
+            if record["op"] == "compacted":
+                continue  # Marks the start of a new journal
+            collection, id = record["collection"], record["id"]
+            if record["op"] == "set":
+                self._data.setdefault(collection, {})[id] = record["entry"]
+            elif record["op"] == "delete":
+                self._data.get(collection, {}).pop(id, None)
+            self._dirty.add((collection, id))
+            self._journal_length += 1
 
     def _load(self) -> None:
         """Load the data from storage."""
         self._data = {}
+        self._dirty = set()
+        self._journal_length = 0
+        self._journal_hash = hashlib.sha256()
         for key in self._storage.list(""):
             collection, id = key.split("/")[-2:]
+            if f"{collection}/{id}" == JOURNAL_KEY:
+                continue
             data = self._storage.load(f"{collection}/{id}")
             # Ensure the collection exists in the dictionary
             if collection not in self._data:
                 self._data[collection] = {}
             self._data[collection][id] = json.loads(data.decode())
+        self._replay_journal()
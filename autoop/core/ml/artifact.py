@@ -1,23 +1,42 @@
 from __future__ import annotations
 
 import base64
+import io
+from functools import partial
+from typing import BinaryIO, Callable, Optional
 
 
 class Artifact:  # Original had Pydantic
     """Baseclass to store certain assets."""
 
+    # Class attributes such that artifacts pickled before they existed have
+    # them
+    _loader: Optional[Callable[[], bytes]] = None
+    _view_loader: Optional[Callable[[], memoryview]] = None
+    _writer: Optional[Callable[[BinaryIO], object]] = None
+
     def __init__(
         self, *,  # Mandate usage of keywords
         type: str,
         name: str,
         asset_path: str,
-        data: bytes,
+        data: Optional[bytes] = None,
         version: str = "v0.00",
         tags: list[str] = [],
         metadata: dict[str, str] = dict(),
+        loader: Optional[Callable[[], bytes]] = None,
+        view_loader: Optional[Callable[[], memoryview]] = None,
+        writer: Optional[Callable[[BinaryIO], object]] = None,
     ) -> None:
         """Create an artifact object.
 
+        Either `data', `loader' or `writer' must be given. With a loader,
+        the data is only read (and then cached) the first time it is
+        accessed, such that artifacts can be listed without reading their
+        payloads. With a writer, the data is only produced when it is
+        accessed or when the artifact is registered, which streams it to the
+        storage instead of holding it in memory as a whole.
+
         Args:
             type (str): Type of the artifact
             name (str): Name of the artifact
@@ -26,7 +45,21 @@ class Artifact:  # Original had Pydantic
             version (str): Version of the artifact. Default to "v0.00"
             tags (list[str]): Tags of the artifact. Defaults to empy list
             meta_data (str): Metadata. Defaults to empty dictionary
+            loader (Callable[[], bytes]): Function that returns the binary
+                data of the artifact. Defaults to None
+            view_loader (Callable[[], memoryview]): Function that returns a
+                read-only view of the data without copying it, e.g. a memory
+                map, for `read_view'. Defaults to None
+            writer (Callable[[BinaryIO], object]): Function that writes the
+                binary data of the artifact to the file it is given, e.g.
+                `partial(pickle.dump, model)'. Defaults to None
         """
+        if data is None and loader is None and writer is None:
+            raise ValueError(
+                "Artifact needs either data, a loader or a writer"
+            )
+        if loader is None and writer is not None:
+            loader = partial(_write_to_bytes, writer)
         self._type = type
         self._name = name
         self._data = data
@@ -34,6 +67,9 @@ class Artifact:  # Original had Pydantic
         self._version = version
         self._tags = tags
         self._metadata = metadata
+        self._loader = loader
+        self._view_loader = view_loader
+        self._writer = writer
 
     def __str__(self) -> str:
         """Return string with summary artifact data"""
@@ -41,7 +77,7 @@ class Artifact:  # Original had Pydantic
             '{\n'
             f'    "type": "{self.type}",\n'
             f'    "name": "{self.name}"\n'
-            f'    "data": b"{self._print_bytes_data(self.data)}",\n'
+            f'    "data": b"{self._print_bytes_data(self._data)}",\n'
             f'    "asset_path": "{self.asset_path}",\n'
             f'    "version": "{self.version}",\n'
             f'    "tags": "{self.tags}"\n'
@@ -79,6 +115,18 @@ class Artifact:  # Original had Pydantic
         """
         return self.data
 
+    def read_view(self) -> memoryview:
+        """Read the content of the data as a read-only view. Does not copy
+        the data into memory if it is not loaded and the artifact has a
+        view loader.
+
+        Returns:
+            memoryview: View of the data of this artifact
+        """
+        if self._data is None and self._view_loader is not None:
+            return self._view_loader()
+        return memoryview(self.data).toreadonly()
+
     def save(self, binary_string: bytes) -> bytes:
         """Save a binary string as data into this artifact.
 
@@ -132,9 +180,34 @@ class Artifact:  # Original had Pydantic
         this artifact"""
         return self._asset_path
 
+    @property
+    def writer(self) -> Optional[Callable[[BinaryIO], object]]:
+        """Return the function that writes the data of this artifact to a
+        file, if its data is not in memory or stored yet"""
+        if self._data is not None:
+            return None
+        return self._writer
+
+    @property
+    def is_loaded(self) -> bool:
+        """Return whether the byte data is in memory"""
+        return self._data is not None
+
+    @property
+    def data_source(self) -> object:
+        """Return an object that stays the same as long as the data of this
+        artifact does, without loading the data: the loader if the data is
+        read from the storage, otherwise the data itself"""
+        if self._loader is not None:
+            return self._loader
+        return self._data
+
     @property
     def data(self) -> bytes:
-        """Return the byte data of this artifact"""
+        """Return the byte data of this artifact. Loads it on first access
+        if the artifact was created with a loader"""
+        if self._data is None:
+            self._data = self._loader()
         return self._data
 
     @data.setter
@@ -143,6 +216,10 @@ class Artifact:  # Original had Pydantic
         take value input as bytes"""
         if isinstance(value, bytes):
             self._data = value
+            # The stored data is no longer the data of this artifact
+            self._loader = None
+            self._view_loader = None
+            self._writer = None
         else:
             raise AttributeError(
                 f"Invalid type of data. Data must be of type `bytes'. Got "
@@ -150,6 +227,14 @@ class Artifact:  # Original had Pydantic
             )
 
 
+def _write_to_bytes(writer: Callable[[BinaryIO], object]) -> bytes:
+    """Get the data a writer of an artifact writes, for accessing the data
+    of an artifact that was created with a writer."""
+    file = io.BytesIO()
+    writer(file)
+    return file.getvalue()
+
+
 # TODO Make Artifact more strict: it must have everything but data
     # in particullary, it must have an asset_path because that is how a
     # artifact is referenced through
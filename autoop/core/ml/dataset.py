@@ -1,14 +1,125 @@
 from __future__ import annotations
 
-import io
+import threading
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.dataset_format import (
+    DEFAULT_FORMAT,
+    DatasetFormat,
+    detect_format,
+    get_format,
+)
+
+
+class FrameCache:
+    """Process-wide least recently used cache of parsed dataframes, keyed by
+    artifact id and version. Evicts the least recently used frames once the
+    total size exceeds the byte budget.
+
+    Only datasets that read their data from the storage use it, since their
+    id and version identify the data as long as `ArtifactRegistry' evicts
+    replaced artifacts. Two datasets created with different data can have
+    the same id."""
+
+    def __init__(self, max_bytes: int) -> None:
+        """Create an empty cache.
+
+        Args:
+            max_bytes (int): Maximum total size of the cached frames in bytes
+        """
+        self._max_bytes = max_bytes
+        self._frames = OrderedDict()  # key -> (frame, size in bytes)
+        self._size = 0
+        self._lock = threading.Lock()  # Streamlit reruns in several threads
+
+    def get(self, key: Tuple[str, str]) -> Optional[pd.DataFrame]:
+        """Get a frame and mark it as most recently used.
+
+        Args:
+            key (Tuple[str, str]): Artifact id and version
+
+        Returns:
+            Optional[pd.DataFrame]: The frame or None if it is not cached
+        """
+        with self._lock:
+            if key not in self._frames:
+                return None
+            self._frames.move_to_end(key)
+            return self._frames[key][0]
+
+    def put(self, key: Tuple[str, str], frame: pd.DataFrame) -> None:
+        """Cache a frame. Frames larger than the whole budget are skipped.
+
+        Args:
+            key (Tuple[str, str]): Artifact id and version
+            frame (pd.DataFrame): Parsed dataframe
+        """
+        size = int(frame.memory_usage(deep=True).sum())
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._frames[key] = (frame, size)
+            self._size += size
+            while self._size > self._max_bytes:
+                self._pop(next(iter(self._frames)))
+
+    def evict(self, artifact_id: str) -> None:
+        """Remove all cached frames of an artifact.
+
+        Args:
+            artifact_id (str): Id of the artifact
+        """
+        with self._lock:
+            for key in [key for key in self._frames if key[0] == artifact_id]:
+                self._pop(key)
+
+    def _pop(self, key: Tuple[str, str]) -> None:
+        if key in self._frames:
+            self._size -= self._frames.pop(key)[1]
+
+
+_frame_cache: Optional[FrameCache] = None
+
+
+def enable_frame_cache(max_bytes: int = 512 * 1024 ** 2) -> None:
+    """Share parsed dataframes between all Dataset instances of the process.
+
+    Args:
+        max_bytes (int): Byte budget of the cache. Defaults to 512 MiB
+    """
+    global _frame_cache
+    _frame_cache = FrameCache(max_bytes)
+
+
+def disable_frame_cache() -> None:
+    """Disable and clear the process-wide dataframe cache."""
+    global _frame_cache
+    _frame_cache = None
+
+
+def evict_frame_cache(artifact_id: str) -> None:
+    """Drop the cached frames of an artifact whose data has been replaced.
+
+    Args:
+        artifact_id (str): Id of the artifact
+    """
+    if _frame_cache is not None:
+        _frame_cache.evict(artifact_id)
 
 
 class Dataset(Artifact):
-    """Artifact that represents a dataset."""
+    """Artifact that represents a dataset. The parsed dataframe is memoized
+    until the data changes. Do not modify frames returned by `read' in
+    place."""
+
+    # Class attribute such that artifacts promoted to a Dataset also have it
+    _frame: Optional[pd.DataFrame] = None
 
     def __init__(self, **kwargs) -> None:
         """Create a dataset object.
@@ -22,16 +133,20 @@ class Dataset(Artifact):
             meta_data (str): Metadata. Defaults to empty dictionary
         """
         super().__init__(type="dataset", **kwargs)
+        self._frame = None
 
     @staticmethod
     def from_dataframe(
-        data: pd.DataFrame, **kwargs
+        data: pd.DataFrame, format: str = DEFAULT_FORMAT, **kwargs
     ) -> Dataset:
         """Returns a Dataset instance from a panda dataframe.
 
         Args:
             name (str): Name of the dataset artifact
             data (pandas.Dataframe): The pandas dataframe to be stored
+            format (str): Name of the on-disk format, see
+                          `dataset_format.DATASET_FORMATS'. Defaults to
+                          "feather"
             asset_path (str): Path to where the data is stored
             version (str): Version of the dataset artifact. Default to "v0.00"
             tags (list[str]): Tags of the dataset artifact. Defaults to empty
@@ -42,32 +157,145 @@ class Dataset(Artifact):
             Dataset: The created Dataset instance.
         """
         return Dataset(
-            data=data.to_csv(index=False).encode(), **kwargs
+            data=get_format(format).encode(data), **kwargs
         )
 
-    def read(self) -> pd.DataFrame:
+    @property
+    def format(self) -> DatasetFormat:
+        """Return the format the data of this dataset is encoded with"""
+        return detect_format(self.read_view())
+
+    def read(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
         """Read the data from the dataset.
 
+        Args:
+            columns (List[str], optional): Only read these columns. Defaults
+                to all columns.
+
         Returns:
             pd.DataFrame: The panda datafame that was stored in this dataset.
         """
-        bytes = super().read()
-        csv = bytes.decode()
-        return pd.read_csv(io.StringIO(csv))
+        frame = self._cached_frame()
+        if frame is None and columns is not None:
+            # Partial reads are cheap to decode and not worth caching
+            view = self.read_view()
+            return detect_format(view).decode(view, columns)
+        if frame is None:
+            # A view of stored feather data maps the file, so the columns
+            # of the frame are backed by the OS page cache instead of a copy
+            view = self.read_view()
+            frame = detect_format(view).decode(view)
+            self._cache_frame(frame)
+        if columns is not None:
+            return frame[columns]
+        return frame.copy(deep=False)
+
+    def iter_chunks(
+        self, chunk_size: int, columns: Optional[List[str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """Read the data from the dataset in chunks of rows, without
+        decoding all rows at once.
+
+        Args:
+            chunk_size (int): Maximum number of rows per chunk
+            columns (List[str], optional): Only read these columns. Defaults
+                to all columns.
+
+        Yields:
+            pd.DataFrame: Consecutive chunks of rows of the dataset
+        """
+        frame = self._cached_frame()
+        if frame is not None:
+            if columns is not None:
+                frame = frame[columns]
+            for start in range(0, len(frame), chunk_size):
+                yield frame.iloc[start:start + chunk_size]
+            return
+        view = self.read_view()
+        yield from detect_format(view).iter_chunks(view, chunk_size, columns)
+
+    def count_rows(self) -> Optional[int]:
+        """Count the rows of the dataset, if that is possible without
+        decoding them.
+
+        Returns:
+            Optional[int]: The number of rows, or None if the format of the
+                data does not store it, like csv
+        """
+        frame = self._cached_frame()
+        if frame is not None:
+            return len(frame)
+        view = self.read_view()
+        return detect_format(view).count_rows(view)
+
+    def take(
+        self, rows: np.ndarray, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Read only some of the rows of the dataset.
+
+        Args:
+            rows (np.ndarray): Positions of the rows to read
+            columns (List[str], optional): Only read these columns. Defaults
+                to all columns.
+
+        Returns:
+            pd.DataFrame: The rows, in the order of `rows'
+        """
+        frame = self._cached_frame()
+        if frame is None:
+            view = self.read_view()
+            return detect_format(view).take(view, rows, columns)
+        if columns is not None:
+            frame = frame[columns]
+        return frame.iloc[rows].reset_index(drop=True)
 
-    def save(self, data: pd.DataFrame) -> bytes:
+    def save(
+        self, data: pd.DataFrame, format: str = DEFAULT_FORMAT
+    ) -> bytes:
         """Save a panda dataframe into this dataset. Also return the encoded
         version of the dataframe.
 
         Args:
             data (pd.DataFrame): Panda dataframe to be stored.
+            format (str): Name of the on-disk format. Defaults to "feather"
 
         Returns:
             bytes: The bytes that where stored.
         """
-        bytes = data.to_csv(index=False).encode()
+        bytes = get_format(format).encode(data)
         return super().save(bytes)
 
+    @property
+    def data(self) -> bytes:
+        """Return the byte data of this dataset"""
+        return Artifact.data.fget(self)
+
+    @data.setter
+    def data(self, value: bytes) -> None:
+        """Set the byte data of the dataset and invalidate the parsed
+        dataframe"""
+        Artifact.data.fset(self, value)
+        self._frame = None
+        evict_frame_cache(self.id)
+
+    def _cached_frame(self) -> Optional[pd.DataFrame]:
+        """Get the parsed dataframe of this instance, or of the process-wide
+        cache if that is enabled and the data is read from the storage."""
+        if self._frame is None and self._shares_frame:
+            self._frame = _frame_cache.get((self.id, self.version))
+        return self._frame
+
+    def _cache_frame(self, frame: pd.DataFrame) -> None:
+        self._frame = frame
+        if self._shares_frame:
+            _frame_cache.put((self.id, self.version), frame)
+
+    @property
+    def _shares_frame(self) -> bool:
+        """Whether the frame goes in the process-wide cache, which is only
+        for datasets whose data is loaded from the storage"""
+        return _frame_cache is not None and self._loader is not None
+
 
 # Remarks:
 # read and save were already implemented
@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import io
+import shutil
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+
+class DatasetFormat(ABC):
+    """Base class for the on-disk encodings of a dataset."""
+
+    # Bytes every encoded dataset of this format starts with. Used to detect
+    # the format of stored data.
+    magic: bytes = b""
+
+    @abstractmethod
+    def encode(self, data: pd.DataFrame) -> bytes:
+        """Encode a dataframe. Column names are stored as text, like csv
+        always did, so names that are not strings come back as strings.
+
+        Args:
+            data (pd.DataFrame): Dataframe to encode
+
+        Returns:
+            bytes: The encoded dataframe
+        """
+        pass
+
+    @abstractmethod
+    def decode(
+        self, data: bytes, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Decode a dataframe.
+
+        Args:
+            data (bytes): Encoded dataframe
+            columns (List[str], optional): Only decode these columns. Defaults
+                to all columns.
+
+        Returns:
+            pd.DataFrame: The decoded dataframe
+        """
+        pass
+
+    def iter_chunks(
+        self, data: bytes, chunk_size: int, columns: Optional[List[str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """Decode a dataframe in chunks of rows. Formats that can decode
+        part of the rows should override this, the default decodes
+        everything first.
+
+        Args:
+            data (bytes): Encoded dataframe
+            chunk_size (int): Maximum number of rows per chunk
+            columns (List[str], optional): Only decode these columns. Defaults
+                to all columns.
+
+        Yields:
+            pd.DataFrame: Consecutive chunks of rows
+        """
+        frame = self.decode(data, columns)
+        for start in range(0, len(frame), chunk_size):
+            yield frame.iloc[start:start + chunk_size]
+
+    def count_rows(self, data: bytes) -> Optional[int]:
+        """Count the rows of an encoded dataframe, if that is possible
+        without decoding them. Formats that store the number of rows should
+        override this.
+
+        Args:
+            data (bytes): Encoded dataframe
+
+        Returns:
+            Optional[int]: The number of rows, or None if they would have to be
+                decoded to count them
+        """
+        return None
+
+    def take(
+        self,
+        data: bytes,
+        rows: np.ndarray,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Decode only some of the rows of a dataframe. Formats that can
+        pick out rows without converting all of them to pandas should
+        override this, the default decodes everything first.
+
+        Args:
+            data (bytes): Encoded dataframe
+            rows (np.ndarray): Positions of the rows to decode
+            columns (List[str], optional): Only decode these columns. Defaults
+                to all columns.
+
+        Returns:
+            pd.DataFrame: The rows, in the order of `rows'
+        """
+        frame = self.decode(data, columns)
+        return frame.iloc[rows].reset_index(drop=True)
+
+    def write_batches(
+        self,
+        schema: pa.Schema,
+        batches: Iterable[pa.RecordBatch],
+        sink: BinaryIO,
+    ) -> None:
+        """Encode a dataset given as arrow batches of rows into a stream,
+        one batch at a time.
+
+        Args:
+            schema (pa.Schema): Schema of the batches
+            batches (Iterable[pa.RecordBatch]): Consecutive batches of rows
+            sink (BinaryIO): Stream to write the encoded dataset to
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} can not be written in batches"
+        )
+
+
+class CSVFormat(DatasetFormat):
+    """Plain text comma separated values. Used to be the only format, so
+    this is the fallback for data without a known magic."""
+
+    def encode(self, data: pd.DataFrame) -> bytes:
+        """Encode a dataframe as utf-8 csv"""
+        return data.to_csv(index=False).encode()
+
+    def decode(
+        self, data: bytes, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Parse csv data. Parses the bytes directly instead of decoding them
+        to a string first."""
+        return pd.read_csv(io.BytesIO(data), usecols=columns)
+
+    def iter_chunks(
+        self, data: bytes, chunk_size: int, columns: Optional[List[str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """Parse only one chunk of rows at a time"""
+        with pd.read_csv(
+            io.BytesIO(data), usecols=columns, chunksize=chunk_size
+        ) as reader:
+            yield from reader
+
+    def write_batches(
+        self,
+        schema: pa.Schema,
+        batches: Iterable[pa.RecordBatch],
+        sink: BinaryIO,
+    ) -> None:
+        """Write the batches as csv"""
+        with pcsv.CSVWriter(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+
+
+class FeatherFormat(DatasetFormat):
+    """Uncompressed Arrow IPC (Feather v2) file. The columns are stored
+    as contiguous buffers, such that reading maps them directly onto the
+    stored bytes instead of copying or parsing them."""
+
+    magic = b"ARROW1"
+
+    def encode(self, data: pd.DataFrame) -> bytes:
+        """Encode a dataframe as an uncompressed arrow file. Falls back to
+        csv for dataframes arrow can not store, see `to_table'."""
+        table = to_table(data)
+        if table is None:
+            return CSVFormat().encode(data)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    def decode(
+        self, data: bytes, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Read the arrow file without copying the column buffers."""
+        table = self.read_table(data)
+        if columns is not None:
+            table = table.select(columns)
+        # split_blocks keeps numerical columns as views on the arrow buffers
+        # instead of consolidating them into a new 2-D block.
+        return table.to_pandas(split_blocks=True)
+
+    def iter_chunks(
+        self, data: bytes, chunk_size: int, columns: Optional[List[str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """Convert one zero-copy slice of rows at a time"""
+        table = self.read_table(data)
+        if columns is not None:
+            table = table.select(columns)
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            yield batch.to_pandas(split_blocks=True)
+
+    def count_rows(self, data: bytes) -> int:
+        """Get the number of rows without converting any column"""
+        return self.read_table(data).num_rows
+
+    def take(
+        self,
+        data: bytes,
+        rows: np.ndarray,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Copy only the requested rows out of the arrow buffers"""
+        table = self.read_table(data)
+        if columns is not None:
+            table = table.select(columns)
+        return table.take(rows).to_pandas()
+
+    def write_batches(
+        self,
+        schema: pa.Schema,
+        batches: Iterable[pa.RecordBatch],
+        sink: BinaryIO,
+    ) -> None:
+        """Write the batches as an uncompressed arrow file"""
+        with pa.ipc.new_file(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+
+    @staticmethod
+    def read_table(data: bytes) -> pa.Table:
+        """Get a zero-copy arrow table backed by `data'.
+
+        Args:
+            data (bytes): Bytes-like object with an encoded arrow file
+
+        Returns:
+            pa.Table: Table referencing the buffers inside `data'
+        """
+        return pa.ipc.open_file(pa.py_buffer(data)).read_all()
+
+
+class ParquetFormat(DatasetFormat):
+    """Compressed columnar parquet file. Smaller on disk than feather but
+    has to be decompressed on every read."""
+
+    magic = b"PAR1"
+
+    def encode(self, data: pd.DataFrame) -> bytes:
+        """Encode a dataframe as a parquet file. Falls back to csv for
+        dataframes arrow can not store, see `to_table'."""
+        table = to_table(data)
+        if table is None:
+            return CSVFormat().encode(data)
+        sink = pa.BufferOutputStream()
+        pq.write_table(table, sink)
+        return sink.getvalue().to_pybytes()
+
+    def decode(
+        self, data: bytes, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Read only the requested columns of the parquet file"""
+        table = pq.read_table(pa.BufferReader(data), columns=columns)
+        return table.to_pandas(split_blocks=True)
+
+    def iter_chunks(
+        self, data: bytes, chunk_size: int, columns: Optional[List[str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """Decompress one batch of rows at a time"""
+        file = pq.ParquetFile(pa.BufferReader(data))
+        for batch in file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas(split_blocks=True)
+
+    def count_rows(self, data: bytes) -> int:
+        """Get the number of rows from the file metadata"""
+        return pq.ParquetFile(pa.BufferReader(data)).metadata.num_rows
+
+    def take(
+        self,
+        data: bytes,
+        rows: np.ndarray,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Decompress the columns, but convert only the requested rows to
+        pandas"""
+        table = pq.read_table(pa.BufferReader(data), columns=columns)
+        return table.take(rows).to_pandas()
+
+    def write_batches(
+        self,
+        schema: pa.Schema,
+        batches: Iterable[pa.RecordBatch],
+        sink: BinaryIO,
+    ) -> None:
+        """Write the batches as a parquet file, a row group per batch"""
+        with pq.ParquetWriter(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+
+
+def to_table(data: pd.DataFrame) -> Optional[pa.Table]:
+    """Convert a dataframe to an arrow table, with the column names as
+    text.
+
+    Args:
+        data (pd.DataFrame): Dataframe to convert
+
+    Returns:
+        Optional[pa.Table]: The table, or None if a column can not be given a
+            single arrow type, e.g. because it mixes numbers and text. Csv
+            stores those as text, like it always did
+    """
+    try:
+        return pa.Table.from_pandas(data, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+
+
+DATASET_FORMATS = {
+    "csv": CSVFormat,
+    "feather": FeatherFormat,
+    "parquet": ParquetFormat,
+}
+
+DEFAULT_FORMAT = "feather"
+
+
+def get_format(name: str) -> DatasetFormat:
+    """Factory function to get a dataset format by name."""
+    if name not in DATASET_FORMATS:
+        raise ValueError(
+            f"{name} is not an available dataset format. Choose one of "
+            f"{list(DATASET_FORMATS)}"
+        )
+    return DATASET_FORMATS[name]()
+
+
+def detect_format(data: bytes) -> DatasetFormat:
+    """Detect the format of encoded dataset by its magic bytes. Data without
+    a known magic is assumed to be csv.
+
+    Args:
+        data (bytes): Encoded dataset
+
+    Returns:
+        DatasetFormat: The format `data' is encoded with
+    """
+    for format in DATASET_FORMATS.values():
+        if format.magic and bytes(data[:len(format.magic)]) == format.magic:
+            return format()
+    return CSVFormat()
+
+
+def convert_csv(
+    source: BinaryIO,
+    sink: BinaryIO,
+    format: str = DEFAULT_FORMAT,
+    block_size: int = 16 * 1024 ** 2,
+) -> None:
+    """Convert a csv stream into a dataset of `format', parsing one block
+    of rows at a time, such that the whole csv is never in memory.
+
+    The types of the columns are inferred from the first block. Dates and
+    times are kept as text, like `CSVFormat.decode' does, if the source is
+    seekable.
+
+    Args:
+        source (BinaryIO): Stream of csv data
+        sink (BinaryIO): Stream to write the dataset to
+        format (str): Name of the format, see `DATASET_FORMATS'. Defaults to
+            "feather"
+        block_size (int): Bytes of csv parsed at once. Defaults to 16 MiB
+
+    Raises:
+        ValueError: If the csv can not be parsed, e.g. because a later block
+            does not fit the types inferred from the first block
+    """
+    if format == "csv":
+        shutil.copyfileobj(source, sink)
+        return
+    read_options = pcsv.ReadOptions(block_size=block_size)
+    reader = pcsv.open_csv(source, read_options=read_options)
+    temporal = [
+        field.name for field in reader.schema
+        if pa.types.is_temporal(field.type)
+    ]
+    if temporal and source.seekable():
+        reader.close()
+        source.seek(0)
+        reader = pcsv.open_csv(
+            source,
+            read_options=read_options,
+            convert_options=pcsv.ConvertOptions(
+                column_types={name: pa.string() for name in temporal}
+            ),
+        )
+    with reader:
+        get_format(format).write_batches(reader.schema, reader, sink)
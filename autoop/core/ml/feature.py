@@ -27,6 +27,43 @@ class Feature:
         )
 
 
+class InferredFeature(Feature):
+    """Feature whose type was inferred from part of the rows of a dataset."""
+    def __init__(
+        self, type: str, name: str, confidence: float, rows_checked: int
+    ) -> None:
+        """Create an inferred feature.
+
+        Args:
+            type (str): Either "numerical" or "categorical".
+            name (str): Description of this feature. E.g. age.
+            confidence (float): Probability in [0, 1] that the type holds for
+                the rows that were not checked.
+            rows_checked (int): Number of rows the type was inferred from.
+        """
+        super().__init__(type=type, name=name)
+        self._confidence = confidence
+        self._rows_checked = rows_checked
+
+    @property
+    def confidence(self) -> float:
+        """Get the confidence."""
+        return self._confidence
+
+    @property
+    def rows_checked(self) -> int:
+        """Get the number of checked rows."""
+        return self._rows_checked
+
+    def __str__(self) -> str:
+        """String representation of the object."""
+        return (
+            f"Type: {self._type}, Name: {self._name}, "
+            f"Confidence: {self._confidence:.3f} "
+            f"({self._rows_checked} rows)\n"
+        )
+
+
 # Reason:
 # type and name have getters because they are accesed in the tests.
 
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from abc import ABC
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from autoop.core.ml.artifact import Artifact
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class StageEvent:
+    """Measurements of one run of a stage, e.g. "train" of a pipeline."""
+
+    def __init__(
+        self,
+        stage: str,
+        start: float,
+        wall_time: float,
+        cpu_time: float,
+        peak_traced_memory: Optional[int] = None,
+        max_rss: Optional[int] = None,
+    ) -> None:
+        """Create an event.
+
+        Args:
+            stage (str): Name of the stage
+            start (float): Unix time in seconds the stage started at
+            wall_time (float): Seconds the stage took
+            cpu_time (float): Seconds of CPU time this process spent in the
+                stage, over all its threads
+            peak_traced_memory (int, optional): Most bytes allocated by
+                Python at once during the stage, if tracemalloc traced it
+            max_rss (int, optional): Most bytes of memory the process has
+                held so far (the high-water mark, which may be of an earlier
+                stage), if the platform reports it
+        """
+        self._stage = stage
+        self._start = start
+        self._wall_time = wall_time
+        self._cpu_time = cpu_time
+        self._peak_traced_memory = peak_traced_memory
+        self._max_rss = max_rss
+
+    @property
+    def stage(self) -> str:
+        """Return the name of the stage"""
+        return self._stage
+
+    @property
+    def start(self) -> float:
+        """Return the unix time the stage started at"""
+        return self._start
+
+    @property
+    def wall_time(self) -> float:
+        """Return the seconds the stage took"""
+        return self._wall_time
+
+    @property
+    def cpu_time(self) -> float:
+        """Return the seconds of CPU time spent in the stage"""
+        return self._cpu_time
+
+    @property
+    def peak_traced_memory(self) -> Optional[int]:
+        """Return the peak bytes allocated by Python during the stage"""
+        return self._peak_traced_memory
+
+    @property
+    def max_rss(self) -> Optional[int]:
+        """Return the high-water mark of the process memory in bytes"""
+        return self._max_rss
+
+    def to_dict(self) -> dict:
+        """Return the event as a JSON serializable dictionary"""
+        return {
+            "stage": self.stage,
+            "start": self.start,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "peak_traced_memory": self.peak_traced_memory,
+            "max_rss": self.max_rss,
+        }
+
+
+class StageHook(ABC):
+    """Receives the events of an `Instrumentation', e.g. to forward them to
+    another collector. Override the methods of interest."""
+
+    def on_stage_start(self, stage: str) -> None:
+        """Called when a stage starts.
+
+        Args:
+            stage (str): Name of the stage
+        """
+        pass
+
+    def on_stage_end(self, event: StageEvent) -> None:
+        """Called when a stage ends, also if it raised.
+
+        Args:
+            event (StageEvent): Measurements of the stage
+        """
+        pass
+
+
+class Instrumentation:
+    """Measures the wall time, CPU time and memory of stages and passes the
+    events to hooks.
+
+    Example:
+        instrumentation = Instrumentation(trace_memory=True)
+        with instrumentation.stage("train"):
+            model.fit(X, y)
+        instrumentation.events[-1].wall_time
+    """
+
+    def __init__(
+        self, hooks: List[StageHook] = [], trace_memory: bool = False
+    ) -> None:
+        """Create an instrumentation without events.
+
+        Args:
+            hooks (List[StageHook]): Hooks to pass the events to. Defaults
+                to none
+            trace_memory (bool): Whether to measure the peak memory Python
+                allocates in each stage with tracemalloc, which slows down
+                allocations a lot. Defaults to False
+        """
+        self._hooks = list(hooks)
+        self._trace_memory = trace_memory
+        self._events = []
+        self._lock = threading.Lock()
+
+    @property
+    def events(self) -> List[StageEvent]:
+        """Return all events so far, in the order the stages ended"""
+        return list(self._events)
+
+    def add_hook(self, hook: StageHook) -> None:
+        """Pass the events of later stages to `hook' as well."""
+        self._hooks.append(hook)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the body as stage `name'. Stages should not be nested
+        when tracing memory, since tracemalloc has one peak.
+
+        Args:
+            name (str): Name of the stage
+        """
+        for hook in self._hooks:
+            hook.on_stage_start(name)
+        started_tracing = False
+        if self._trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+        start = time.time()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            cpu_time = time.process_time() - cpu_start
+            wall_time = time.perf_counter() - wall_start
+            peak = None
+            if self._trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+            event = StageEvent(
+                name, start, wall_time, cpu_time, peak, _max_rss()
+            )
+            with self._lock:
+                self._events.append(event)
+            for hook in self._hooks:
+                hook.on_stage_end(event)
+
+    def summary(
+        self, events: Optional[List[StageEvent]] = None
+    ) -> Dict[str, dict]:
+        """Add up the measurements of each stage.
+
+        Args:
+            events (List[StageEvent], optional): Events to summarize.
+                Defaults to all events
+
+        Returns:
+            Dict[str, dict]: For each stage, in order of the first event, the
+            total "wall_time" and "cpu_time", the number of "calls" and the
+            largest "peak_traced_memory" and "max_rss" (None if not measured)
+        """
+        if events is None:
+            events = self.events
+        summary = {}
+        for event in events:
+            stage = summary.setdefault(event.stage, {
+                "wall_time": 0.0,
+                "cpu_time": 0.0,
+                "calls": 0,
+                "peak_traced_memory": None,
+                "max_rss": None,
+            })
+            stage["wall_time"] += event.wall_time
+            stage["cpu_time"] += event.cpu_time
+            stage["calls"] += 1
+            for key in ("peak_traced_memory", "max_rss"):
+                value = getattr(event, key)
+                if value is not None:
+                    stage[key] = max(stage[key] or 0, value)
+        return summary
+
+    def to_json(self) -> str:
+        """Return all events as a JSON list of `StageEvent.to_dict'"""
+        return json.dumps([event.to_dict() for event in self.events])
+
+    def to_chrome_trace(self) -> str:
+        """Return all events in the Chrome trace event format, which e.g.
+        chrome://tracing and Perfetto can show as a timeline."""
+        pid = os.getpid()
+        trace = []
+        for event in self.events:
+            trace.append({
+                "name": event.stage,
+                "cat": "pipeline",
+                "ph": "X",  # A complete event, with a duration
+                "ts": event.start * 1e6,  # Microseconds
+                "dur": event.wall_time * 1e6,
+                "pid": pid,
+                "tid": 0,
+                "args": {
+                    "cpu_time": event.cpu_time,
+                    "peak_traced_memory": event.peak_traced_memory,
+                    "max_rss": event.max_rss,
+                },
+            })
+        return json.dumps({"traceEvents": trace, "displayTimeUnit": "ms"})
+
+    def to_artifact(
+        self,
+        name: str,
+        asset_path: str,
+        format: str = "json",
+        **kwargs
+    ) -> Artifact:
+        """Get an artifact of type "trace" with all events, such that they
+        can be saved in the artifact registry.
+
+        Args:
+            name (str): Name of the artifact
+            asset_path (str): Path to where the data is stored
+            format (str): "json" for `to_json' or "chrome" for
+                `to_chrome_trace'. Defaults to "json"
+            version (str): Version of the artifact. Default to "v0.00"
+            tags (list[str]): Tags of the artifact. Defaults to empy list
+
+        Raises:
+            ValueError: If the format is unknown
+
+        Returns:
+            Artifact: The trace
+        """
+        if format == "json":
+            data = self.to_json()
+        elif format == "chrome":
+            data = self.to_chrome_trace()
+        else:
+            raise ValueError(
+                f"{format} is not a trace format. Choose json or chrome"
+            )
+        return Artifact(
+            type="trace",
+            name=name,
+            data=data.encode(),
+            asset_path=asset_path,
+            metadata={"format": format},
+            **kwargs
+        )
+
+
+def _max_rss() -> Optional[int]:
+    """High-water mark of the memory of this process in bytes"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
@@ -1,4 +1,8 @@
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
+from functools import cached_property
+from typing import Iterable, List, Set, Tuple
 
 import numpy as np
 
@@ -10,14 +14,58 @@ class Metric(ABC):
     # remember: metrics take ground truth and prediction
     # as input and return a real number
 
-    @abstractmethod
+    # Which statistics of MetricContext the metric reads, either
+    # "classification" or "regression"
+    statistics: str = ""
+    # Whether a higher value is a better model, used to rank models
+    greater_is_better: bool = True
+
+    def __init__(self) -> None:
+        """Initialize the metric with an empty accumulator"""
+        self._running = RunningMetricContext({self.statistics})
+
     def __call__(self, ground_truth: np.ndarray,
                  predictions: np.ndarray) -> float:
         """Take ground truth as np ndarray
         and predictions  as np ndarray,
         return metric value as float"""
+        return self.evaluate(MetricContext(ground_truth, predictions))
+
+    @abstractmethod
+    def evaluate(self, context: MetricContext) -> float:
+        """Compute the metric from the statistics in a context. Evaluate
+        several metrics on the same context to compute the statistics once.
+
+        Args:
+            context (MetricContext): Statistics of the ground truth and
+                predictions
+
+        Returns:
+            float: Value of the metric
+        """
         pass
 
+    def update(
+        self, ground_truth: np.ndarray, predictions: np.ndarray
+    ) -> None:
+        """Accumulate the statistics of a batch. Together with `result' this
+        evaluates the metric over data that does not fit in memory.
+
+        Args:
+            ground_truth (np.ndarray): Ground truth of the batch
+            predictions (np.ndarray): Predictions of the batch
+        """
+        self._running.update(ground_truth, predictions)
+
+    def result(self) -> float:
+        """Get the value of the metric over all batches passed to `update'
+        since the last `reset'."""
+        return self.evaluate(self._running)
+
+    def reset(self) -> None:
+        """Forget the batches passed to `update'."""
+        self._running = RunningMetricContext({self.statistics})
+
     def to_string(self) -> str:
         """Return class string"""
         try:
@@ -34,156 +82,300 @@ class Metric(ABC):
 # method
 
 
+def confusion_matrix(
+    ground_truth: np.ndarray, predictions: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Count how often each ground truth label is predicted as each label.
+    Labels are either scalars or rows, e.g. one-hot encodings.
+
+    Args:
+        ground_truth (np.ndarray): Labels of shape (N,) or (N, ...)
+        predictions (np.ndarray): Labels with the same shape
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The confusion matrix with the ground
+            truth labels as rows and the predicted labels as columns, and
+            the sorted unique labels that index it.
+    """
+    ground_truth = np.asarray(ground_truth)
+    predictions = np.asarray(predictions)
+    n = len(ground_truth)
+    if ground_truth.ndim > 1 or predictions.ndim > 1:
+        # Compare whole rows, such that a one-hot row is one label
+        ground_truth = ground_truth.reshape(n, -1)
+        predictions = predictions.reshape(len(predictions), -1)
+    labels, inverse = _unique_labels(
+        np.concatenate([ground_truth, predictions])
+    )
+    k = len(labels)
+    counts = np.bincount(inverse[:n] * k + inverse[n:], minlength=k * k)
+    return counts.reshape(k, k), labels
+
+
+def _unique_labels(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted unique scalar or row labels and the index of each label in
+    them."""
+    unique, inverse = np.unique(
+        labels, axis=0 if labels.ndim > 1 else None, return_inverse=True
+    )
+    return unique, inverse.reshape(-1)
+
+
+class MetricContext:
+    """Sufficient statistics of one pair of ground truth and predictions.
+    Each statistic is computed the first time a metric needs it and then
+    shared by all metrics evaluated on this context."""
+
+    def __init__(
+        self, ground_truth: np.ndarray, predictions: np.ndarray
+    ) -> None:
+        """Create a context for a pair of ground truth and predictions.
+
+        Args:
+            ground_truth (np.ndarray): The ground truth
+            predictions (np.ndarray): The predictions
+        """
+        self._ground_truth = np.asarray(ground_truth)
+        self._predictions = np.asarray(predictions)
+        same_size = self._predictions.size == self._ground_truth.size
+        if same_size and self._predictions.shape != self._ground_truth.shape:
+            # E.g. sklearn regressors predict (N,) for a target of (N, 1),
+            # which would broadcast to (N, N) residuals
+            self._predictions = self._predictions.reshape(
+                self._ground_truth.shape
+            )
+
+    @property
+    def n_predictions(self) -> int:
+        """Number of predictions"""
+        return len(self._predictions)
+
+    @cached_property
+    def confusion_matrix(self) -> np.ndarray:
+        """Confusion matrix with ground truth labels as rows and predicted
+        labels as columns, see `confusion_matrix'"""
+        matrix, _ = confusion_matrix(self._ground_truth, self._predictions)
+        return matrix
+
+    @cached_property
+    def _residuals(self) -> np.ndarray:
+        return self._predictions - self._ground_truth
+
+    @cached_property
+    def n_residuals(self) -> int:
+        """Number of elements of predictions - ground truth"""
+        return self._residuals.size
+
+    @cached_property
+    def sum_squared_residuals(self) -> float:
+        """Sum of (predictions - ground truth) ** 2"""
+        return np.sum(self._residuals**2)
+
+    @cached_property
+    def sum_absolute_residuals(self) -> float:
+        """Sum of |predictions - ground truth|"""
+        return np.sum(np.abs(self._residuals))
+
+    @cached_property
+    def total_sum_of_squares(self) -> float:
+        """Sum of squared deviations of the ground truth from its mean"""
+        ground_mean = np.mean(self._ground_truth)
+        return np.sum((self._ground_truth - ground_mean)**2)
+
+
+class RunningMetricContext:
+    """The statistics of MetricContext accumulated over batches, in constant
+    memory. Offers the same statistics, such that metrics can evaluate on
+    either."""
+
+    def __init__(
+        self, statistics: Set[str] = {"classification", "regression"}
+    ) -> None:
+        """Create an empty context.
+
+        Args:
+            statistics (Set[str]): Which statistics to accumulate,
+                "classification" for the confusion matrix and/or "regression"
+                for the residual sums. Defaults to both.
+        """
+        self._statistics = set(statistics)
+        self.n_predictions = 0
+        # Classification
+        self._labels = None
+        self._confusion_matrix = np.zeros((0, 0), dtype=np.int64)
+        # Regression
+        self.n_residuals = 0
+        self.sum_squared_residuals = 0.0
+        self.sum_absolute_residuals = 0.0
+        self._n_ground_truth = 0
+        self._ground_mean = 0.0
+        self._ground_m2 = 0.0
+
+    @property
+    def confusion_matrix(self) -> np.ndarray:
+        """Confusion matrix of all batches"""
+        return self._confusion_matrix
+
+    @property
+    def total_sum_of_squares(self) -> float:
+        """Sum of squared deviations of the ground truth from its mean"""
+        return self._ground_m2
+
+    def update(
+        self, ground_truth: np.ndarray, predictions: np.ndarray
+    ) -> None:
+        """Add the statistics of a batch.
+
+        Args:
+            ground_truth (np.ndarray): Ground truth of the batch
+            predictions (np.ndarray): Predictions of the batch
+        """
+        batch = MetricContext(ground_truth, predictions)
+        if batch.n_predictions == 0:
+            return
+        self.n_predictions += batch.n_predictions
+        if "classification" in self._statistics:
+            self._merge_confusion_matrix(
+                *confusion_matrix(ground_truth, predictions)
+            )
+        if "regression" in self._statistics:
+            self.n_residuals += batch.n_residuals
+            self.sum_squared_residuals += batch.sum_squared_residuals
+            self.sum_absolute_residuals += batch.sum_absolute_residuals
+            self._merge_ground_truth_moments(
+                np.size(ground_truth),
+                np.mean(ground_truth),
+                batch.total_sum_of_squares,
+            )
+
+    def _merge_confusion_matrix(
+        self, matrix: np.ndarray, labels: np.ndarray
+    ) -> None:
+        """Add a confusion matrix whose labels may differ from the labels so
+        far."""
+        if self._labels is None:
+            self._labels, self._confusion_matrix = labels, matrix
+            return
+        n_old = len(self._labels)
+        self._labels, inverse = _unique_labels(
+            np.concatenate([self._labels, labels])
+        )
+        old, new = inverse[:n_old], inverse[n_old:]
+        k = len(self._labels)
+        merged = np.zeros((k, k), dtype=np.int64)
+        merged[np.ix_(old, old)] += self._confusion_matrix
+        merged[np.ix_(new, new)] += matrix
+        self._confusion_matrix = merged
+
+    def _merge_ground_truth_moments(
+        self, n: int, mean: float, m2: float
+    ) -> None:
+        """Merge the count, mean and sum of squared deviations of a batch
+        into the running ones (Welford's algorithm, batched as by Chan et
+        al.), which stays accurate where summing squares would not."""
+        if n == 0:
+            return
+        total = self._n_ground_truth + n
+        delta = mean - self._ground_mean
+        self._ground_mean += delta * n / total
+        self._ground_m2 += m2 + delta**2 * self._n_ground_truth * n / total
+        self._n_ground_truth = total
+
+
+def evaluate_batches(
+    metrics: List[Metric],
+    batches: Iterable[Tuple[np.ndarray, np.ndarray]],
+) -> List[Tuple[Metric, float]]:
+    """Evaluate metrics over batches of (ground truth, predictions), e.g. a
+    generator over chunks of a dataset. The statistics are accumulated once
+    for all metrics.
+
+    Args:
+        metrics (List[Metric]): Metrics to evaluate
+        batches (Iterable[Tuple[np.ndarray, np.ndarray]]): Pairs of
+            ground truth and predictions
+
+    Returns:
+        List[Tuple[Metric, float]]: Each metric with its value
+    """
+    context = RunningMetricContext({metric.statistics for metric in metrics})
+    for ground_truth, predictions in batches:
+        context.update(ground_truth, predictions)
+    return [(metric, metric.evaluate(context)) for metric in metrics]
+
+
 class Accuracy(Metric):
     """Class for accuracy metric"""
 
-    def __call__(self, ground_truth: np.ndarray,
-                 predictions: np.ndarray) -> float:
-        """Accuracy __call__ function"""
-        matches = 0
-        for index, item in enumerate(ground_truth):
-            equiv = False
-            # Deal with case where arrays dont have one hot
-            if (isinstance(item, np.ndarray)):
-                equiv = ((item == (predictions[index])).all())
-            else:
-                equiv = (item == predictions[index])
+    statistics = "classification"
 
-            if (equiv):
-                matches += 1
-        return (matches / len(predictions))
+    def evaluate(self, context: MetricContext) -> float:
+        """Fraction of the predictions that are correct"""
+        matrix = context.confusion_matrix
+        return float(np.trace(matrix) / context.n_predictions)
 
 
 class MeanSquaredError(Metric):
     """Class for mean squared error metric"""
 
-    def __call__(self, ground_truth: np.ndarray,
-                 predictions: np.ndarray) -> float:
-        """Mean squared error __call__ function"""
-        difference_array: np.ndarray = predictions - ground_truth
-        mean_sq_err: float = np.mean(difference_array**2)
-        return mean_sq_err
+    statistics = "regression"
+    greater_is_better = False
+
+    def evaluate(self, context: MetricContext) -> float:
+        """Mean of the squared residuals"""
+        return context.sum_squared_residuals / context.n_residuals
 
 
 class RSquared(Metric):
     """Class for R squared"""
-    def __call__(self, ground_truth: np.ndarray,
-                 predictions: np.ndarray) -> float:
-        """Mean squared error __call__ function"""
-        ground_mean: float = np.mean(ground_truth)
-        sum_squares: float = np.sum((ground_truth - ground_mean)**2)
-        residual: float = np.sum((ground_truth - predictions)**2)
+
+    statistics = "regression"
+
+    def evaluate(self, context: MetricContext) -> float:
+        """One minus the residual over the total sum of squares"""
+        residual: float = context.sum_squared_residuals
+        sum_squares: float = context.total_sum_of_squares
 
         return (1 - (residual / sum_squares))
 
 
 class Precision(Metric):
     """Class for multi class precision metric"""
-    def __call__(self, ground_truth: np.ndarray,
-                 predictions: np.ndarray) -> float:
-        """Calculate the multi class precision"""
-        precision_dict = {}
-        for index, item in enumerate(predictions):
-            equiv = False
-            # Deal with case where arrays dont have one hot
-            if (isinstance(item, np.ndarray)):
-                equiv = ((item == ground_truth[index]).all())
-                key_item = tuple(item)
-            else:
-                equiv = (item == ground_truth[index])
-                key_item = item
-
-            if (equiv):
-                if key_item in precision_dict:
-                    values = precision_dict.get(key_item)
-                    values[0] += 1
-                    precision_dict[key_item] = values
-                else:
-                    values = [1, 0]
-                    precision_dict[key_item] = values
-            else:
-                if key_item in precision_dict:
-                    values = precision_dict.get(key_item)
-                    values[1] += 1
-                    precision_dict[key_item] = values
-                else:
-                    values = [0, 1]
-                    precision_dict[key_item] = values
-
-        # perhaps generate error for empty array somehow
-        mean_prc: int = 0
-        count: int = 0
-        for prc_value in precision_dict.values():
-            mean_prc += (prc_value[0] / (prc_value[0] + prc_value[1]))
-            count += 1 
-        mean_prc = mean_prc / count
-
-        return mean_prc
+
+    statistics = "classification"
+
+    def evaluate(self, context: MetricContext) -> float:
+        """Calculate the multi class precision. Averaged over the classes
+        that occur in the predictions."""
+        matrix = context.confusion_matrix
+        predicted = matrix.sum(axis=0)
+        occurs = predicted > 0
+        return float(np.mean(np.diag(matrix)[occurs] / predicted[occurs]))
 
 
 class Recall(Metric):
     """Class for multi class recall metric"""
-    def __call__(self, ground_truth: np.ndarray,
-                 predictions: np.ndarray) -> float:
-        """Calculate mutli classs recall"""
-        recall_dict = {}
-        for index, item in enumerate(predictions):
-            equiv = False
-            # Deal with case where arrays dont have one hot
-            if (isinstance(item, np.ndarray)):
-                equiv = ((item == (ground_truth[index])).all())
-                key_item = tuple(item)
-            else:
-                equiv = (item == ground_truth[index])
-                key_item = item
-
-            if (equiv):
-                if key_item in recall_dict:
-                    values = recall_dict.get(key_item)
-                    values[0] += 1
-                    recall_dict[key_item] = values
-                else:
-                    values = [1, 0]
-                    recall_dict[key_item] = values
-
-        for index, item in enumerate(ground_truth):
-
-            equiv = False
-            # Deal with case where arrays dont have one hot
-            if (isinstance(item, np.ndarray)):
-                equiv = ((item == (predictions[index])).all())
-                key_item = tuple(item)
-            else:
-                equiv = (item == predictions[index])
-                key_item = item
-
-            if (not equiv):
-                if key_item in recall_dict:
-                    values = recall_dict.get(key_item)
-                    values[1] += 1
-                    recall_dict[key_item] = values
-                else:
-                    values = [0, 1]
-                    recall_dict[key_item] = values
-
-        mean_rec: int = 0
-        count: int = 0
-        for rec_value in recall_dict.values():
-            mean_rec += (rec_value[0] / (rec_value[0] + rec_value[1]))
-            count += 1
-        mean_rec = mean_rec / count
-
-        return mean_rec
+
+    statistics = "classification"
+
+    def evaluate(self, context: MetricContext) -> float:
+        """Calculate mutli classs recall. Averaged over the classes that
+        occur in the ground truth."""
+        matrix = context.confusion_matrix
+        actual = matrix.sum(axis=1)
+        occurs = actual > 0
+        return float(np.mean(np.diag(matrix)[occurs] / actual[occurs]))
 
 
 class MeanAbsoluteError(Metric):
     """Class for mean absolute error metric"""
-    def __call__(self, ground_truth: np.ndarray,
-                 predictions: np.ndarray) -> float:
-        """Mean squared error __call__ function"""
-        difference_array: np.ndarray = predictions - ground_truth
-        absolute_diff: np.ndarray = np.abs(difference_array)
-        return np.mean(absolute_diff)
+
+    statistics = "regression"
+    greater_is_better = False
+
+    def evaluate(self, context: MetricContext) -> float:
+        """Mean of the absolute residuals"""
+        return context.sum_absolute_residuals / context.n_residuals
 
 
 CLASSIFICATION_METRICS = {
@@ -5,14 +5,17 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 from autoop.core.ml.model.classification import (
+    WrapGaussianNaiveBayes,
     WrapKNearestNeighbors,
     WrapRadiusNeighor,
     WrapRandomForest,
+    WrapSGDClassifier,
 )
 from autoop.core.ml.model.regression import (
     MultipleLinearRegression,
     WrapElasticNet,
     WrapLogisticRegression,
+    WrapSGDRegressor,
 )
 
 if TYPE_CHECKING:
@@ -21,14 +24,16 @@ if TYPE_CHECKING:
 REGRESSION_MODELS = {
     "Multiple Linear Regression": MultipleLinearRegression,
     "Elastic Net": WrapElasticNet,
-    "Logistic Regression": WrapLogisticRegression,
+    "SGD Regressor": WrapSGDRegressor,
 }  # add your models as str here
 
 CLASSIFICATION_MODELS = {
     "K Nearest Neighbors": WrapKNearestNeighbors,
     "Radius Neighbor": WrapRadiusNeighor,
     "Random Forest": WrapRandomForest,
-
+    "SGD Classifier": WrapSGDClassifier,
+    "Naive Bayes": WrapGaussianNaiveBayes,
+    "Logistic Regression": WrapLogisticRegression,
 }
 
 
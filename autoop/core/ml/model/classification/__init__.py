@@ -4,9 +4,15 @@
 from autoop.core.ml.model.classification.k_nearest_neighbors import (  # noqa E000
     WrapKNearestNeighbors,
 )
+from autoop.core.ml.model.classification.naive_bayes import (  # noqa E000
+    WrapGaussianNaiveBayes,
+)
 from autoop.core.ml.model.classification.radius_neighbors import (  # noqa E000
     WrapRadiusNeighor,
 )
 from autoop.core.ml.model.classification.random_forest import (  # noqa E000
     WrapRandomForest,
 )
+from autoop.core.ml.model.classification.sgd_classifier import (  # noqa E000
+    WrapSGDClassifier,
+)
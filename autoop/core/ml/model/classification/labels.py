@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+
+def to_labels(
+    y: ArrayLike, classes: Optional[ArrayLike] = None
+) -> Tuple[np.ndarray, np.ndarray, Optional[int]]:
+    """Convert a target to the 1-D labels sklearn classifiers expect.
+
+    The pipeline gives classifiers a one-hot encoded target of shape
+    (N, number of categories), which is turned into the index of the hot
+    column. Targets of shape (N,) or (N, 1) are used as labels directly.
+
+    Args:
+        y (ArrayLike): Target of shape (N,), (N, 1) or (N, categories)
+        classes (ArrayLike, optional): All labels a target of labels can
+            have. Defaults to the labels in `y'
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, Optional[int]]: The labels of shape (N,),
+            all classes the target can have, also those that are not in
+            `y' if they are known, and the number of categories of a one-hot
+            target or None
+    """
+    y = np.asarray(y)
+    if y.ndim == 2 and y.shape[1] > 1:
+        return np.argmax(y, axis=1), np.arange(y.shape[1]), y.shape[1]
+    labels = y.reshape(-1)
+    if classes is None:
+        return labels, np.unique(labels), None
+    return labels, np.asarray(classes), None
+
+
+def check_known(labels: np.ndarray, classes: np.ndarray) -> None:
+    """Make sure a batch of labels holds only classes a classifier was set
+    up with on its first batch.
+
+    Args:
+        labels (np.ndarray): Labels of the batch
+        classes (np.ndarray): Classes of the classifier
+
+    Raises:
+        ValueError: If a label is not one of the classes
+    """
+    unknown = np.setdiff1d(labels, classes)
+    if len(unknown):
+        raise ValueError(
+            f"Labels {list(unknown)} were not in the first batch. Pass all "
+            "classes to the first partial_fit, or give a one-hot target"
+        )
+
+
+def from_labels(labels: np.ndarray, n_categories: Optional[int]) -> np.ndarray:
+    """Inverse of `to_labels'. Gives one-hot rows if the model was fitted on
+    a one-hot target of `n_categories' columns, otherwise the labels."""
+    if n_categories is None:
+        return labels
+    return np.eye(n_categories)[labels]
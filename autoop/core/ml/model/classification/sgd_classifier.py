@@ -0,0 +1,94 @@
+from typing import Optional
+
+import numpy as np
+from numpy.typing import ArrayLike
+from sklearn.linear_model import SGDClassifier
+
+from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.model.classification.labels import (
+    check_known,
+    from_labels,
+    to_labels,
+)
+from autoop.core.ml.model.model import Model, ParametersDict
+
+
+class WrapSGDClassifier(Model):
+    """Wrapper for the sklearn SGD classifier class
+    child of the general model class. A linear classifier trained by
+    stochastic gradient descent, which can be trained batch by batch."""
+    def __init__(
+            self,
+            parameters: dict = ParametersDict({}),
+            hyper_parameters: dict = ParametersDict({}),
+    ) -> None:
+        """
+        Wrapper for the sklearn SGD classifier class
+        initialize as classification type model.
+        """
+        super().__init__(
+            type="classification",
+            hyper_parameters=ParametersDict(hyper_parameters),
+            parameters=ParametersDict(parameters),
+        )
+        self._model = SGDClassifier(**hyper_parameters)
+        # Width of the one-hot target, None for a target of labels
+        self._n_categories = None
+
+    def fit(self, X: ArrayLike, y: ArrayLike) -> None:
+        """Fit SGD classifier to set of input and
+        (one-hot encoded) target features"""
+        labels, _, self._n_categories = to_labels(y)
+        self._model.fit(X, labels)
+        self._update_parameters()
+
+    def partial_fit(
+        self, X: ArrayLike, y: ArrayLike, classes: Optional[ArrayLike] = None
+    ) -> None:
+        """Do one epoch of stochastic gradient descent on a batch.
+        The first batch fixes the classes. A one-hot target has them
+        all, so later batches may miss some of them. A target of labels
+        only has the labels of the first batch, unless `classes' gives
+        all of them, e.g. the categories of the target feature.
+
+        Args:
+        X (ArrayLike): input features of the batch
+        y (ArrayLike): target features of the batch
+        classes (ArrayLike, optional): all labels a target of labels can
+            have, used on the first batch. Defaults to the labels in it
+
+        Raises:
+            ValueError: If a later batch has a label the first did not"""
+        labels, classes, self._n_categories = to_labels(y, classes)
+        if hasattr(self._model, "classes_"):
+            check_known(labels, self._model.classes_)
+            self._model.partial_fit(X, labels)
+        else:
+            self._model.partial_fit(X, labels, classes=classes)
+        self._update_parameters()
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict target features based on
+        fitted SGD classifier"""
+        assert self._parameters["coef"] is not None, (
+            "Model is not fitted yet!"
+        )
+        return from_labels(self._model.predict(X), self._n_categories)
+
+    def _update_parameters(self) -> None:
+        self._parameters.update({
+            "coef": self._model.coef_,
+            "intercept": self._model.intercept_,
+            "classes": self._model.classes_,
+        })
+
+    def to_artifact(self, asset_path: str = "./assets/models",
+                    version: str = "v0.00") -> Artifact:
+        """Covert SGD classifier model to artifact"""
+        return super().to_artifact(
+            name="sgd classifier model",
+            asset_path=asset_path,
+            version=version,
+        )
+
+    # From artifact does not have to be changed.
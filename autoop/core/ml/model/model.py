@@ -3,6 +3,7 @@ from __future__ import annotations
 import pickle
 from abc import ABC, abstractmethod
 from copy import deepcopy
+from functools import partial
 
 import numpy as np
 from numpy.typing import ArrayLike
@@ -65,7 +66,7 @@ class Model(ABC):
         Returns:
             Model: The loaded model.
         """
-        return pickle.loads(artifact.read())
+        return pickle.loads(artifact.read_view())
 
     def to_artifact(
             self,
@@ -73,7 +74,9 @@ class Model(ABC):
             asset_path: str = "./assets/models",
             **kwargs
     ) -> Artifact:
-        """Get an artifact representation of the model.
+        """Get an artifact representation of the model. The model is
+        pickled when the data of the artifact is accessed or when it is
+        registered, which streams it into the storage.
 
         Args:
             name (str): Name of the artifact
@@ -86,7 +89,9 @@ class Model(ABC):
         return Artifact(
             name=name,
             type="model",
-            data=pickle.dumps(self),
+            # Pickled when the artifact is registered, straight into the
+            # storage
+            writer=partial(pickle.dump, self),
             asset_path=asset_path,
             **kwargs
         )
@@ -108,6 +113,27 @@ class Model(ABC):
         """
         pass
 
+    def partial_fit(self, X: ArrayLike, y: ArrayLike) -> None:
+        """Update the model with a batch of data, keeping what it learned
+        from earlier batches. Only available if `supports_partial_fit'.
+
+        Args:
+        X (ArrayLike): input features of the batch
+        y (ArrayLike): target features of the batch
+
+        Raises:
+            NotImplementedError: If the model can only be fitted at once
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} can not be fitted incrementally"
+        )
+
+    @property
+    def supports_partial_fit(self) -> bool:
+        """Whether the model can be trained batch by batch with
+        `partial_fit'. True for models that implement it."""
+        return type(self).partial_fit is not Model.partial_fit
+
     @property
     def type(self) -> str:
         """Getter for type"""
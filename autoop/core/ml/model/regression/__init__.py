@@ -6,3 +6,6 @@ from autoop.core.ml.model.regression.logistic_regression import (  # noqa E000
 from autoop.core.ml.model.regression.multiple_linear_regression import (  # noqa E000
     MultipleLinearRegression,
 )
+from autoop.core.ml.model.regression.sgd_regressor import (  # noqa E000
+    WrapSGDRegressor,
+)
@@ -1,16 +1,22 @@
+from typing import Optional
+
 import numpy as np
 from numpy.typing import ArrayLike
 from sklearn.linear_model import LogisticRegression
 
 from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.model.classification.labels import from_labels, to_labels
 from autoop.core.ml.model.model import Model, ParametersDict
 
 
 class WrapLogisticRegression(Model):
     """
     Wrapper for the sklearn logistic
-    regression class
+    regression class. Despite its name and module it is a classifier
     """
+    # Class attribute such that models pickled before it existed have it
+    _n_categories: Optional[int] = None
+
     def __init__(
             self,
             parameters: dict = ParametersDict({}),
@@ -18,18 +24,22 @@ class WrapLogisticRegression(Model):
     ) -> None:
         """
         Initialise logistic regression wrapper as
-        numerical model
+        classification model
         """
         super().__init__(
-            type="regression",
+            type="classification",
             hyper_parameters=ParametersDict(hyper_parameters),  # Superfluous
             parameters=ParametersDict(parameters),
         )
         self._model = LogisticRegression(**hyper_parameters)
+        # Width of the one-hot target, None for a target of labels
+        self._n_categories = None
 
     def fit(self, X: ArrayLike, y: ArrayLike) -> None:
-        """Fit logistic regression model to input"""
-        self._model.fit(X, y)
+        """Fit logistic regression model to input and
+        (one-hot encoded) target features"""
+        labels, _, self._n_categories = to_labels(y)
+        self._model.fit(X, labels)
         self._parameters.update({
             "coef": self._model.coef_,
             "intercept": self._model.intercept_
@@ -41,7 +51,7 @@ class WrapLogisticRegression(Model):
         assert self._parameters["coef"] is not None, (
             "Model is not fitted yet!"
         )
-        return self._model.predict(X)
+        return from_labels(self._model.predict(X), self._n_categories)
 
     def to_artifact(self, asset_path: str = "./assets/models",
                     version: str = "v0.00") -> Artifact:
@@ -0,0 +1,73 @@
+import numpy as np
+from numpy.typing import ArrayLike
+from sklearn.linear_model import SGDRegressor
+
+from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.model.model import Model, ParametersDict
+
+
+class WrapSGDRegressor(Model):
+    """Wrapper for the sklearn SGD regressor class
+    child of the generalized model class. A linear model trained by
+    stochastic gradient descent, which can be trained batch by batch."""
+    def __init__(
+            self,
+            parameters: dict = ParametersDict({}),
+            hyper_parameters: dict = ParametersDict({}),
+    ) -> None:
+        """
+        Initalize the SGD regressor wrapper
+        as regression type model.
+        """
+        super().__init__(
+            type="regression",
+            hyper_parameters=ParametersDict(hyper_parameters),
+            parameters=ParametersDict(parameters),
+        )
+        self._model = SGDRegressor(**hyper_parameters)
+        # Whether the target was a column of shape (N, 1) instead of (N,)
+        self._column_target = False
+
+    def fit(self, X: ArrayLike, y: ArrayLike) -> None:
+        """Fit SGD regressor to input features"""
+        self._model.fit(X, self._to_vector(y))
+        self._update_parameters()
+
+    def partial_fit(self, X: ArrayLike, y: ArrayLike) -> None:
+        """Do one epoch of stochastic gradient descent on a batch"""
+        self._model.partial_fit(X, self._to_vector(y))
+        self._update_parameters()
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict target features based on fitted
+        SGD regressor, in the shape of the target it was fitted on"""
+        assert self._parameters["coef"] is not None, (
+            "Model is not fitted yet!"
+        )
+        predictions = self._model.predict(X)
+        if self._column_target:
+            return predictions.reshape(-1, 1)
+        return predictions
+
+    def _to_vector(self, y: ArrayLike) -> np.ndarray:
+        """SGDRegressor only predicts one target, as a vector"""
+        y = np.asarray(y)
+        self._column_target = y.ndim == 2
+        return y.reshape(-1)
+
+    def _update_parameters(self) -> None:
+        self._parameters.update({
+            "coef": self._model.coef_,
+            "intercept": self._model.intercept_
+        })
+
+    def to_artifact(self, asset_path: str = "./assets/models",
+                    version: str = "v0.00") -> Artifact:
+        """Convert model to artifact"""
+        return super().to_artifact(
+            name="sgd regressor model",
+            asset_path=asset_path,
+            version=version,
+        )
+
+    # From artifact does not have to be changed.
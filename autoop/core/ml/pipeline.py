@@ -2,16 +2,41 @@ from __future__ import annotations
 
 import pickle
 import sys
-from typing import TYPE_CHECKING, List
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import (
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TYPE_CHECKING,
+    Tuple,
+)
 
 import numpy as np
-from numpy.typing import ArrayLike
 
 from autoop.core.ml.artifact import Artifact
 from autoop.core.ml.dataset import Dataset
 from autoop.core.ml.feature import Feature
-from autoop.core.ml.metric import Metric
-from autoop.functional.preprocessing import preprocess_features
+from autoop.core.ml.instrumentation import Instrumentation
+from autoop.core.ml.metric import Metric, MetricContext, RunningMetricContext
+from autoop.functional.parallel import (
+    SharedArrays,
+    default_workers,
+    load_shared,
+)
+from autoop.functional.preprocessing import FeatureEncoder, preprocess_dataset
+from autoop.functional.split import (
+    SPLIT_STRATEGIES,
+    k_fold,
+    stratified_k_fold,
+    stratified_permutation,
+    train_test_indices,
+)
 
 # Moved Model import to hear because it is merely used for type checkign
 # Also I removed it from model/__init__.py because user should not be able
@@ -30,6 +55,10 @@ class Pipeline:
         input_features: List[Feature],
         target_feature: Feature,
         split: float = 0.8,
+        split_strategy: str = "sequential",
+        random_state: Optional[int] = None,
+        train_evaluation: float = 1.0,
+        instrumentation: Optional[Instrumentation] = None,
     ) -> None:
         """Specify what data is used and how the model is trained and
         evuluated.
@@ -41,11 +70,28 @@ class Pipeline:
             input_features (List[Feature]): input features
             target_feature (Feature): target feature
             split (float, optional): Train/test split. Defaults to 0.8.
+            split_strategy (str, optional): Which rows are in the train set,
+                one of `SPLIT_STRATEGIES', see `train_test_indices'. Use
+                "shuffled" or "stratified" if the rows are sorted. Defaults
+                to "sequential", the first rows.
+            random_state (int, optional): Seed of the shuffled and the
+                stratified split. Defaults to None
+            train_evaluation (float, optional): Fraction of the train split
+                to evaluate the model on as well, a random subsample seeded
+                by `random_state'. Predicting is the slowest step of e.g.
+                nearest neighbors models, so evaluating less of the train
+                split saves time. 0 skips it and gives no train predictions.
+                Defaults to 1.0
+            instrumentation (Instrumentation, optional): Measures the stages
+                of each execution, add hooks to it to receive the events.
+                Defaults to a new one without hooks or memory tracing
 
         Raises:
             ValueError: Raises when data type and metric type do not match.
             Available types categorical/classification, continuous/regression
-            for data/model respectively
+            for data/model respectively. Also raises for an unknown split
+            strategy, stratification of a numerical target or a
+            train_evaluation outside [0, 1].
         """
         self._dataset = dataset
         self._model = model
@@ -54,6 +100,29 @@ class Pipeline:
         self._metrics = metrics
         self._artifacts = {}
         self._split = split
+        if split_strategy not in SPLIT_STRATEGIES:
+            raise ValueError(
+                f"{split_strategy} is not a split strategy. Choose one of "
+                f"{SPLIT_STRATEGIES}"
+            )
+        categorical = target_feature.type == "categorical"
+        if split_strategy == "stratified" and not categorical:
+            raise ValueError("Only a categorical target can be stratified")
+        self._split_strategy = split_strategy
+        self._random_state = random_state
+        if not 0 <= train_evaluation <= 1:
+            raise ValueError(
+                f"train_evaluation must be in [0, 1], got {train_evaluation}"
+            )
+        self._train_evaluation = train_evaluation
+        # Caches, such that executing again does not preprocess, split or
+        # predict again: the source of the dataset data the matrices are
+        # encoded from and the predictions of the current model per split.
+        self._prepared_data = None
+        self._predictions = {}
+        if instrumentation is None:
+            instrumentation = Instrumentation()
+        self._instrumentation = instrumentation
         self._check_same_type(target_feature, model)
         # TODO Bring back this check, error lays in spelling mistakes
 
@@ -110,7 +179,30 @@ Pipeline(
         """Getter of model"""
         return self._model  # UNSAFE, user can modify model.
 
-    def get_artifacts(self, collection: str) -> List[Artifact]:
+    @property
+    def instrumentation(self) -> Instrumentation:
+        """Getter of the instrumentation with the events of all stages"""
+        return self._instrumentation
+
+    @property
+    def target_feature(self) -> Feature:
+        """Getter of the target feature"""
+        return self._target_feature
+
+    @property
+    def train_size(self) -> int:
+        """Number of rows of the train split, once the data is split"""
+        return len(self._train_X)
+
+    @property
+    def fit_size(self) -> int:
+        """Number of rows the models of the last `worker_pool' are fitted on
+        at most: the train split without the validation rows"""
+        return self._fit_size
+
+    def get_artifacts(
+        self, collection: str, trace_format: Optional[str] = None
+    ) -> List[Artifact]:
         """Returns the artifacts of the
             - input feature numpy arrays
             - output feature numpy arrays
@@ -119,38 +211,42 @@ Pipeline(
                 - List[Feature] of the output
                 - float of the split
             - pipeline artifact
+            - trace of the measured stages, if `trace_format' is "json" or
+              "chrome", see `Instrumentation.to_artifact'
+        The objects are pickled when the artifacts are registered, straight
+        into the storage, see `Artifact.writer'.
         """
         artifacts = []
         for name, artifact in self._artifacts.items():
             artifact_type = artifact.get("type")
             if artifact_type in ["OneHotEncoder"]:
                 data = artifact["encoder"]
-                data = pickle.dumps(data)
                 artifacts.append(Artifact(
                     type="feature",
                     name=name,
-                    data=data,
+                    writer=partial(pickle.dump, data),
                     asset_path=f"{collection}/feature:{name}"
                 ))
             if artifact_type in ["StandardScaler"]:
                 data = artifact["scaler"]
-                data = pickle.dumps(data)
                 artifacts.append(Artifact(
                     type="feature",
                     name=name,
-                    data=data,
+                    writer=partial(pickle.dump, data),
                     asset_path=f"{collection}/feature:{name}"
                 ))
         pipeline_data = {
             "input_features": self._input_features,
             "target_feature": self._target_feature,
             "split": self._split,
+            "split_strategy": self._split_strategy,
+            "random_state": self._random_state,
         }
         artifacts.append(
             Artifact(
                 type="configurations",
                 name="pipeline_config",
-                data=pickle.dumps(pipeline_data),
+                writer=partial(pickle.dump, pipeline_data),
                 asset_path=f"{collection}/pipeline_config",
             )
         )
@@ -159,6 +255,12 @@ Pipeline(
                 asset_path=f"{collection}/model"
             )
         )
+        if trace_format is not None:
+            artifacts.append(self._instrumentation.to_artifact(
+                name="pipeline_trace",
+                asset_path=f"{collection}/trace",
+                format=trace_format,
+            ))
         return artifacts
 
     def _register_artifact(self, name: str, artifact: dict) -> None:
@@ -171,8 +273,8 @@ Pipeline(
             - self._target_feature
             - self._dataset
         and transforms it into:
-            - self._input_vectors
-            - self._output_vectors
+            - self._input_matrix
+            - self._output_vector
         other than that it saves the
             - input Features
             - output Features
@@ -183,62 +285,115 @@ Pipeline(
         one-hot encoding or standard-scalar encoding.
         """
         # TODO Make proper docstring
-        (target_feature_name, target_data, artifact) = preprocess_features(
-            [self._target_feature], self._dataset
-        )[0]
-        self._register_artifact(target_feature_name, artifact)
-        input_results = preprocess_features(
-            self._input_features, self._dataset
+        (self._input_matrix, self._output_vector, artifacts) = (
+            preprocess_dataset(
+                self._input_features, self._target_feature, self._dataset
+            )
         )
-        for feature_name, data, artifact in input_results:
+        for feature_name, artifact in artifacts.items():
             self._register_artifact(feature_name, artifact)
-        # Get the input vectors and output vector, sort by feature name for
-        # consistency
-        self._output_vector = target_data
-        self._input_vectors = [
-            data for (feature_name, data, artifact) in input_results
-        ]
+        self._prepared_data = None
+        self._predictions = {}
+
+    def _prepare_data(self) -> None:
+        """Preprocess and split the dataset, unless the matrices of its
+        current data are still there from an earlier execution. Checking
+        does not load the data of a dataset that is read from the storage,
+        see `Artifact.data_source'."""
+        source = self._dataset.data_source
+        if self._prepared_data is not source:
+            self.preprocess_features()
+            self._split_data()
+            self._prepared_data = source
 
     def _split_data(self) -> None:
-        # Split the data into training and testing sets
-        split = self._split
-        self._train_X = [
-            vector[: int(split * len(vector))]
-            for vector in self._input_vectors
-        ]
-        self._test_X = [
-            vector[int(split * len(vector)):]
-            for vector in self._input_vectors
-        ]
-        self._train_y = self._output_vector[
-            : int(split * len(self._output_vector))
-        ]
-        self._test_y = self._output_vector[
-            int(split * len(self._output_vector)):
-        ]
+        # Split the data into training and testing sets. A sequential split
+        # slices the rows, which gives views. Otherwise the train and the
+        # test rows together are one copy of the matrices.
+        train, test = train_test_indices(
+            self._output_vector, self._split, self._split_strategy,
+            self._random_state,
+        )
+        self._train_X = self._input_matrix[train]
+        self._test_X = self._input_matrix[test]
+        self._train_y = self._output_vector[train]
+        self._test_y = self._output_vector[test]
 
-    def _compact_vectors(self, vectors: List[np.ndarray]) -> np.ndarray:
-        return np.concatenate(vectors, axis=1)
+        # Rows of the train split to evaluate on, None for none of them
+        n_train = len(self._train_X)
+        n_evaluate = int(np.ceil(self._train_evaluation * n_train))
+        if n_evaluate == n_train:
+            self._train_rows = slice(None)  # A view
+        elif n_evaluate == 0:
+            self._train_rows = None
+        else:
+            rng = np.random.default_rng(self._random_state)
+            self._train_rows = np.sort(
+                rng.choice(n_train, n_evaluate, replace=False)
+            )
+        self._predictions = {}
 
-    def _train(self) -> np.ndarray | None:
-        X = self._compact_vectors(self._train_X)
+    def _train(self) -> Optional[np.ndarray]:
+        X = self._train_X
         Y = self._train_y
         self._model.fit(X, Y)
+        self._predictions = {}
 
-    def _evaluate_on(self, X: list[np.ndarray], Y: np.ndarray) -> ArrayLike:
-        X = self._compact_vectors(X)
-        self._metrics_results = []
-        predictions = self._model.predict(X)
-        for metric in self._metrics:
-            result = metric(predictions, Y)
-            self._metrics_results.append((metric, result))
-        return predictions
+    def _compute_metrics(
+        self, predictions: np.ndarray, Y: np.ndarray
+    ) -> List[Tuple[Metric, float]]:
+        # Compute the statistics (e.g. confusion matrix) once for all metrics
+        context = MetricContext(Y, predictions)
+        return [(metric, metric.evaluate(context)) for metric in self._metrics]
 
-    def _evaluate(self) -> None:
-        self._test_predictions = self._evaluate_on(self._test_X, self._test_y)
-        self._train_predictions = self._evaluate_on(
-            self._train_X, self._train_y
+    def _stage(self, stage: str) -> ContextManager[None]:
+        """Measure the body as a stage, see `Instrumentation.stage'"""
+        return self._instrumentation.stage(stage)
+
+    def _stage_results(self, first_event: int) -> Tuple[dict, dict]:
+        """Timings and measurements of the stages since event `first_event'
+        of the instrumentation, see `execute'."""
+        stages = self._instrumentation.summary(
+            self._instrumentation.events[first_event:]
         )
+        timings = {
+            stage: measured["wall_time"] for stage, measured in stages.items()
+        }
+        return timings, stages
+
+    def _evaluate_split(self, split: str) -> dict:
+        """Evaluate the model on the "test" or "train" split, predicting
+        only if the predictions of the current model are not cached.
+
+        Returns:
+            dict: Results of the split, see `execute'
+        """
+        if split == "test":
+            rows, X, Y = slice(None), self._test_X, self._test_y
+        else:
+            rows, X, Y = self._train_rows, self._train_X, self._train_y
+        with self._stage(f"evaluate {split}"):
+            if split not in self._predictions:
+                self._predictions[split] = self._model.predict(X[rows])
+            predictions = self._predictions[split]
+            metrics = self._compute_metrics(predictions, Y[rows])
+        return {
+            "metrics": metrics,
+            "predictions": predictions,
+            "n_rows": len(predictions),
+        }
+
+    def _evaluate(self) -> None:
+        self._split_results = {"test": self._evaluate_split("test")}
+        if self._train_rows is not None:
+            self._split_results["train"] = self._evaluate_split("train")
+        self._metrics_results = self._split_results["test"]["metrics"]
+        self._test_predictions = self._split_results["test"]["predictions"]
+        self._train_predictions = None
+        if "train" in self._split_results:
+            self._train_predictions = (
+                self._split_results["train"]["predictions"]
+            )
 
     def execute(self) -> dict:
         """Executes the pipeline.
@@ -246,23 +401,421 @@ Pipeline(
         Returns:
             dict: A dictionary with the following keys -> values
             - **"metrics"** -> **(list[tuple[Metric, float]])**: The value
-                of the loss function of a specific metric.
-
+                of the loss function of a specific metric on the test split.
+            - **"train_metrics"** ->
+                **(Optional[list[tuple[Metric, float]]])**: The same on the
+                train split, None if it is not evaluated.
             - **"test predictions"** -> **(np.ndarray)**: The predictions on
             the test dataset.
-            - **"train predictions"** -> **(np.ndarray)**: The predictions on
-            the train dataset.
+            - **"train predictions"** -> **(Optional[np.ndarray])**: The
+            predictions on the evaluated rows of the train dataset, see
+            `train_evaluation'.
+            - **"splits"** -> **(dict[str, dict])**: Results of each
+            evaluated split, "test" and "train", with the keys "metrics",
+            "predictions" and "n_rows".
+            - **"timings"** -> **(dict[str, float])**: Seconds spent in each
+            stage: "prepare" (preprocessing and splitting, about 0 when the
+            matrices are cached), "train", "evaluate test" and
+            "evaluate train".
+            - **"stages"** -> **(dict[str, dict])**: All measurements of each
+            stage, see `Instrumentation.summary'. The events themselves are
+            in `instrumentation'.
         """
-        self.preprocess_features()
-        self._split_data()
-        self._train()
+        first_event = len(self._instrumentation.events)
+        with self._stage("prepare"):
+            self._prepare_data()
+        with self._stage("train"):
+            self._train()
         self._evaluate()
+        timings, stages = self._stage_results(first_event)
+        train = self._split_results.get("train", None)
         return {
             "metrics": self._metrics_results,
+            "train_metrics": train["metrics"] if train else None,
             "test_predictions": self._test_predictions,
-            "train_predictions": self._train_predictions
+            "train_predictions": self._train_predictions,
+            "splits": self._split_results,
+            "timings": timings,
+            "stages": stages,
         }
 
+    def execute_streaming(self, chunk_size: int = 100000) -> dict:
+        """Executes the pipeline while holding only one chunk of rows of the
+        dataset in memory at a time. Needs a model with `partial_fit'.
+
+        The first pass over the dataset fits the scaler and the one-hot
+        encoder on running statistics. The second pass encodes each chunk,
+        trains the model on the rows of the training split and, since those
+        come first, evaluates the test rows with the trained model.
+
+        Args:
+            chunk_size (int): Number of rows per chunk. Defaults to 100000
+
+        Raises:
+            ValueError: If the model can not be trained incrementally or the
+                split strategy is not "sequential", as the chunks are read in
+                order
+
+        Returns:
+            dict: Same as `execute', but the predictions are not kept and
+            the train split is not evaluated, such that memory does not grow
+            with the dataset. Both predictions are None. The timings are of
+            the stages "fit encoder" and "train and evaluate test".
+        """
+        if not self._model.supports_partial_fit:
+            raise ValueError(
+                f"Model {type(self._model)} does not support incremental "
+                "fitting, use `execute' instead"
+            )
+        if self._split_strategy != "sequential":
+            raise ValueError(
+                "Only a sequential split can be streamed, use `execute' "
+                "instead"
+            )
+        first_event = len(self._instrumentation.events)
+        encoder = FeatureEncoder(self._input_features, self._target_feature)
+        n_rows = 0
+        with self._stage("fit encoder"):
+            for chunk in self._dataset.iter_chunks(
+                chunk_size, encoder.columns
+            ):
+                encoder.partial_fit(chunk)
+                n_rows += len(chunk)
+        for feature_name, artifact in encoder.artifacts.items():
+            self._register_artifact(feature_name, artifact)
+
+        n_train = int(self._split * n_rows)
+        context = RunningMetricContext(
+            {metric.statistics for metric in self._metrics}
+        )
+        start = 0
+        with self._stage("train and evaluate test"):
+            for chunk in self._dataset.iter_chunks(
+                chunk_size, encoder.columns
+            ):
+                X, Y = encoder.transform(chunk)
+                n_chunk_train = min(max(n_train - start, 0), len(chunk))
+                if n_chunk_train > 0:
+                    self._model.partial_fit(
+                        X[:n_chunk_train], Y[:n_chunk_train]
+                    )
+                if n_chunk_train < len(chunk):
+                    predictions = self._model.predict(X[n_chunk_train:])
+                    context.update(Y[n_chunk_train:], predictions)
+                start += len(chunk)
+
+        self._metrics_results = [
+            (metric, metric.evaluate(context)) for metric in self._metrics
+        ]
+        self._split_results = {"test": {
+            "metrics": self._metrics_results,
+            "predictions": None,
+            "n_rows": n_rows - n_train,
+        }}
+        timings, stages = self._stage_results(first_event)
+        return {
+            "metrics": self._metrics_results,
+            "train_metrics": None,
+            "test_predictions": None,
+            "train_predictions": None,
+            "splits": self._split_results,
+            "timings": timings,
+            "stages": stages,
+        }
+
+    def race(
+        self, models: List[Model], max_workers: Optional[int] = None
+    ) -> List[dict]:
+        """Train and evaluate several candidate models on the same data, in
+        parallel worker processes.
+
+        The dataset is preprocessed and split once. The split matrices are
+        shared read-only with the workers through memory mapped files (see
+        `SharedArrays'), such that no worker copies or preprocesses them.
+        The model of the pipeline itself is not trained.
+
+        Args:
+            models (List[Model]): Unfitted candidate models, all of a type
+                that fits the target feature
+            max_workers (int, optional): Number of worker processes. Defaults
+                to one per model, at most one per available core.
+
+        Raises:
+            ValueError: If a model does not fit the target feature
+
+        Returns:
+            List[dict]: Leaderboard, best model first, ranked by the first
+            metric. Each entry has the keys -> values
+            - **"model"** -> **(Model)**: The fitted model
+            - **"metrics"** -> **(list[tuple[Metric, float]])**: The value
+                of each metric on the test split
+            - **"fit_time"** -> **(float)**: Seconds it took to fit
+            - **"error"** -> **(Optional[str])**: Why the model failed, it is
+                then ranked last
+        """
+        for model in models:
+            self._check_same_type(self._target_feature, model)
+        if max_workers is None:
+            max_workers = default_workers(len(models))
+        with self.worker_pool(max_workers) as evaluate:
+            leaderboard = evaluate(models)
+        return sorted(leaderboard, key=rank_key)
+
+    def cross_validate(
+        self,
+        n_folds: int = 5,
+        n_repeats: int = 1,
+        stratify: Optional[bool] = None,
+        shuffle: bool = True,
+        random_state: Optional[int] = None,
+        max_workers: Optional[int] = None,
+    ) -> dict:
+        """Estimate how well the model generalizes with k-fold cross
+        validation, evaluating the folds in parallel worker processes.
+
+        The dataset is preprocessed once. Each fold is the test set of one
+        fit of the model on all other rows. The matrices and the row indices
+        of all folds are written once and shared read-only with the workers
+        (see `SharedArrays'), such that only a worker copies the rows of its
+        fold. The split of the pipeline is not used and the model of the
+        pipeline itself is not trained.
+
+        Args:
+            n_folds (int): Number of folds. Defaults to 5
+            n_repeats (int): Number of times to repeat the cross validation
+                with different (shuffled) folds. Defaults to 1
+            stratify (bool, optional): Whether each fold gets about the same
+                fraction of every category of the target. Defaults to True
+                for a categorical target
+            shuffle (bool): Whether the folds get random rows instead of
+                consecutive ones. Always True for more than one repeat.
+                Defaults to True
+            random_state (int, optional): Seed of the shuffling
+            max_workers (int, optional): Number of worker processes.
+                Defaults to one per fold, at most one per available core.
+
+        Returns:
+            dict: A dictionary with the following keys -> values
+            - **"folds"** -> **(list[dict])**: Result per fold, with the keys
+                "repeat", "fold", "metrics" (list[tuple[Metric, float]]),
+                "fit_time" and "error" (why the fold failed or None)
+            - **"metrics"** -> **(list[tuple[Metric, float, float]])**: The
+                mean and standard deviation of each metric over the folds
+                that did not fail
+            - **"timings"** -> **(dict[str, float])**: Seconds spent in the
+                stages "prepare" and "folds" (all folds in parallel)
+            - **"stages"** -> **(dict[str, dict])**: All measurements of each
+                stage, see `execute'
+        """
+        if stratify is None:
+            stratify = self._target_feature.type == "categorical"
+        rng = np.random.default_rng(random_state)
+        first_event = len(self._instrumentation.events)
+        with self._stage("prepare"):
+            self._prepare_data()
+
+        arrays = {"X": self._input_matrix, "y": self._output_vector}
+        folds = []  # (repeat, fold, name of its indices)
+        for repeat in range(n_repeats):
+            if stratify:
+                indices = stratified_k_fold(
+                    self._output_vector, n_folds,
+                    shuffle or n_repeats > 1, rng,
+                )
+            else:
+                indices = k_fold(
+                    len(self._input_matrix), n_folds,
+                    shuffle or n_repeats > 1, rng,
+                )
+            for fold, test in enumerate(indices):
+                name = f"fold_{repeat}_{fold}"
+                arrays[name] = test
+                folds.append((repeat, fold, name))
+
+        if max_workers is None:
+            max_workers = default_workers(len(folds))
+        with self._stage("folds"), SharedArrays(arrays) as paths, \
+                ProcessPoolExecutor(max_workers) as executor:
+            futures = [
+                executor.submit(
+                    _fit_and_evaluate, self._model, self._metrics, paths,
+                    keep_model=False, fold=name,
+                )
+                for _, _, name in folds
+            ]
+            entries = [future.result() for future in futures]
+
+        results = []
+        for (repeat, fold, _), entry in zip(folds, entries):
+            results.append({
+                "repeat": repeat,
+                "fold": fold,
+                "metrics": list(zip(self._metrics, entry["metrics"])),
+                "fit_time": entry["fit_time"],
+                "error": entry["error"],
+            })
+        values = np.array([
+            entry["metrics"] for entry in entries if entry["error"] is None
+        ]).reshape(-1, len(self._metrics))
+        summary = []
+        if len(values):
+            summary = list(zip(
+                self._metrics, values.mean(axis=0), values.std(axis=0)
+            ))
+        timings, stages = self._stage_results(first_event)
+        return {
+            "folds": results,
+            "metrics": summary,
+            "timings": timings,
+            "stages": stages,
+        }
+
+    @contextmanager
+    def worker_pool(
+        self,
+        max_workers: int,
+        validation: float = 0.0,
+        random_state: Optional[int] = None,
+    ) -> Iterator[Callable[..., List[dict]]]:
+        """Preprocess and split the dataset once and start worker processes
+        that share the split matrices read-only through memory mapped files
+        (see `SharedArrays').
+
+        Args:
+            max_workers (int): Number of worker processes
+            validation (float): Fraction of the train split that is held out
+                to evaluate on instead of the test split, such that choosing
+                between the models does not look at the test split. Defaults
+                to 0, evaluating on the test split
+            random_state (int, optional): Seed of the validation rows and of
+                the subsets of `n_train' rows
+
+        Yields:
+            Callable[..., List[dict]]: evaluate(models, n_train=None,
+            keep_models=True) fits each model on `n_train' random rows of the
+            train split (all of `fit_size' rows by default) in a worker,
+            evaluates it and returns one entry per model as `race' does. The
+            rows have about the same fraction of each category as the train
+            split for a categorical target, and a larger `n_train' gets the
+            rows of a smaller one and more. The "model" of an entry is None
+            unless `keep_models'.
+        """
+        self._prepare_data()
+        if self._target_feature.type == "categorical":
+            order = stratified_permutation(self._train_y, random_state)
+        else:
+            order = np.random.default_rng(random_state).permutation(
+                len(self._train_y)
+            )
+        n_validation = int(validation * len(order))
+        arrays = {
+            "train_X": self._train_X,
+            "train_y": self._train_y,
+            "test_X": self._test_X,
+            "test_y": self._test_y,
+            "order": order[n_validation:],
+        }
+        if n_validation > 0:
+            rows = np.sort(order[:n_validation])
+            arrays["test_X"] = self._train_X[rows]
+            arrays["test_y"] = self._train_y[rows]
+        self._fit_size = len(order) - n_validation
+        # The pool is shut down before the shared files are removed
+        with SharedArrays(arrays) as paths, \
+                ProcessPoolExecutor(max_workers) as executor:
+
+            def evaluate(
+                models: List[Model],
+                n_train: Optional[int] = None,
+                keep_models: bool = True,
+            ) -> List[dict]:
+                futures = [
+                    executor.submit(
+                        _fit_and_evaluate, model, self._metrics, paths,
+                        n_train, keep_models,
+                    )
+                    for model in models
+                ]
+                entries = [future.result() for future in futures]
+                for entry in entries:
+                    if entry["error"] is None:
+                        entry["metrics"] = list(
+                            zip(self._metrics, entry["metrics"])
+                        )
+                return entries
+
+            yield evaluate
+
+
+def rank_key(entry: dict) -> tuple:
+    """Sort key of a leaderboard entry of `Pipeline.race', lower is better.
+    Ranks by the first metric, failed entries last."""
+    if entry["error"] is not None or not entry["metrics"]:
+        return (entry["error"] is not None, 0.0)
+    metric, value = entry["metrics"][0]
+    return (False, -value if metric.greater_is_better else value)
+
+
+def _fit_and_evaluate(
+    model: Model,
+    metrics: List[Metric],
+    paths: Dict[str, str],
+    n_train: Optional[int] = None,
+    keep_model: bool = True,
+    fold: Optional[str] = None,
+) -> dict:
+    """Fit and evaluate one model in a worker process, for `Pipeline.race'
+    and `Pipeline.cross_validate'.
+
+    Args:
+        model (Model): Unfitted model
+        metrics (List[Metric]): Metrics to evaluate on the test rows
+        paths (Dict[str, str]): Shared arrays, either the train and test
+            matrices "train_X", "train_y", "test_X" and "test_y" and the
+            rows "order", or the whole matrices "X" and "y" and the row
+            indices of folds
+        n_train (int, optional): Only fit on the first this many rows of
+            "order", the shuffled rows of the train split to fit on. Defaults
+            to all of them.
+        keep_model (bool): Whether to send the fitted model back
+        fold (str, optional): Name of the shared indices of the test rows.
+            The model is then fitted on all other rows.
+
+    Returns:
+        dict: Leaderboard entry with the metric values in the order of
+        `metrics'
+    """
+    arrays = load_shared(paths)
+    entry = {"model": None, "metrics": [], "fit_time": 0.0, "error": None}
+    try:
+        if fold is None:
+            train_X, train_y = arrays["train_X"], arrays["train_y"]
+            order = arrays.get("order", None)
+            if order is not None and (
+                n_train is not None or len(order) < len(train_X)
+            ):
+                rows = np.sort(order[:n_train])
+                train_X, train_y = train_X[rows], train_y[rows]
+            test_X, test_y = arrays["test_X"], arrays["test_y"]
+        else:
+            # Only the rows of this fold are copied, in this worker
+            test = arrays[fold]
+            train = np.ones(len(arrays["X"]), dtype=bool)
+            train[test] = False
+            train_X, train_y = arrays["X"][train], arrays["y"][train]
+            test_X, test_y = arrays["X"][test], arrays["y"][test]
+        start = time.perf_counter()
+        model.fit(train_X, train_y)
+        entry["fit_time"] = time.perf_counter() - start
+        predictions = model.predict(test_X)
+        context = MetricContext(test_y, predictions)
+        entry["metrics"] = [metric.evaluate(context) for metric in metrics]
+    except Exception as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+    if keep_model:
+        entry["model"] = model
+    return entry
+
 # Questions:
 # - Why does __init__ get the data twice? Once via the Dataset, once via
 #   input and output Features. Does Feature maybe not contain the data?
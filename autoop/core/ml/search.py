@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import math
+import pickle
+from abc import ABC, abstractmethod
+from typing import Callable, ContextManager, Dict, List, Optional
+
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.pipeline import Pipeline, rank_key
+from autoop.functional.parallel import default_workers
+
+
+class HyperparameterSearch(ABC):
+    """Base class for searches over the hyper parameters of a model.
+
+    Every candidate configuration is a trial: the model with those hyper
+    parameters is fitted on the train split of a pipeline, except for a
+    held-out validation part, and evaluated on that validation part, ranked
+    by the first metric of the pipeline. The test split is not looked at,
+    so executing the pipeline with the chosen configuration gives a fair
+    estimate of how well it does. The dataset is preprocessed once and the
+    trials run in parallel worker processes that share the matrices (see
+    `Pipeline.worker_pool').
+    """
+
+    def __init__(
+        self,
+        Model: type,
+        space: Dict[str, list],
+        max_workers: Optional[int] = None,
+        validation: float = 0.2,
+        random_state: Optional[int] = None,
+    ) -> None:
+        """Create a search.
+
+        Args:
+            Model (type): Model class to tune, e.g. WrapRandomForest
+            space (Dict[str, list]): Values to try of each hyper parameter,
+                keyword arguments of the wrapped sklearn model
+            max_workers (int, optional): Number of worker processes.
+                Defaults to one per available core.
+            validation (float): Fraction of the train split the trials are
+                evaluated on instead of fitted on. Defaults to 0.2
+            random_state (int, optional): Seed of the validation rows and
+                of the sampling of candidates, if any
+        """
+        if not 0 < validation < 1:
+            raise ValueError(
+                f"validation must be in (0, 1), got {validation}"
+            )
+        self._Model = Model
+        self._space = space
+        self._max_workers = max_workers
+        self._validation = validation
+        self._random_state = random_state
+        self._trials = []
+
+    @abstractmethod
+    def candidates(self) -> List[dict]:
+        """Get the hyper parameter configurations to try.
+
+        Returns:
+            List[dict]: Hyper parameters of each candidate
+        """
+        pass
+
+    def run(self, pipeline: Pipeline) -> List[dict]:
+        """Evaluate every candidate on the whole train split.
+
+        Args:
+            pipeline (Pipeline): Pipeline of the dataset, features and
+                metrics to tune the model on. Its own model is not used.
+
+        Returns:
+            List[dict]: The trials, see `trials'
+        """
+        self._check_type(pipeline)
+        candidates = self.candidates()
+        with self._worker_pool(pipeline, len(candidates)) as evaluate:
+            self._trials = []
+            self._evaluate(evaluate, candidates, None, 0)
+        return self.trials
+
+    @property
+    def trials(self) -> List[dict]:
+        """All trials so far, best first. Each trial has the keys -> values
+        - **"hyper_parameters"** -> **(dict)**: The configuration
+        - **"metrics"** -> **(list[tuple[Metric, float]])**: The value
+            of each metric on the validation rows
+        - **"fit_time"** -> **(float)**: Seconds it took to fit
+        - **"n_train"** -> **(Optional[int])**: Number of random train rows it
+            was fitted on, None for all but the validation rows
+        - **"round"** -> **(int)**: Round of the search it ran in
+        - **"error"** -> **(Optional[str])**: Why the trial failed
+        """
+        return sorted(self._trials, key=self._rank)
+
+    @property
+    def best(self) -> dict:
+        """The best trial of the last round"""
+        last_round = max(trial["round"] for trial in self._trials)
+        return min(
+            (trial for trial in self._trials if trial["round"] == last_round),
+            key=rank_key,
+        )
+
+    def get_artifacts(self, collection: str) -> List[Artifact]:
+        """Get an artifact of type "trial" of every trial, such that the
+        search can be saved in the artifact registry.
+
+        Args:
+            collection (str): Name under which the search is saved
+
+        Returns:
+            List[Artifact]: The trials in the order they ran
+        """
+        artifacts = []
+        for index, trial in enumerate(self._trials):
+            record = dict(trial)
+            record["metrics"] = [
+                (metric.to_string(), value)
+                for metric, value in trial["metrics"]
+            ]
+            artifacts.append(Artifact(
+                type="trial",
+                name=f"{collection} trial {index}",
+                data=pickle.dumps(record),
+                asset_path=f"{collection}/trial:{index}",
+                metadata={
+                    "model": self._Model.__name__,
+                    "round": str(trial["round"]),
+                },
+            ))
+        return artifacts
+
+    def _evaluate(
+        self, evaluate: Callable[..., List[dict]], candidates: List[dict],
+        n_train: Optional[int], round: int
+    ) -> List[dict]:
+        """Run a trial of each candidate with `evaluate' of a worker pool"""
+        models = [
+            self._Model(hyper_parameters=hyper_parameters)
+            for hyper_parameters in candidates
+        ]
+        entries = evaluate(models, n_train, keep_models=False)
+        trials = []
+        for hyper_parameters, entry in zip(candidates, entries):
+            trials.append({
+                "hyper_parameters": hyper_parameters,
+                "metrics": entry["metrics"],
+                "fit_time": entry["fit_time"],
+                "n_train": n_train,
+                "round": round,
+                "error": entry["error"],
+            })
+        self._trials.extend(trials)
+        return trials
+
+    def _check_type(self, pipeline: Pipeline) -> None:
+        """Make sure the model fits the target feature of the pipeline"""
+        pipeline._check_same_type(pipeline.target_feature, self._Model())
+
+    def _worker_pool(
+        self, pipeline: Pipeline, n_candidates: int
+    ) -> ContextManager[Callable[..., List[dict]]]:
+        """Worker pool of the pipeline that holds out the validation rows"""
+        if self._max_workers is not None:
+            max_workers = self._max_workers
+        else:
+            max_workers = default_workers(n_candidates)
+        return pipeline.worker_pool(
+            max_workers, self._validation, self._random_state
+        )
+
+    @staticmethod
+    def _rank(trial: dict) -> tuple:
+        """Later rounds first, then by `rank_key'"""
+        return (-trial["round"],) + rank_key(trial)
+
+
+class GridSearch(HyperparameterSearch):
+    """Try every combination of the values in the space."""
+
+    def candidates(self) -> List[dict]:
+        """Every combination of hyper parameter values"""
+        return list(ParameterGrid(self._space))
+
+
+class RandomSearch(HyperparameterSearch):
+    """Try random combinations of the values in the space."""
+
+    def __init__(
+        self,
+        Model: type,
+        space: Dict[str, list],
+        n_candidates: int = 10,
+        random_state: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        validation: float = 0.2,
+    ) -> None:
+        """Create a random search.
+
+        Args:
+            Model (type): Model class to tune
+            space (Dict[str, list]): Values of each hyper parameter to sample
+                from, either lists or scipy.stats distributions
+            n_candidates (int): Number of configurations to sample. Defaults
+                to 10
+            random_state (int, optional): Seed of the sampling and of the
+                validation rows
+            max_workers (int, optional): Number of worker processes
+            validation (float): Fraction of the train split to evaluate on.
+                Defaults to 0.2
+        """
+        super().__init__(
+            Model, space, max_workers, validation, random_state
+        )
+        self._n_candidates = n_candidates
+
+    def candidates(self) -> List[dict]:
+        """Sampled hyper parameter combinations"""
+        return list(ParameterSampler(
+            self._space, self._n_candidates, random_state=self._random_state
+        ))
+
+
+class SuccessiveHalving(HyperparameterSearch):
+    """Stop bad configurations early by training on a growing budget of rows.
+
+    All candidates are first trained on a small number of random rows of
+    the train split, stratified for a categorical target. Only the best
+    1 / `factor' of them get `factor' times as many rows in the next round,
+    until one candidate is left or the budget is the whole train split. The
+    survivors are then trained on the whole train split. Most candidates
+    thus only cost a fraction of a full fit. The validation rows are the
+    same in every round.
+    """
+
+    def __init__(
+        self,
+        Model: type,
+        space: Dict[str, list],
+        factor: int = 3,
+        min_train: int = 20,
+        n_candidates: Optional[int] = None,
+        random_state: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        validation: float = 0.2,
+    ) -> None:
+        """Create a successive halving search.
+
+        Args:
+            Model (type): Model class to tune
+            space (Dict[str, list]): Values of each hyper parameter
+            factor (int): Fraction of candidates kept and growth of the
+                budget per round. Defaults to 3
+            min_train (int): Minimum number of rows of the first round.
+                Defaults to 20
+            n_candidates (int, optional): Sample this many random candidates
+                from the space like `RandomSearch'. Defaults to the whole
+                grid like `GridSearch'.
+            random_state (int, optional): Seed of the sampling, the rows of
+                each round and the validation rows
+            max_workers (int, optional): Number of worker processes
+            validation (float): Fraction of the train split to evaluate on.
+                Defaults to 0.2
+        """
+        super().__init__(
+            Model, space, max_workers, validation, random_state
+        )
+        if factor < 2:
+            raise ValueError(f"factor must be at least 2, got {factor}")
+        self._factor = factor
+        self._min_train = min_train
+        self._n_candidates = n_candidates
+
+    def candidates(self) -> List[dict]:
+        """The whole grid or sampled combinations"""
+        if self._n_candidates is None:
+            return list(ParameterGrid(self._space))
+        return list(ParameterSampler(
+            self._space, self._n_candidates, random_state=self._random_state
+        ))
+
+    def run(self, pipeline: Pipeline) -> List[dict]:
+        """Run the rounds of successive halving.
+
+        Args:
+            pipeline (Pipeline): Pipeline of the dataset, features and
+                metrics to tune the model on
+
+        Returns:
+            List[dict]: The trials of all rounds, see `trials'
+        """
+        self._check_type(pipeline)
+        survivors = self.candidates()
+        with self._worker_pool(pipeline, len(survivors)) as evaluate:
+            self._trials = []
+            n_rows = pipeline.fit_size
+            n_train = self.first_budget(len(survivors), n_rows)
+            round = 0
+            while len(survivors) > 1 and n_train < n_rows:
+                trials = self._evaluate(evaluate, survivors, n_train, round)
+                n_keep = math.ceil(len(survivors) / self._factor)
+                survivors = [
+                    trial["hyper_parameters"]
+                    for trial in sorted(trials, key=rank_key)[:n_keep]
+                ]
+                n_train *= self._factor
+                round += 1
+            self._evaluate(evaluate, survivors, None, round)
+        return self.trials
+
+    def first_budget(self, n_candidates: int, n_rows: int) -> int:
+        """Number of train rows of the first round, such that the last
+        round, with one candidate left, gets about all rows.
+
+        Args:
+            n_candidates (int): Number of candidates
+            n_rows (int): Number of rows to fit on, see
+                `Pipeline.fit_size'
+
+        Returns:
+            int: Number of rows
+        """
+        n_rounds = math.ceil(math.log(max(n_candidates, 1), self._factor))
+        return max(self._min_train, n_rows // self._factor**n_rounds)
+
+
+SEARCHES = {
+    "Grid Search": GridSearch,
+    "Random Search": RandomSearch,
+    "Successive Halving": SuccessiveHalving,
+}
@@ -1,7 +1,46 @@
+import hashlib
+import io
+import mmap
 import os
+import shutil
+import tempfile
+import threading
 from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
 from glob import glob
-from typing import List
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+
+from autoop.core.compression import (
+    DEFAULT_CODEC,
+    Codec,
+    CompressingWriter,
+    compress,
+    decompress,
+    get_codec,
+    is_compressed,
+    open_decompressed,
+    payload_kind,
+)
+
+# Bytes read or written at once when streaming
+CHUNK_SIZE = 1024 ** 2
+
+# Files are created with the permissions `open' would give them. The umask
+# can only be read by setting it, so it is read once.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
 
 
 class NotFoundError(Exception):
@@ -36,6 +75,87 @@ class Storage(ABC):
         """
         pass
 
+    def load_view(self, path: str) -> memoryview:
+        """
+        Load data from a given path as a read-only view. Backends that can
+        map the data into memory should override this to avoid copying it,
+        the default wraps `load'.
+        Args:
+            path (str): Path to load data
+        Returns:
+            memoryview: Read-only view of the data
+        """
+        return memoryview(self.load(path)).toreadonly()
+
+    @contextmanager
+    def open_writer(self, path: str) -> Iterator[BinaryIO]:
+        """
+        Open a stream to write the data of a given path. The data replaces
+        the old data only when the block exits without an exception, a
+        failed write leaves the old data. Backends that can write without
+        holding all data in memory should override this, the default
+        collects the data and saves it at once.
+        Args:
+            path (str): Path to save data
+        Yields:
+            BinaryIO: Writable stream
+        """
+        buffer = io.BytesIO()
+        yield buffer
+        self.save(buffer.getvalue(), path)
+
+    def open_reader(self, path: str) -> BinaryIO:
+        """
+        Open a stream to read the data of a given path. Backends that can
+        read part of the data should override this, the default loads all
+        data. Close the stream when done, e.g. with a with block.
+        Args:
+            path (str): Path to load data
+        Returns:
+            BinaryIO: Readable stream
+        """
+        return io.BytesIO(self.load(path))
+
+    def save_chunks(self, chunks: Iterable[bytes], path: str) -> None:
+        """
+        Save data given as chunks, see `open_writer'
+        Args:
+            chunks (Iterable[bytes]): Consecutive pieces of the data
+            path (str): Path to save data
+        """
+        with self.open_writer(path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+
+    def load_chunks(
+        self, path: str, chunk_size: int = CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """
+        Load data in chunks, see `open_reader'
+        Args:
+            path (str): Path to load data
+            chunk_size (int): Maximum size of a chunk. Defaults to 1 MiB
+        Yields:
+            bytes: Consecutive pieces of the data
+        """
+        with self.open_reader(path) as reader:
+            yield from iter(partial(reader.read, chunk_size), b"")
+
+    def append(self, data: bytes, path: str) -> None:
+        """
+        Append data to the end of a given path. Creates the path if it does
+        not exist yet. Subclasses should override this when the backend
+        supports appending without rewriting the existing data.
+        Args:
+            data (bytes): Data to append
+            path (str): Path to append data to
+        """
+        try:
+            existing = self.load(path)
+        except NotFoundError:
+            existing = b""
+        self.save(existing + data, path)
+
     @abstractmethod
     def delete(self, path: str) -> None:
         """
@@ -75,12 +195,53 @@ class LocalStorage(Storage):
             data (bytes): Data to save
             path (str): Path to save data
         """
-        path = self._join_path(key)
-        if not os.path.exists(path):
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "wb") as f:
+        with self.open_writer(key) as f:
             f.write(data)
 
+    @contextmanager
+    def open_writer(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Open a temporary file next to the file of a given path, which is
+        renamed over it when the block exits without an exception. The
+        file is flushed to the disk before the rename, which is atomic, so
+        readers see either the old or the new data, also if the process or
+        the machine crashes while writing.
+        Args:
+            path (str): Path to save data
+        Yields:
+            BinaryIO: The temporary file
+        """
+        path = self._join_path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Renaming a new file, instead of truncating the old one, also
+        # keeps views that map the old file valid.
+        file, temporary = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            # mkstemp makes the file private to the user
+            os.chmod(temporary, FILE_MODE)
+            with os.fdopen(file, "wb") as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        _fsync_directory(directory)
+
+    def open_reader(self, key: str) -> BinaryIO:
+        """
+        Open the file of a given path
+        Args:
+            path (str): Path to load data
+        Returns:
+            BinaryIO: The file, opened for reading
+        """
+        path = self._join_path(key)
+        self._assert_path_exists(path)
+        return open(path, "rb")
+
     def load(self, key: str) -> bytes:
         """
         Load data from a given path
@@ -94,6 +255,37 @@ class LocalStorage(Storage):
         with open(path, "rb") as f:
             return f.read()
 
+    def load_view(self, key: str) -> memoryview:
+        """
+        Map the file of a given path into memory, without reading it. The
+        pages are read on access and shared with other processes that map
+        the same file. The view stays valid after the data is overwritten
+        or deleted.
+        Args:
+            path (str): Path to load data
+        Returns:
+            memoryview: Read-only view of the data
+        """
+        path = self._join_path(key)
+        self._assert_path_exists(path)
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")  # Empty files can not be mapped
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mapped)
+
+    def append(self, data: bytes, key: str) -> None:
+        """
+        Append data to the end of a given path without rewriting it
+        Args:
+            data (bytes): Data to append
+            path (str): Path to append data to
+        """
+        path = self._join_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(data)
+
     def delete(self, key: str = "/") -> None:
         """
         Delete data at a given path
@@ -110,12 +302,16 @@ class LocalStorage(Storage):
         Args:
             path (str): Path to list
         Returns:
-            list: List of paths
+            list: List of keys, relative to the base path such that they can
+                be loaded
         """
         path = self._join_path(prefix)
         self._assert_path_exists(path)
-        keys = glob(path + "/**/*", recursive=True)
-        return list(filter(os.path.isfile, keys))
+        paths = glob(path + "/**/*", recursive=True)
+        return [
+            os.path.relpath(path, self._base_path).replace(os.sep, "/")
+            for path in paths if os.path.isfile(path)
+        ]
 
     def _assert_path_exists(self, path: str) -> None:
         """
@@ -130,3 +326,452 @@ class LocalStorage(Storage):
 
     def _join_path(self, path: str) -> str:
         return os.path.join(self._base_path, path)
+
+
+# Codec of each kind of payload (see compression.payload_kind) that
+# CompressedStorage uses by default. None stores the payload as is.
+DEFAULT_CODECS = {
+    # Would not shrink
+    "compressed": None,
+    # Uncompressed on purpose, such that reads can map the columns directly
+    "feather": None,
+    # Models and pipelines
+    "pickle": DEFAULT_CODEC,
+    # CSV datasets, JSON traces
+    "text": DEFAULT_CODEC,
+    "binary": DEFAULT_CODEC,
+}
+
+
+class CompressedStorage(Storage):
+    """Storage that compresses the data before it is saved in the wrapped
+    storage and decompresses it when it is loaded.
+
+    The codec is chosen per kind of payload, e.g. pickled models or csv
+    datasets, which follows the type of the artifact. Compressed data
+    starts with a header with its codec, so data saved with other codecs or
+    uncompressed (e.g. before the storage was wrapped) loads the same way.
+    Payloads that are small or do not shrink are stored as is.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        codecs: Dict[str, Optional[str]] = DEFAULT_CODECS,
+        min_size: int = 1024,
+        chunk_size: int = 1024 ** 2,
+    ) -> None:
+        """Wrap a storage.
+
+        Args:
+            storage (Storage): Storage to save the compressed data in
+            codecs (Dict[str, Optional[str]]): Name of the codec of each kind
+                of payload, see `compression.payload_kind' and
+                `compression.CODECS'. None to store that kind as is.
+                Kinds that are missing use the default codec. Defaults to
+                `DEFAULT_CODECS'
+            min_size (int): Payloads smaller than this many bytes are stored
+                as is. Defaults to 1024
+            chunk_size (int): Bytes compressed at once. Defaults to 1 MiB
+        """
+        self._storage = storage
+        self._codecs = {
+            kind: None if name is None else get_codec(name)
+            for kind, name in codecs.items()
+        }
+        self._default = get_codec(DEFAULT_CODEC)
+        self._min_size = min_size
+        self._chunk_size = chunk_size
+
+    def save(self, data: bytes, key: str) -> None:
+        """
+        Compress data and save it
+        Args:
+            data (bytes): Data to save
+            key (str): Key to save data under
+        """
+        codec = None
+        if len(data) >= self._min_size:
+            codec = self._choose_codec(data)
+        if codec is not None:
+            compressed = compress(data, codec, self._chunk_size)
+            if len(compressed) < len(data):
+                self._storage.save(compressed, key)
+                return
+        if is_compressed(data):
+            # Would be decompressed when loaded
+            data = compress(data, get_codec("none"), self._chunk_size)
+        self._storage.save(data, key)
+
+    def load(self, key: str) -> bytes:
+        """
+        Load data and decompress it
+        Args:
+            key (str): Key to load data of
+        Returns:
+            bytes: Loaded data
+        """
+        return decompress(self._storage.load(key))
+
+    def load_view(self, key: str) -> memoryview:
+        """
+        Load a view of the data. Data that is stored as is keeps the view of
+        the wrapped storage, e.g. a memory map.
+        Args:
+            key (str): Key to load data of
+        Returns:
+            memoryview: Read-only view of the data
+        """
+        view = self._storage.load_view(key)
+        if not is_compressed(view):
+            return view
+        return memoryview(decompress(view)).toreadonly()
+
+    @contextmanager
+    def open_writer(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Open a stream that compresses chunk by chunk into a writer of the
+        wrapped storage. Unlike `save', data that does not shrink is stored
+        compressed as well, since the choice is made on the first bytes.
+        Args:
+            key (str): Key to save data under
+        Yields:
+            BinaryIO: Writable stream
+        """
+        with self._storage.open_writer(key) as sink:
+            writer = CompressingWriter(
+                sink, self._choose_codec, self._min_size
+            )
+            yield writer
+            writer.finish()
+
+    def open_reader(self, key: str) -> BinaryIO:
+        """
+        Open a stream that decompresses a reader of the wrapped storage
+        chunk by chunk
+        Args:
+            key (str): Key to load data of
+        Returns:
+            BinaryIO: Readable stream of the uncompressed data
+        """
+        return open_decompressed(
+            self._storage.open_reader(key), self._chunk_size
+        )
+
+    def delete(self, key: str) -> None:
+        """
+        Delete data at a given key
+        Args:
+            key (str): Key to delete
+        """
+        self._storage.delete(key)
+
+    def _choose_codec(self, data: Union[bytes, memoryview]) -> Optional[Codec]:
+        """Codec for the kind of payload that starts with `data'"""
+        return self._codecs.get(payload_kind(data), self._default)
+
+    def list(self, prefix: str) -> List[str]:
+        """
+        List all keys under a given prefix
+        Args:
+            prefix (str): Prefix to list
+        Returns:
+            list: List of keys
+        """
+        return self._storage.list(prefix)
+
+
+# Where ContentAddressedStorage keeps its pointers and its blobs
+REFS_PREFIX = "refs"
+BLOBS_PREFIX = "blobs"
+
+
+class ContentAddressedStorage(Storage):
+    """Storage that deduplicates data by its content.
+
+    The data is stored once as a blob under its SHA-256 digest in the
+    wrapped storage. Every key is a small pointer to a digest, so keys with
+    the same data share one blob. Saving data that is already stored costs
+    one hash and no write of the data. A blob is deleted when the last key
+    that points to it is deleted or overwritten.
+
+    Layout in the wrapped storage:
+        refs/<key>               the digest of the data of the key
+        blobs/<digest[:2]>/<digest[2:]>  the data
+
+    Keys stored directly in the wrapped storage, before it was wrapped, can
+    still be loaded and deleted. Saving such a key moves it to a pointer and
+    removes the old data.
+
+    The reference counts are kept in memory and rebuilt from the pointers
+    when the storage is created, so only one process should write to it.
+    """
+
+    def __init__(
+        self, storage: Storage, spool_size: int = 16 * 1024 ** 2
+    ) -> None:
+        """Wrap a storage.
+
+        Args:
+            storage (Storage): Storage to keep the blobs and the pointers in
+            spool_size (int): Streams written with `open_writer' are kept in
+                memory up to this many bytes, and in a temporary file beyond.
+                Defaults to 16 MiB
+        """
+        self._storage = storage
+        self._spool_size = spool_size
+        self._lock = threading.RLock()
+        self._refs: Dict[str, str] = {}
+        self._counts: Counter = Counter()
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Reload the pointers and recount the references."""
+        with self._lock:
+            self._refs = {}
+            self._counts = Counter()
+            try:
+                keys = self._storage.list(REFS_PREFIX)
+            except NotFoundError:
+                keys = []
+            for ref in keys:
+                digest = self._storage.load(ref).decode()
+                self._refs[ref[len(REFS_PREFIX) + 1:]] = digest
+                self._counts[digest] += 1
+
+    def save(self, data: bytes, key: str) -> None:
+        """
+        Point `key' to `data', writing the data only if no key has it yet
+        Args:
+            data (bytes): Data to save
+            key (str): Key to save data under
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        self._point(key, digest, partial(self._storage.save, data))
+
+    @contextmanager
+    def open_writer(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Open a stream that hashes the data while it is written. The data is
+        spooled to a temporary file, because the blob it belongs to is only
+        known at the end, and then copied into a writer of the wrapped
+        storage if no key has it yet.
+        Args:
+            key (str): Key to save data under
+        Yields:
+            BinaryIO: Writable stream
+        """
+        with tempfile.SpooledTemporaryFile(self._spool_size) as spool:
+            writer = _HashingWriter(spool)
+            yield writer
+
+            def write_blob(blob: str) -> None:
+                spool.seek(0)
+                with self._storage.open_writer(blob) as sink:
+                    shutil.copyfileobj(spool, sink, CHUNK_SIZE)
+
+            self._point(key, writer.hexdigest(), write_blob)
+
+    def open_reader(self, key: str) -> BinaryIO:
+        """
+        Open a reader of the blob a key points to in the wrapped storage
+        Args:
+            key (str): Key to load data of
+        Returns:
+            BinaryIO: Readable stream
+        """
+        digest = self._get_digest(key)
+        if digest is None:
+            return self._storage.open_reader(key)
+        return self._storage.open_reader(_blob_key(digest))
+
+    def load(self, key: str) -> bytes:
+        """
+        Load the data a key points to
+        Args:
+            key (str): Key to load data of
+        Returns:
+            bytes: Loaded data
+        """
+        digest = self._get_digest(key)
+        if digest is None:
+            return self._storage.load(key)  # Stored before it was wrapped
+        return self._storage.load(_blob_key(digest))
+
+    def load_view(self, key: str) -> memoryview:
+        """
+        Load a view of the data a key points to from the wrapped storage.
+        Blobs are never overwritten, so a view stays valid.
+        Args:
+            key (str): Key to load data of
+        Returns:
+            memoryview: Read-only view of the data
+        """
+        digest = self._get_digest(key)
+        if digest is None:
+            return self._storage.load_view(key)
+        return self._storage.load_view(_blob_key(digest))
+
+    def delete(self, key: str) -> None:
+        """
+        Delete a key, and its data if no other key points to it
+        Args:
+            key (str): Key to delete
+        """
+        with self._lock:
+            digest = self._get_digest(key)
+            if digest is None:
+                self._storage.delete(key)
+                return
+            self._storage.delete(_ref_key(key))
+            del self._refs[key]
+            self._release(digest)
+            # Left behind if the process stopped while saving the key
+            self._delete_legacy(key)
+
+    def list(self, prefix: str) -> List[str]:
+        """
+        List all keys under a given prefix
+        Args:
+            prefix (str): Prefix to list
+        Returns:
+            list: List of keys
+        """
+        prefix = prefix.strip("/")
+        with self._lock:
+            keys = [
+                key for key in self._refs
+                if not prefix or key.startswith(prefix + "/")
+            ]
+        try:
+            stored = self._storage.list(prefix)
+        except NotFoundError:
+            stored = []
+        keys += [
+            key for key in stored
+            if key.split("/")[0] not in (REFS_PREFIX, BLOBS_PREFIX)
+        ]
+        return sorted(set(keys))
+
+    def digest(self, key: str) -> Optional[str]:
+        """Return the SHA-256 digest of the data of a key, None if it was
+        stored before the storage was wrapped or does not exist."""
+        return self._get_digest(key)
+
+    def references(self, digest: str) -> int:
+        """Return the number of keys that point to the blob `digest'"""
+        with self._lock:
+            return self._counts[digest]
+
+    def collect_garbage(self) -> int:
+        """Delete the blobs no key points to. Those are only left behind if
+        the process stopped between writing a blob and its pointer.
+
+        Returns:
+            int: Number of deleted blobs
+        """
+        with self._lock:
+            try:
+                blobs = self._storage.list(BLOBS_PREFIX)
+            except NotFoundError:
+                return 0
+            deleted = 0
+            for blob in blobs:
+                digest = "".join(blob.split("/")[-2:])
+                if self._counts[digest] == 0:
+                    self._storage.delete(blob)
+                    deleted += 1
+            return deleted
+
+    def _get_digest(self, key: str) -> Optional[str]:
+        """Digest the key points to, also if another instance saved it."""
+        with self._lock:
+            digest = self._refs.get(key)
+            if digest is not None:
+                return digest
+            try:
+                digest = self._storage.load(_ref_key(key)).decode()
+            except NotFoundError:
+                return None
+            self._refs[key] = digest
+            self._counts[digest] += 1
+            return digest
+
+    def _point(
+        self, key: str, digest: str, write_blob: Callable[[str], None]
+    ) -> None:
+        """Point a key to the blob `digest', writing the blob with
+        `write_blob(blob key)' if no key has it yet."""
+        with self._lock:
+            old = self._get_digest(key)
+            if old == digest:
+                return
+            if self._counts[digest] == 0:
+                # The blob goes first, such that a pointer is never dangling
+                write_blob(_blob_key(digest))
+            self._storage.save(digest.encode(), _ref_key(key))
+            self._refs[key] = digest
+            self._counts[digest] += 1
+            if old is not None:
+                self._release(old)
+            else:
+                # The pointer replaces data saved before wrapping, if any
+                self._delete_legacy(key)
+
+    def _delete_legacy(self, key: str) -> None:
+        """Delete the data of a key stored before the storage was wrapped"""
+        try:
+            self._storage.delete(key)
+        except NotFoundError:
+            pass
+
+    def _release(self, digest: str) -> None:
+        """Drop a reference to a blob and delete it if it was the last"""
+        self._counts[digest] -= 1
+        if self._counts[digest] <= 0:
+            del self._counts[digest]
+            self._storage.delete(_blob_key(digest))
+
+
+def _fsync_directory(directory: str) -> None:
+    """Flush a directory to the disk, such that a file renamed into it is
+    there after a crash. Not possible on Windows, which does not need it."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    file = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(file)
+    finally:
+        os.close(file)
+
+
+def _ref_key(key: str) -> str:
+    return f"{REFS_PREFIX}/{key}"
+
+
+def _blob_key(digest: str) -> str:
+    return f"{BLOBS_PREFIX}/{digest[:2]}/{digest[2:]}"
+
+
+class _HashingWriter(io.RawIOBase):
+    """Stream that computes the SHA-256 digest of what it writes"""
+
+    def __init__(self, sink: BinaryIO) -> None:
+        self._sink = sink
+        self._hash = hashlib.sha256()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data: Union[bytes, memoryview]) -> int:
+        self._hash.update(data)
+        self._sink.write(data)
+        self._position += memoryview(data).nbytes
+        return memoryview(data).nbytes
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
@@ -1,19 +1,39 @@
+from __future__ import annotations
+
 import logging
-from typing import Any, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
+from itertools import islice
+from typing import Any, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import infer_dtype, is_numeric_dtype
 
 from autoop.core.ml.dataset import Dataset
-from autoop.core.ml.feature import Feature
+from autoop.core.ml.feature import Feature, InferredFeature
 
 logger = logging.getLogger(__name__)
 rejection_logger = logging.getLogger("rejection_92165")
 
+# Runs the full scans that confirm sampled feature types in the background
+_full_scan_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="feature-scan"
+)
+
 
-def detect_feature_types(dataset: Dataset) -> List[Feature]:
+def detect_feature_types(
+    dataset: Dataset,
+    sample_size: Optional[int] = None,
+    random_state: Optional[int] = None,
+) -> List[Feature]:
     """Assumption: only categorical and numerical features and no NaN values.
     Args:
         dataset: Dataset
+        sample_size (int, optional): Infer the types from a random sample of
+            this many rows instead of from all rows. Faster, but a value that
+            does not fit the type could be missed. Defaults to all rows.
+        random_state (int, optional): Seed of the sample. Defaults to None
     Returns:
         List[Feature]: List of features with their types.
     """
@@ -21,7 +41,183 @@ def detect_feature_types(dataset: Dataset) -> List[Feature]:
         f"Excpected a Dataset for dataset. Got {type(dataset)}"
     )
     df = dataset.read()
+    if sample_size is not None and sample_size < len(df):
+        df = df.sample(n=sample_size, random_state=random_state)
+    return _classify_columns(df)
+
+
+def infer_feature_types(
+    dataset: Dataset,
+    sample_size: int = 1000,
+    n_chunks: Optional[int] = None,
+    chunk_size: int = 10000,
+    max_chunks: int = 10,
+    random_state: Optional[int] = None,
+    full_scan: bool = False,
+) -> Tuple[List[InferredFeature], Optional[Future]]:
+    """Infer the feature types from part of the rows, for when
+    `detect_feature_types' is too slow for interactive use.
+
+    By default the rows are a stratified sample: the dataset is divided in
+    `sample_size' consecutive strata and one random row of each stratum is
+    checked, such that a sorted dataset is still covered from start to end.
+    Only the sampled rows are decoded. Formats that do not store the number
+    of rows, like csv, are sampled from their first `max_chunks' chunks of
+    `chunk_size' rows instead, since counting their rows means parsing all
+    of them. With `n_chunks' the first `n_chunks' chunks are checked
+    entirely.
+
+    Each column gets the type most of its checked values fit, where numbers
+    and strings that can be converted to numbers fit "numerical" and other
+    strings fit "categorical". Its confidence is the probability that the
+    next unchecked value also fits that type, (k + 1) / (n + 2) for k out of
+    n checked values fitting it (Laplace's rule of succession), or k / n if
+    all rows were checked. Columns with NaNs, or of which at most half of
+    the values fit one type, are left out, like `detect_feature_types'
+    leaves out columns with NaNs or mixed values.
+
+    Args:
+        dataset (Dataset): Dataset
+        sample_size (int): Number of rows in the stratified sample. Defaults
+            to 1000
+        n_chunks (int, optional): Use the first `n_chunks' chunks instead of
+            a stratified sample. Defaults to None
+        chunk_size (int): Number of rows per chunk. Defaults to 10000
+        max_chunks (int): Number of leading chunks the stratified sample is
+            taken from for formats that do not store the number of rows.
+            Defaults to 10
+        random_state (int, optional): Seed of the sample. Defaults to None
+        full_scan (bool): Also run `detect_feature_types' on all rows in a
+            background thread. Defaults to False
+
+    Returns:
+        Tuple[List[InferredFeature], Optional[Future]]: The inferred features
+            and, if `full_scan', a future with the features of the full scan.
+    """
+    assert isinstance(dataset, Dataset), (
+        f"Excpected a Dataset for dataset. Got {type(dataset)}"
+    )
+    if n_chunks is not None:
+        with closing(dataset.iter_chunks(chunk_size)) as chunks:
+            leading = list(islice(chunks, n_chunks))
+        sample = pd.concat(leading) if leading else pd.DataFrame()
+        # Fewer chunks than asked means that the whole dataset was read
+        all_rows_checked = len(leading) < n_chunks
+    else:
+        sample, all_rows_checked = _stratified_sample(
+            dataset, sample_size, chunk_size, max_chunks, random_state
+        )
+
+    rows_checked = len(sample)
+    features = []
+    for name, feature_type, fitting in _vote_columns(sample):
+        if all_rows_checked:
+            confidence = fitting / rows_checked
+        else:
+            confidence = (fitting + 1) / (rows_checked + 2)
+        features.append(InferredFeature(
+            type=feature_type,
+            name=name,
+            confidence=confidence,
+            rows_checked=rows_checked,
+        ))
+    scan = None
+    if full_scan:
+        scan = _full_scan_executor.submit(detect_feature_types, dataset)
+    return features, scan
+
+
+def _stratified_sample(
+    dataset: Dataset,
+    sample_size: int,
+    chunk_size: int,
+    max_chunks: int,
+    random_state: Optional[int],
+) -> Tuple[pd.DataFrame, bool]:
+    """Get the stratified sample of `infer_feature_types' and whether it
+    holds all rows of the dataset. Only the sampled rows are decoded if the
+    format stores the number of rows, otherwise the sample is taken from the
+    first `max_chunks' chunks."""
+    n_rows = dataset.count_rows()
+    if n_rows is not None:
+        rows = _stratified_rows(n_rows, sample_size, random_state)
+        return dataset.take(rows), len(rows) == n_rows
+    with closing(dataset.iter_chunks(chunk_size)) as chunks:
+        leading = list(islice(chunks, max_chunks))
+    if not leading:
+        return pd.DataFrame(), True
+    frame = pd.concat(leading)
+    rows = _stratified_rows(len(frame), sample_size, random_state)
+    # A chunk that is not full means that the whole dataset was read
+    read_all = len(leading) < max_chunks or len(leading[-1]) < chunk_size
+    all_rows_checked = read_all and len(rows) == len(frame)
+    return frame.iloc[rows], all_rows_checked
 
+
+def _stratified_rows(
+    n_rows: int, sample_size: int, random_state: Optional[int]
+) -> np.ndarray:
+    """Get the indices of one random row out of each of `sample_size'
+    equally sized consecutive strata."""
+    if sample_size >= n_rows:
+        return np.arange(n_rows)
+    edges = np.linspace(0, n_rows, sample_size + 1)
+    rng = np.random.default_rng(random_state)
+    offsets = rng.random(sample_size) * (edges[1:] - edges[:-1])
+    return (edges[:-1] + offsets).astype(int)
+
+
+def _vote_columns(df: pd.DataFrame) -> List[Tuple[str, str, int]]:
+    """Get the name of each column of `df' with the type most of its values
+    fit and the number of values that fit it. Numbers and strings that can
+    be converted to numbers fit "numerical", other strings fit
+    "categorical". A column whose values all fit a type gets the same type
+    as from `_classify_columns'. Columns with NaNs or without a type that
+    more than half of the values fit are left out."""
+    votes = []
+    for column_name in df:
+        series = df[column_name]
+        if series.hasnans:
+            continue
+        numbers, text = _count_types(series)
+        # Like in `_classify_columns', numbers win from strings
+        if numbers >= text:
+            feature_type, fitting = "numerical", numbers
+        else:
+            feature_type, fitting = "categorical", text
+        if 2 * fitting <= len(series):
+            rejection_logger.info(
+                f"Column {column_name} with type {series.dtype} is rejected"
+            )
+            continue
+        votes.append((str(column_name), feature_type, fitting))
+    return votes
+
+
+def _count_types(series: pd.Series) -> Tuple[int, int]:
+    """Count the values of the series that are numbers or can be converted
+    to numbers, and the strings that can not."""
+    if is_numeric_dtype(series.dtype):  # Includes booleans
+        return len(series), 0
+    values = series.astype(object)
+    strings = values.map(lambda value: isinstance(value, str)).to_numpy()
+    # Like in `_is_numerical', only values that can not be converted at once
+    # are checked one by one
+    try:
+        numbers = pd.to_numeric(values, errors="coerce").notna()
+        numbers = numbers.to_numpy(copy=True)
+    except (TypeError, ValueError):
+        numbers = np.zeros(len(values), dtype=bool)
+    unconverted = ~numbers
+    numbers[unconverted] = [
+        _is_number(value) for value in values[unconverted]
+    ]
+    return int(numbers.sum()), int((strings & ~numbers).sum())
+
+
+def _classify_columns(df: pd.DataFrame) -> List[Feature]:
+    """Get a numerical or categorical feature of each column of `df'.
+    Columns with NaNs or mixed values are left out."""
     features = []
     for column_name in df:
         if df[column_name].hasnans:
@@ -33,7 +229,7 @@ def detect_feature_types(dataset: Dataset) -> List[Feature]:
             )
             features.append(feature)
         # elif such this one does not need to be checked if numerical
-        elif _is_categorical(df[column_name]):
+        elif _contains_only_strings(df[column_name]):
             feature = Feature(
                 type="categorical",
                 name=str(column_name),
@@ -54,18 +250,21 @@ def _is_numerical(series: pd.Series) -> bool:
     or a string and then we test whether the string is convertable to a number.
     """
     # Quick checks:
-    if series.dtype in ["int64", "float"]:
+    if is_numeric_dtype(series.dtype):  # Includes booleans
         return True
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Only the used categories have to be checked, not every element.
+        categories = series.cat.remove_unused_categories().cat.categories
+        return _is_numerical(pd.Series(categories, name=series.name))
 
-    # Log rejected elements:
-    if __debug__:
+    # Convert all elements at once. Elements that can not be converted
+    # become NaN, only those have to be checked one by one. Mostly this
+    # stops at the first of them.
+    try:
+        converted = pd.to_numeric(series, errors="coerce")
+    except (TypeError, ValueError):
         return _all_elements_number(series)
-
-    # Save time with using all (no logger tho):
-    return all(
-        _is_number(element)
-        for element in series
-    )
+    return _all_elements_number(series[converted.isna().to_numpy()])
 
 
 def _is_categorical(series: pd.Series) -> bool:
@@ -79,19 +278,23 @@ def _is_categorical(series: pd.Series) -> bool:
     if _is_numerical(series):  # Comment out for efficiency (UNSAFE)
         return False
 
+    return _contains_only_strings(series)
+
+
+def _contains_only_strings(series: pd.Series) -> bool:
+    """Test whether all elements are strings, assuming the series is not
+    numerical."""
     # Quick checks
     if series.dtype in ["category", "str"]:
         return True
 
-    # Log rejected elements:
-    if __debug__:
-        return _all_elements_str(series)
+    # infer_dtype walks the elements in C and returns "string" only if all
+    # of them are strings.
+    if infer_dtype(series, skipna=False) == "string":
+        return True
 
-    # Save time with using all (no logger tho):
-    return all(
-        isinstance(element, str)
-        for element in series
-    )
+    # Logs the rejected element. Mostly the first element already is one.
+    return _all_elements_str(series)
 
 
 def _all_elements_str(series: pd.Series) -> bool:
@@ -121,7 +324,7 @@ def _is_number(value: Any) -> bool:  # noqa: ANN401
     try:
         float(value)
         return True
-    except ValueError:
+    except (TypeError, ValueError):
         return False
 
 
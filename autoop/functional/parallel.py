@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from typing import Dict
+
+import numpy as np
+
+
+class SharedArrays:
+    """Share arrays read-only with worker processes without pickling them.
+
+    The arrays are written once to .npy files in a temporary directory.
+    Workers get the (small) paths and memory map the files, such that all
+    processes read the same pages of the OS page cache instead of each
+    holding a copy. Use as a context manager to remove the files afterwards.
+
+    Example:
+        with SharedArrays({"X": X, "y": y}) as paths:
+            executor.submit(work, paths)  # work calls load_shared(paths)
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]) -> None:
+        """Create the shared arrays.
+
+        Args:
+            arrays (Dict[str, np.ndarray]): Arrays to share by name
+        """
+        self._arrays = arrays
+        self._directory = None
+
+    def __enter__(self) -> Dict[str, str]:
+        """Write the arrays.
+
+        Returns:
+            Dict[str, str]: Path of the file of each array by name
+        """
+        self._directory = tempfile.mkdtemp(prefix="autoop-shared-")
+        paths = {}
+        for name, array in self._arrays.items():
+            paths[name] = os.path.join(self._directory, f"{name}.npy")
+            np.save(paths[name], np.ascontiguousarray(array))
+        return paths
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Remove the files. Workers that still map them keep their view."""
+        shutil.rmtree(self._directory, ignore_errors=True)
+        self._directory = None
+
+
+def load_shared(paths: Dict[str, str]) -> Dict[str, np.ndarray]:
+    """Open arrays shared by `SharedArrays' as read-only memory maps.
+
+    Args:
+        paths (Dict[str, str]): Path of the file of each array by name
+
+    Returns:
+        Dict[str, np.ndarray]: Read-only arrays by name
+    """
+    return {
+        name: np.load(path, mmap_mode="r") for name, path in paths.items()
+    }
+
+
+def default_workers(n_tasks: int) -> int:
+    """Number of worker processes for `n_tasks' independent tasks: one per
+    task, but no more than there are cores available to this process."""
+    try:
+        n_cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on every platform
+        n_cores = os.cpu_count() or 1
+    return max(1, min(n_tasks, n_cores))
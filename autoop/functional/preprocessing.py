@@ -1,4 +1,6 @@
-from typing import List, Tuple
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
@@ -28,7 +30,7 @@ def preprocess_features(
         list[Tuple[str, np.ndarray, dict]]:
             A list of tuples where each tuple contains:
                 - name (str): Name of the feature.
-                - encoded_data (np.ndarray | OneHotArray):
+                - encoded_data (Union[np.ndarray, OneHotArray]):
                     Data array of the feature with either scalar or one-hot
                     binary arrays.
                 - artifact_dict (dict): Artifact dictionary with:
@@ -44,7 +46,7 @@ def preprocess_features(
         if feature.type == "categorical":
             encoder = OneHotEncoder()
             data = encoder.fit_transform(
-                raw[feature.name].values.reshape(-1, 1)
+                raw[feature.name].to_numpy().reshape(-1, 1)
             ).toarray()
             aritfact = {
                 "type": "OneHotEncoder",
@@ -54,7 +56,7 @@ def preprocess_features(
         if feature.type == "numerical":
             scaler = StandardScaler()
             data = scaler.fit_transform(
-                raw[feature.name].values.reshape(-1, 1)
+                raw[feature.name].to_numpy().reshape(-1, 1)
             )
             artifact = {
                 "type": "StandardScaler",
@@ -66,6 +68,200 @@ def preprocess_features(
     return results
 
 
+def preprocess_dataset(
+    input_features: List[Feature], target_feature: Feature, dataset: Dataset
+) -> Tuple[np.ndarray, np.ndarray, Dict[str, dict]]:
+    """
+    Encode the input features and the target feature in one pass over the
+    dataset. Same encoding as `preprocess_features', but the dataset is read
+    once, only the needed columns are selected, all numerical columns are
+    scaled by one StandardScaler and all categorical columns are encoded by
+    one OneHotEncoder.
+
+    Args:
+        input_features (List[Feature]): Features to encode into the input
+            matrix. Its columns are ordered by feature name.
+        target_feature (Feature): Feature to encode into the output matrix.
+        dataset (Dataset): Dataset object.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, Dict[str, dict]]:
+            - input matrix of shape (N, total width of the input features)
+            - output matrix of shape (N, width of the target feature)
+            - artifact dictionary of each feature by feature name, see
+              `preprocess_features'
+    """
+    encoder = FeatureEncoder(input_features, target_feature)
+    raw: pd.DataFrame = dataset.read(encoder.columns)
+    input_matrix, output_matrix = encoder.fit(raw).transform(raw)
+    return input_matrix, output_matrix, encoder.artifacts
+
+
+class FeatureEncoder:
+    """Encodes input features and a target feature with one StandardScaler
+    for all numerical columns and one OneHotEncoder for all categorical
+    columns. Can be fitted on a whole dataframe or chunk by chunk."""
+
+    def __init__(
+        self, input_features: List[Feature], target_feature: Feature
+    ) -> None:
+        """Create an unfitted encoder.
+
+        Args:
+            input_features (List[Feature]): Features to encode into the input
+                matrix. Its columns are ordered by feature name.
+            target_feature (Feature): Feature to encode into the output
+                matrix.
+        """
+        self._input_names = sorted(
+            feature.name for feature in input_features
+            if feature.type in ["numerical", "categorical"]
+        )
+        self._target_name = target_feature.name
+        features = {
+            feature.name: feature
+            for feature in input_features + [target_feature]
+        }  # The target could also be an input, encode it only once
+        self._numerical = [
+            name for name, feature in features.items()
+            if feature.type == "numerical"
+        ]
+        self._categorical = [
+            name for name, feature in features.items()
+            if feature.type == "categorical"
+        ]
+        self._scaler = StandardScaler() if self._numerical else None
+        self._encoder = None
+        # Categories seen by partial_fit, per categorical column
+        self._categories = [set() for _ in self._categorical]
+
+    @property
+    def columns(self) -> List[str]:
+        """Names of the columns needed to encode the features"""
+        return self._numerical + self._categorical
+
+    @property
+    def artifacts(self) -> Dict[str, dict]:
+        """Artifact dictionary of each feature by feature name, see
+        `preprocess_features'"""
+        artifacts = {}
+        for name in self._numerical:
+            artifacts[name] = {
+                "type": "StandardScaler",
+                "scaler": self._scaler.get_params(),
+            }
+        for name in self._categorical:
+            artifacts[name] = {
+                "type": "OneHotEncoder",
+                "encoder": self._get_encoder().get_params(),
+            }
+        return artifacts
+
+    def fit(self, raw: pd.DataFrame) -> FeatureEncoder:
+        """Fit the scaler and the encoder on all rows.
+
+        Args:
+            raw (pd.DataFrame): Dataframe with at least `columns'
+
+        Returns:
+            FeatureEncoder: This encoder
+        """
+        if self._numerical:
+            self._scaler.fit(raw[self._numerical].values)
+        if self._categorical:
+            self._encoder = OneHotEncoder(sparse_output=False)
+            self._encoder.fit(raw[self._categorical].values)
+        return self
+
+    def partial_fit(self, chunk: pd.DataFrame) -> None:
+        """Update the scaler statistics and the seen categories with a chunk
+        of rows.
+
+        Args:
+            chunk (pd.DataFrame): Dataframe with at least `columns'
+        """
+        if self._numerical:
+            self._scaler.partial_fit(chunk[self._numerical].values)
+        for seen, name in zip(self._categories, self._categorical):
+            seen.update(pd.unique(chunk[name]))
+        self._encoder = None  # Has to be rebuilt with the new categories
+
+    def transform(self, raw: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode the features.
+
+        Args:
+            raw (pd.DataFrame): Dataframe with at least `columns'
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Input matrix of shape
+                (N, total width of the input features) and output matrix of
+                shape (N, width of the target feature)
+        """
+        # blocks maps each feature name to its columns in the encoded array
+        # of its type.
+        encoded = {}
+        blocks = {}
+        if self._numerical:
+            encoded["numerical"] = self._scaler.transform(
+                raw[self._numerical].values
+            )
+            for index, name in enumerate(self._numerical):
+                blocks[name] = ("numerical", slice(index, index + 1))
+        if self._categorical:
+            encoder = self._get_encoder()
+            encoded["categorical"] = encoder.transform(
+                raw[self._categorical].values
+            )
+            start = 0
+            for name, categories in zip(
+                self._categorical, encoder.categories_
+            ):
+                stop = start + len(categories)
+                blocks[name] = ("categorical", slice(start, stop))
+                start = stop
+
+        input_matrix = _fill_matrix(
+            self._input_names, blocks, encoded, len(raw)
+        )
+        output_matrix = _fill_matrix(
+            [self._target_name], blocks, encoded, len(raw)
+        )
+        return input_matrix, output_matrix
+
+    def _get_encoder(self) -> OneHotEncoder:
+        """Get the fitted OneHotEncoder, building it from the categories
+        seen by partial_fit if needed."""
+        if self._encoder is None:
+            categories = [np.array(sorted(seen)) for seen in self._categories]
+            self._encoder = OneHotEncoder(
+                categories=categories, sparse_output=False
+            )
+            # The categories are given, it only needs one valid row
+            self._encoder.fit(
+                np.array([[seen[0] for seen in categories]], dtype=object)
+            )
+        return self._encoder
+
+
+def _fill_matrix(
+    names: List[str],
+    blocks: Dict[str, Tuple[str, slice]],
+    encoded: Dict[str, np.ndarray],
+    n_rows: int,
+) -> np.ndarray:
+    """Copy the encoded columns of the features `names' next to each other
+    into one preallocated matrix."""
+    width = sum(blocks[name][1].stop - blocks[name][1].start for name in names)
+    matrix = np.empty((n_rows, width))
+    start = 0
+    for name in names:
+        type, columns = blocks[name]
+        stop = start + columns.stop - columns.start
+        matrix[:, start:stop] = encoded[type][:, columns]
+        start = stop
+    return matrix
+
+
 # Remark:
 # Changed:
     # Returns:
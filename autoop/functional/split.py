@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from typing import List, Tuple, Union
+
+import numpy as np
+
+
+def k_fold(
+    n_rows: int,
+    n_folds: int,
+    shuffle: bool = True,
+    random_state: Union[int, np.random.Generator, None] = None,
+) -> List[np.ndarray]:
+    """Split the rows into folds of (almost) equal size.
+
+    Args:
+        n_rows (int): Number of rows
+        n_folds (int): Number of folds
+        shuffle (bool): Whether to assign random rows to each fold instead
+            of consecutive ones. Defaults to True
+        random_state (Union[int, np.random.Generator], optional): Seed or
+            generator of the shuffling
+
+    Raises:
+        ValueError: If there are less than 2 folds or more folds than rows
+
+    Returns:
+        List[np.ndarray]: Sorted row indices of each fold. Every row is in
+        exactly one fold.
+    """
+    _check_n_folds(n_rows, n_folds)
+    if shuffle:
+        rows = np.random.default_rng(random_state).permutation(n_rows)
+    else:
+        rows = np.arange(n_rows)
+    # Sorted indices keep the reads of a fold in order of memory
+    return [np.sort(fold) for fold in np.array_split(rows, n_folds)]
+
+
+def stratified_k_fold(
+    labels: np.ndarray,
+    n_folds: int,
+    shuffle: bool = True,
+    random_state: Union[int, np.random.Generator, None] = None,
+) -> List[np.ndarray]:
+    """Split the rows into folds that each have about the same fraction of
+    every label as the whole dataset.
+
+    Args:
+        labels (np.ndarray): Label of each row, of shape (N,), or one-hot
+            rows of shape (N, number of labels)
+        n_folds (int): Number of folds
+        shuffle (bool): Whether to assign random rows of each label to each
+            fold instead of consecutive ones. Defaults to True
+        random_state (Union[int, np.random.Generator], optional): Seed or
+            generator of the shuffling
+
+    Raises:
+        ValueError: If there are less than 2 folds or more folds than rows
+
+    Returns:
+        List[np.ndarray]: Sorted row indices of each fold. Every row is in
+        exactly one fold.
+    """
+    labels = _to_labels(labels)
+    n_rows = len(labels)
+    _check_n_folds(n_rows, n_folds)
+    if shuffle:
+        rows = np.random.default_rng(random_state).permutation(n_rows)
+    else:
+        rows = np.arange(n_rows)
+    # Group the rows by label, keeping their (shuffled) order within a label,
+    # and deal them out to the folds like cards.
+    rows = rows[np.argsort(labels[rows], kind="stable")]
+    fold_of_row = np.empty(n_rows, dtype=np.intp)
+    fold_of_row[rows] = np.arange(n_rows) % n_folds
+    return [np.flatnonzero(fold_of_row == fold) for fold in range(n_folds)]
+
+
+def stratified_permutation(
+    labels: np.ndarray,
+    random_state: Union[int, np.random.Generator, None] = None,
+) -> np.ndarray:
+    """Shuffle the rows such that every prefix of the permutation has about
+    the same fraction of every label as the whole dataset, e.g. to train on
+    growing subsets of the rows.
+
+    Args:
+        labels (np.ndarray): Label of each row, of shape (N,), or one-hot
+            rows of shape (N, number of labels)
+        random_state (Union[int, np.random.Generator], optional): Seed or
+            generator of the shuffling
+
+    Returns:
+        np.ndarray: Permutation of the row indices
+    """
+    labels = _to_labels(labels)
+    n_rows = len(labels)
+    rng = np.random.default_rng(random_state)
+    rows = rng.permutation(n_rows)
+    rows = rows[np.argsort(labels[rows], kind="stable")]
+    _, starts, counts = np.unique(
+        labels[rows], return_index=True, return_counts=True
+    )
+    # Spread the rows of each label evenly over [0, 1), with some jitter
+    # such that the labels do not always come in the same order, and merge
+    rank = np.arange(n_rows) - np.repeat(starts, counts)
+    position = (rank + rng.random(n_rows)) / np.repeat(counts, counts)
+    return rows[np.argsort(position, kind="stable")]
+
+
+def _to_labels(labels: np.ndarray) -> np.ndarray:
+    """Labels of shape (N,) of labels or one-hot rows"""
+    labels = np.asarray(labels)
+    if labels.ndim == 2 and labels.shape[1] > 1:
+        return np.argmax(labels, axis=1)
+    return labels.reshape(-1)
+
+
+def _check_n_folds(n_rows: int, n_folds: int) -> None:
+    if not 2 <= n_folds <= n_rows:
+        raise ValueError(
+            f"Number of folds must be at least 2 and at most the number of "
+            f"rows ({n_rows}), got {n_folds}"
+        )
+
+
+SPLIT_STRATEGIES = ["sequential", "shuffled", "stratified"]
+
+
+def train_test_indices(
+    targets: np.ndarray,
+    split: float,
+    strategy: str = "sequential",
+    random_state: Union[int, np.random.Generator, None] = None,
+) -> Tuple[Union[np.ndarray, slice], Union[np.ndarray, slice]]:
+    """Choose the rows of the train and the test set.
+
+    Args:
+        targets (np.ndarray): Target of each row, of shape (N,) or (N, ...).
+            One-hot rows count as labels for stratification.
+        split (float): Fraction of the rows in the train set
+        strategy (str): One of `SPLIT_STRATEGIES'
+            - "sequential": the first rows are the train set
+            - "shuffled": random rows are the train set
+            - "stratified": random rows with about the same fraction of
+              every label in both sets
+            Defaults to "sequential"
+        random_state (Union[int, np.random.Generator], optional): Seed or
+            generator of the shuffling
+
+    Raises:
+        ValueError: If the strategy is unknown
+
+    Returns:
+        Tuple[Union[np.ndarray, slice], Union[np.ndarray, slice]]: Rows of
+        the train and the test set. Slices for "sequential", such that
+        indexing gives views, and sorted indices otherwise.
+    """
+    n_rows = len(targets)
+    if strategy == "sequential":
+        n_train = int(split * n_rows)
+        return slice(0, n_train), slice(n_train, n_rows)
+    if strategy not in SPLIT_STRATEGIES:
+        raise ValueError(
+            f"{strategy} is not a split strategy. Choose one of "
+            f"{SPLIT_STRATEGIES}"
+        )
+    rows = np.random.default_rng(random_state).permutation(n_rows)
+    if strategy == "shuffled":
+        n_train = int(split * n_rows)
+        return np.sort(rows[:n_train]), np.sort(rows[n_train:])
+
+    labels = _to_labels(targets)
+    # Group the shuffled rows by label and put the first `split' of the rows
+    # of each label in the train set
+    rows = rows[np.argsort(labels[rows], kind="stable")]
+    _, starts, counts = np.unique(
+        labels[rows], return_index=True, return_counts=True
+    )
+    rank = np.arange(n_rows) - np.repeat(starts, counts)
+    in_train = rank < np.repeat(np.floor(split * counts + 0.5), counts)
+    return np.sort(rows[in_train]), np.sort(rows[~in_train])
@@ -2,29 +2,54 @@ import logging
 import sys
 import unittest
 
-from app.tests.test_system import TestAutoMLSystem
+from app.tests.test_system import TestArtifactRegistry, TestAutoMLSystem
 from autoop.tests.test_artifact import TestArtifact
+from autoop.tests.test_benchmarks import TestBenchmarks
+from autoop.tests.test_compression import TestCompression
 from autoop.tests.test_database import TestDatabase
-from autoop.tests.test_features import TestFeatures
+from autoop.tests.test_dataset import TestDataset
+from autoop.tests.test_features import (
+    TestDetectFeatureTypesSample,
+    TestFeatures,
+)
+from autoop.tests.test_instrumentation import TestInstrumentation
 from autoop.tests.test_metrics import (
     TestAccuracy,
     TestMeanAbsoluteError,
     TestMeanSquaredError,
+    TestMetricContext,
+    TestOneHotClassificationMetrics,
     TestPrecision,
     TestRecall,
     TestRsquared,
+    TestStreamingMetrics,
 )
 from autoop.tests.test_model import (
     TestMultipleLinearRegression,
     TestElasticNet,
+    TestIncrementalModels,
     TestKNearestNeighbors,
     TestLogisticRegression,
     TestRadiusNeighor,
     TestRandomForest,
     TestModel,
 )
-from autoop.tests.test_pipeline import TestPipeline
-from autoop.tests.test_storage import TestStorage
+from autoop.tests.test_pipeline import (
+    TestCrossValidation,
+    TestModelRace,
+    TestPipeline,
+    TestSplitResults,
+    TestStreamingPipeline,
+    TestTrainEvaluation,
+)
+from autoop.tests.test_preprocessing import TestPreprocessing
+from autoop.tests.test_search import TestHyperparameterSearch
+from autoop.tests.test_split import TestSplit
+from autoop.tests.test_storage import (
+    TestCompressedStorage,
+    TestContentAddressedStorage,
+    TestStorage,
+)
 
 if __name__ == "__main__":
     logging.basicConfig(filename="test.log", filemode='w', level=logging.INFO)
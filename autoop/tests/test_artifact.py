@@ -24,6 +24,53 @@ class TestArtifact(unittest.TestCase):
         with self.assertRaises(AttributeError):
             artifact.data = "these are not bytes"
 
+    def test_lazy_data(self):
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return b"lazy bytes"
+
+        init_args = dict(self.init_args)
+        del init_args["data"]
+        artifact = Artifact(loader=loader, **init_args)
+        self.assertFalse(artifact.is_loaded)
+        self.assertEqual(artifact.read(), b"lazy bytes")
+        self.assertEqual(artifact.data, b"lazy bytes")
+        self.assertTrue(artifact.is_loaded)
+        self.assertEqual(len(calls), 1)
+
+    def test_writer(self):
+        init_args = dict(self.init_args)
+        del init_args["data"]
+        artifact = Artifact(
+            writer=lambda file: file.write(b"written bytes"), **init_args
+        )
+        self.assertFalse(artifact.is_loaded)
+        self.assertIsNotNone(artifact.writer)
+        self.assertEqual(artifact.read(), b"written bytes")
+        # Once the data is in memory, it is not written again
+        self.assertIsNone(artifact.writer)
+
+    def test_read_view(self):
+        artifact = Artifact(**self.init_args)
+        view = artifact.read_view()
+        self.assertEqual(bytes(view), b"test bytes string")
+        self.assertTrue(view.readonly)
+
+        init_args = dict(self.init_args)
+        del init_args["data"]
+        artifact = Artifact(
+            loader=lambda: b"copied bytes",
+            view_loader=lambda: memoryview(b"viewed bytes"),
+            **init_args
+        )
+        self.assertEqual(bytes(artifact.read_view()), b"viewed bytes")
+        self.assertFalse(artifact.is_loaded)
+        # Once the data is loaded, the view is of the loaded data
+        artifact.save(b"saved bytes")
+        self.assertEqual(bytes(artifact.read_view()), b"saved bytes")
+
 
 # Remarks:
 # most of artifact
@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from autoop.benchmarks.__main__ import main
+from autoop.benchmarks.cases import SUITES, Workload
+from autoop.benchmarks.data import synthetic_adult, synthetic_iris
+from autoop.benchmarks.harness import compare, run_benchmarks, time_case
+from autoop.core.ml.dataset_format import FeatherFormat
+from autoop.core.ml.metric import METRICS
+from autoop.core.ml.model import CLASSIFICATION_MODELS, REGRESSION_MODELS
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.workload = Workload(n_rows=300, n_entries=20)
+
+    def tearDown(self) -> None:
+        self.workload.close()
+
+    def test_synthetic_data(self):
+        iris = synthetic_iris(500, random_state=0)
+        adult = synthetic_adult(100, random_state=0)
+        self.assertEqual(len(iris), 500)
+        self.assertEqual(len(adult), 100)
+        self.assertEqual(list(iris.columns), [
+            "sepal_length", "sepal_width", "petal_length", "petal_width",
+            "species",
+        ])
+        self.assertEqual(adult["age"].dtype.kind, "i")
+        self.assertTrue(set(iris["species"]) <= {
+            "setosa", "versicolor", "virginica"
+        })
+        # Seeded and not all duplicates of the original rows
+        self.assertTrue(iris.equals(synthetic_iris(500, random_state=0)))
+        self.assertGreater(iris["sepal_length"].nunique(), 35)
+
+    def test_time_case(self):
+        calls = []
+        result = time_case(lambda: calls.append(1), repeat=3)
+        self.assertEqual(len(calls), 4)  # One warm up call
+        self.assertEqual(result["repeat"], 3)
+        self.assertLessEqual(result["min"], result["median"])
+
+    def test_run_covers_hot_paths(self):
+        results = run_benchmarks(self.workload, repeat=1)
+        self.assertEqual(results["config"]["n_rows"], 300)
+        names = results["results"].keys()
+        for expected in ("dataset.read[feather]", "dataset.save[csv]",
+                         "features.detect_feature_types",
+                         "features.infer_feature_types[csv]",
+                         "preprocessing.preprocess_features",
+                         "database.set", "registry.list"):
+            self.assertIn(expected, names)
+        for name in METRICS:
+            self.assertIn("min", results["results"][f"metric[{name}]"])
+        for name in list(CLASSIFICATION_MODELS) + list(REGRESSION_MODELS):
+            self.assertIn(f"model.fit[{name}]", names)
+            self.assertIn(f"model.predict[{name}]", names)
+        self.assertIn("min", results["results"]["model.predict[Naive Bayes]"])
+        self.assertIn("min", results["calibration"])
+        json.dumps(results)
+
+    def test_feature_cases_decode(self):
+        cases = SUITES["features"](self.workload)
+        with patch.object(
+            FeatherFormat, "decode", wraps=FeatherFormat().decode
+        ) as decode:
+            cases["features.detect_feature_types"]()
+            cases["features.detect_feature_types"]()
+        # Not a memoized frame, every call decodes the stored data
+        self.assertEqual(decode.call_count, 2)
+
+    def test_failures_are_recorded(self):
+        def broken_cases(workload):
+            return {"broken": lambda: 1 / 0, "fine": lambda: None}
+
+        results = run_benchmarks(
+            self.workload, repeat=1, suites={"broken": broken_cases}
+        )["results"]
+        self.assertIn("ZeroDivisionError", results["broken"]["error"])
+        self.assertIn("min", results["fine"])
+
+    def test_select(self):
+        results = run_benchmarks(
+            self.workload, repeat=1, select="metric[",
+            suites={"metrics": SUITES["metrics"]},
+        )["results"]
+        self.assertEqual(len(results), len(METRICS))
+
+    def test_compare(self):
+        baseline = {"results": {
+            "a": {"min": 1.0}, "b": {"min": 1.0}, "c": {"min": 1.0},
+            "d": {"min": 1.0}, "e": {"min": 1.0},
+        }}
+        results = {"results": {
+            "a": {"min": 1.1}, "b": {"min": 1.5}, "c": {"min": 0.5},
+            "e": {"error": "ValueError()"}, "f": {"min": 1.0},
+        }}
+        statuses = {
+            row["name"]: row["status"]
+            for row in compare(results, baseline, tolerance=0.25)
+        }
+        self.assertEqual(statuses, {
+            "a": "same", "b": "slower", "c": "faster", "d": "missing",
+            "e": "error", "f": "new",
+        })
+        # On a machine twice as slow, twice the time is the same
+        baseline["calibration"] = {"min": 1.0}
+        results["calibration"] = {"min": 2.0}
+        results["results"]["a"] = {"min": 2.2}
+        rows = compare(results, baseline, tolerance=0.25)
+        self.assertEqual(rows[0]["status"], "same")
+        self.assertAlmostEqual(rows[0]["ratio"], 1.1)
+
+    def test_main_against_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            arguments = ["--rows", "200", "--entries", "10", "--repeat", "1",
+                         "--select", "metric[Accuracy]"]
+            self.assertEqual(main(arguments + ["--output", path]), 0)
+            with open(path) as file:
+                baseline = json.load(file)
+            self.assertEqual(list(baseline["results"]), ["metric[Accuracy]"])
+            # Pretend the baseline was a lot faster
+            baseline["results"]["metric[Accuracy]"]["min"] = 1e-12
+            with open(path, "w") as file:
+                json.dump(baseline, file)
+            self.assertEqual(main(arguments + ["--baseline", path]), 1)
@@ -0,0 +1,68 @@
+import pickle
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from autoop.core.compression import (
+    CODECS,
+    HEADER,
+    compress,
+    decompress,
+    get_codec,
+    is_compressed,
+    payload_kind,
+    zstandard,
+)
+from autoop.core.ml.dataset_format import get_format
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.data = b"sepal_length,species\n5.1,setosa\n" * 1000
+
+    def test_round_trip(self):
+        for name in CODECS:
+            if name == "zstd" and zstandard is None:
+                continue
+            codec = get_codec(name)
+            for data in (self.data, b""):
+                compressed = compress(data, codec, chunk_size=100)
+                self.assertTrue(is_compressed(compressed))
+                self.assertEqual(decompress(compressed), data)
+            if name != "none":
+                self.assertLess(
+                    len(compress(self.data, codec)), len(self.data) / 5
+                )
+
+    def test_header_has_codec_and_size(self):
+        compressed = compress(self.data, get_codec("lzma"))
+        _, id, size = HEADER.unpack_from(compressed)
+        self.assertEqual(id, CODECS["lzma"].id)
+        self.assertEqual(size, len(self.data))
+
+    def test_uncompressed_data_is_returned_as_is(self):
+        self.assertEqual(decompress(self.data), self.data)
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            get_codec("snappy")
+        compressed = bytearray(compress(self.data, get_codec("zlib")))
+        compressed[4] = 200
+        with self.assertRaises(ValueError):
+            decompress(bytes(compressed))
+
+    def test_payload_kind(self):
+        frame = pd.DataFrame({"a": [1, 2]})
+        self.assertEqual(payload_kind(self.data), "text")
+        self.assertEqual(payload_kind(pickle.dumps(np.ones(3))), "pickle")
+        self.assertEqual(
+            payload_kind(get_format("feather").encode(frame)), "feather"
+        )
+        self.assertEqual(
+            payload_kind(get_format("parquet").encode(frame)), "compressed"
+        )
+        self.assertEqual(payload_kind(bytes(range(256))), "binary")
+        # A multi byte character cut off by the sample is still text
+        self.assertEqual(payload_kind("é".encode() * 1000), "text")
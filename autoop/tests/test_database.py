@@ -2,7 +2,7 @@ import random
 import tempfile
 import unittest
 
-from autoop.core.database import Database
+from autoop.core.database import JOURNAL_KEY, Database
 from autoop.core.storage import LocalStorage
 
 
@@ -51,3 +51,87 @@ class TestDatabase(unittest.TestCase):
         self.db.set("collection", key, value)
         # collection should now contain the key
         self.assertIn((key, value), self.db.list("collection"))
+
+    def test_compact(self):
+        db = Database(self.storage, compact_every=2)
+        db.set("collection", "a", {"key": 1})
+        db.set("collection", "b", {"key": 2})
+        # Compaction wrote the keys and cleared the journal
+        self.assertEqual(self.storage.load("collection/a"), b'{"key": 1}')
+        self.assertEqual(len(self.storage.list("")), 2)
+        db.delete("collection", "a")
+        db.compact()
+        self.assertEqual(len(self.storage.list("")), 1)
+        self.assertIsNone(Database(self.storage).get("collection", "a"))
+
+    def test_replay_journal_after_restart(self):
+        db = Database(self.storage, compact_every=100)
+        db.set("collection", "a", {"key": 1})
+        db.set("collection", "b", {"key": 2})
+        db.delete("collection", "a")
+        # Nothing was compacted, only the journal is stored
+        self.assertEqual(self.storage.list(""), [])
+        journal = self.storage.load(JOURNAL_KEY)
+        records = [line for line in journal.splitlines() if line]
+        self.assertEqual(len(records), 3)
+        reopened = Database(self.storage, compact_every=100)
+        self.assertIsNone(reopened.get("collection", "a"))
+        self.assertEqual(reopened.get("collection", "b"), {"key": 2})
+        # The replayed operations are compacted like any other
+        reopened.compact()
+        self.assertEqual(self.storage.list(""), ["collection/b"])
+
+    def test_replay_skips_torn_last_line(self):
+        db = Database(self.storage, compact_every=100)
+        db.set("collection", "a", {"key": 1})
+        db.set("collection", "b", {"key": 2})
+        # A crash halfway through appending the next operation
+        self.storage.append(b'{"op": "set", "collection": "coll', JOURNAL_KEY)
+        reopened = Database(self.storage, compact_every=100)
+        self.assertEqual(reopened.get("collection", "a"), {"key": 1})
+        self.assertEqual(reopened.get("collection", "b"), {"key": 2})
+        self.assertEqual(len(reopened.list("collection")), 2)
+        # The torn line is gone, so later writes survive the next restart
+        reopened.set("collection", "c", {"key": 3})
+        reopened_again = Database(self.storage, compact_every=100)
+        self.assertEqual(reopened_again.get("collection", "c"), {"key": 3})
+        self.assertEqual(len(reopened_again.list("collection")), 3)
+
+    def test_replay_skips_line_glued_to_torn_write(self):
+        db = Database(self.storage, compact_every=100)
+        db.set("collection", "a", {"key": 1})
+        # Another instance crashed halfway through appending, this one
+        # keeps writing without reloading
+        self.storage.append(b'{"op": "set", "collection": "coll', JOURNAL_KEY)
+        db.set("collection", "b", {"key": 2})
+        reopened = Database(self.storage, compact_every=100)
+        self.assertEqual(reopened.get("collection", "a"), {"key": 1})
+        self.assertEqual(reopened.get("collection", "b"), {"key": 2})
+
+    def test_compact_keeps_writes_of_other_instances(self):
+        db = Database(self.storage, compact_every=100)
+        other_db = Database(self.storage, compact_every=100)
+        db.set("collection", "a", {"key": 1})
+        other_db.set("collection", "b", {"key": 2})
+        other_db.compact()
+        reopened = Database(self.storage)
+        self.assertEqual(reopened.get("collection", "a"), {"key": 1})
+        self.assertEqual(reopened.get("collection", "b"), {"key": 2})
+        self.assertEqual(other_db.get("collection", "a"), {"key": 1})
+
+    def test_refresh_only_reloads_changes(self):
+        db = Database(self.storage, compact_every=2)
+        other_db = Database(self.storage, compact_every=2)
+        db.set("collection", "a", {"key": 1})
+        self.assertFalse(db.refresh())  # Its own write
+        self.assertTrue(other_db.refresh())
+        self.assertFalse(other_db.refresh())
+        # Compacting restarts the journal, which is a change as well
+        db.set("collection", "b", {"key": 2})
+        self.assertFalse(db.refresh())
+        self.assertTrue(other_db.refresh())
+        self.assertEqual(other_db.get("collection", "b"), {"key": 2})
+        db.set("collection", "c", {"key": 3})
+        db.delete("collection", "c")
+        self.assertTrue(other_db.refresh())
+        self.assertIsNone(other_db.get("collection", "c"))
@@ -0,0 +1,173 @@
+import io
+import tempfile
+import unittest
+from functools import partial
+from unittest.mock import patch
+
+import pandas as pd
+
+from autoop.core.ml.dataset import (
+    Dataset,
+    disable_frame_cache,
+    enable_frame_cache,
+)
+from autoop.core.ml.dataset_format import (
+    DATASET_FORMATS,
+    CSVFormat,
+    FeatherFormat,
+    convert_csv,
+)
+from autoop.core.storage import LocalStorage
+
+
+class TestDataset(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.read_csv("test_assets/iris.csv")
+        # Other tests may have left the process-wide cache enabled
+        disable_frame_cache()
+
+    def test_formats_round_trip(self):
+        for format in DATASET_FORMATS:
+            dataset = Dataset.from_dataframe(
+                self.df, format, name="iris", asset_path="iris"
+            )
+            self.assertTrue(dataset.read().equals(self.df), msg=format)
+
+    def test_default_format_is_columnar(self):
+        dataset = Dataset.from_dataframe(
+            self.df, name="iris", asset_path="iris"
+        )
+        self.assertIsInstance(dataset.format, FeatherFormat)
+
+    def test_mixed_column_falls_back_to_csv(self):
+        df = pd.DataFrame({"a": [1, 2, 3], "b": [1, "two", 3.0]})
+        expected = pd.read_csv(io.BytesIO(CSVFormat().encode(df)))
+        for format in DATASET_FORMATS:
+            dataset = Dataset.from_dataframe(
+                df, format, name="mixed", asset_path="mixed"
+            )
+            self.assertIsInstance(dataset.format, CSVFormat)
+            self.assertTrue(dataset.read().equals(expected), msg=format)
+
+    def test_column_names_become_text(self):
+        df = pd.DataFrame({0: [1.0, 2.0], 1: ["a", "b"]})
+        for format in DATASET_FORMATS:
+            dataset = Dataset.from_dataframe(
+                df, format, name="numbered", asset_path="numbered"
+            )
+            frame = dataset.read()
+            self.assertEqual(list(frame.columns), ["0", "1"], msg=format)
+            self.assertEqual(frame["0"].tolist(), [1.0, 2.0], msg=format)
+
+    def test_read_legacy_csv(self):
+        with open("test_assets/iris.csv", mode="rb") as file:
+            dataset = Dataset(name="iris", asset_path="iris", data=file.read())
+        self.assertIsInstance(dataset.format, CSVFormat)
+        self.assertTrue(dataset.read().equals(self.df))
+
+    def test_convert_csv(self):
+        with open("test_assets/iris.csv", mode="rb") as file:
+            csv = file.read()
+        for format in DATASET_FORMATS:
+            sink = io.BytesIO()
+            # Small blocks, such that the csv is converted in many batches
+            convert_csv(io.BytesIO(csv), sink, format, block_size=1024)
+            dataset = Dataset(
+                name="iris", asset_path="iris", data=sink.getvalue()
+            )
+            self.assertIsInstance(dataset.format, DATASET_FORMATS[format])
+            self.assertTrue(dataset.read().equals(self.df), msg=format)
+        # Like pandas, dates stay text
+        sink = io.BytesIO()
+        convert_csv(io.BytesIO(b"a,b\n1,2024-01-01\n"), sink)
+        frame = Dataset(name="d", asset_path="d", data=sink.getvalue()).read()
+        self.assertEqual(frame["b"].tolist(), ["2024-01-01"])
+        with self.assertRaises(ValueError):
+            convert_csv(
+                io.BytesIO(b"a\n" + b"1\n" * 1000 + b"x\n"), io.BytesIO(),
+                block_size=1024,
+            )
+
+    def test_read_memory_map(self):
+        storage = LocalStorage(tempfile.mkdtemp())
+        for format in DATASET_FORMATS:
+            data = Dataset.from_dataframe(
+                self.df, format, name="iris", asset_path="iris"
+            ).data
+            storage.save(data, format)
+            dataset = Dataset(
+                name="iris", asset_path="iris",
+                loader=partial(storage.load, format),
+                view_loader=partial(storage.load_view, format),
+            )
+            self.assertTrue(dataset.read().equals(self.df), msg=format)
+            self.assertEqual(len(list(dataset.iter_chunks(100))), 2)
+            self.assertFalse(dataset.is_loaded)
+
+    def test_read_columns(self):
+        dataset = Dataset.from_dataframe(
+            self.df, name="iris", asset_path="iris"
+        )
+        columns = list(self.df.columns[:2])
+        self.assertEqual(list(dataset.read(columns).columns), columns)
+
+    def test_frame_is_memoized_until_save(self):
+        dataset = Dataset.from_dataframe(
+            self.df, name="iris", asset_path="iris"
+        )
+        with patch.object(
+            FeatherFormat, "decode", wraps=FeatherFormat().decode
+        ) as decode:
+            dataset.read()
+            dataset.read(list(self.df.columns[:2]))
+            self.assertEqual(decode.call_count, 1)
+            dataset.save(self.df.head())
+            self.assertEqual(len(dataset.read()), 5)
+            self.assertEqual(decode.call_count, 2)
+
+    def test_process_wide_frame_cache(self):
+        enable_frame_cache()
+        self.addCleanup(disable_frame_cache)
+        data = Dataset.from_dataframe(
+            self.df, name="iris", asset_path="iris"
+        ).data
+        # Datasets that load the same stored data share the frame
+        first = Dataset(name="iris", asset_path="iris", loader=lambda: data)
+        second = Dataset(name="iris", asset_path="iris", loader=lambda: data)
+        first.read()
+        with patch.object(FeatherFormat, "decode") as decode:
+            self.assertTrue(second.read().equals(self.df))
+            decode.assert_not_called()
+
+    def test_frame_cache_ignores_in_memory_data(self):
+        enable_frame_cache()
+        self.addCleanup(disable_frame_cache)
+        stored = Dataset.from_dataframe(
+            pd.DataFrame({"a": [1, 2, 3]}), name="a", asset_path="a"
+        ).data
+        Dataset(name="a", asset_path="a", loader=lambda: stored).read()
+        # A new dataset at the same path, but with other data
+        other = Dataset.from_dataframe(
+            pd.DataFrame({"a": [7, 8, 9]}), name="a", asset_path="a"
+        )
+        self.assertEqual(other.read()["a"].tolist(), [7, 8, 9])
+        # Nor does replacing the data of a stored dataset
+        replaced = Dataset(name="a", asset_path="a", loader=lambda: stored)
+        replaced.save(pd.DataFrame({"a": [4, 5, 6]}))
+        self.assertEqual(replaced.read()["a"].tolist(), [4, 5, 6])
+        self.assertEqual(
+            Dataset(name="a", asset_path="a", loader=lambda: stored)
+            .read()["a"].tolist(),
+            [1, 2, 3],
+        )
+
+    def test_iter_chunks(self):
+        for format in DATASET_FORMATS:
+            dataset = Dataset.from_dataframe(
+                self.df, format, name="iris", asset_path="iris"
+            )
+            chunks = list(dataset.iter_chunks(40))
+            self.assertEqual([len(chunk) for chunk in chunks], [40] * 3 + [30])
+            self.assertTrue(
+                pd.concat(chunks, ignore_index=True).equals(self.df)
+            )
@@ -5,11 +5,13 @@ import pandas as pd
 from sklearn.datasets import fetch_openml, load_iris
 
 from autoop.core.ml.dataset import Dataset
+from autoop.core.ml.dataset_format import CSVFormat
 from autoop.core.ml.feature import Feature
 from autoop.functional.feature import (
     _is_categorical,
     _is_numerical,
     detect_feature_types,
+    infer_feature_types,
 )
 
 
@@ -161,3 +163,120 @@ class TestFeatures(unittest.TestCase):
 
 # Removed "workclass", "occupation" and "native country" from categorical types
 #  because it contains NaNs
+
+
+class TestDetectFeatureTypesSample(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dataset = Dataset.from_dataframe(
+            pd.read_csv("test_assets/adult.csv"),
+            name="adult",
+            asset_path="adult.csv",
+        )
+
+    def test_sample_gives_same_types(self):
+        features = detect_feature_types(self.dataset)
+        sampled = detect_feature_types(
+            self.dataset, sample_size=1000, random_state=0
+        )
+        self.assertEqual(
+            [(feature.name, feature.type) for feature in features],
+            [(feature.name, feature.type) for feature in sampled],
+        )
+
+    def test_mixed_object_columns(self):
+        series = pd.Series(["1.5", 2, "nan"], dtype=object)
+        self.assertTrue(_is_numerical(series))
+        series = pd.Series(["1.5", 2, "two"], dtype=object)
+        self.assertFalse(_is_numerical(series))
+        self.assertFalse(_is_categorical(series))
+
+    def test_infer_feature_types(self):
+        expected = detect_feature_types(self.dataset)
+        features, full_scan = infer_feature_types(
+            self.dataset, sample_size=100, random_state=0, full_scan=True
+        )
+        self.assertEqual(
+            [(feature.name, feature.type) for feature in features],
+            [(feature.name, feature.type) for feature in expected],
+        )
+        for feature in features:
+            self.assertEqual(feature.rows_checked, 100)
+            self.assertAlmostEqual(feature.confidence, 101 / 102)
+        self.assertEqual(len(full_scan.result()), len(expected))
+
+    def test_infer_feature_types_from_chunks(self):
+        features, full_scan = infer_feature_types(
+            self.dataset, n_chunks=2, chunk_size=10
+        )
+        self.assertIsNone(full_scan)
+        self.assertEqual(features[0].rows_checked, 20)
+
+    def test_stratified_sample_reads_chunks(self):
+        # Sorted on a column, the sample must still reach the last rows
+        df = pd.DataFrame({
+            "x": range(1000), "y": ["a"] * 900 + [None] * 100
+        })
+        dataset = Dataset.from_dataframe(df, name="sorted", asset_path="s")
+        # Feather stores the number of rows, so only the sample is decoded
+        with patch.object(Dataset, "read") as read, \
+                patch.object(Dataset, "iter_chunks") as iter_chunks:
+            features, _ = infer_feature_types(
+                dataset, sample_size=10, chunk_size=64, random_state=0
+            )
+            read.assert_not_called()
+            iter_chunks.assert_not_called()
+        self.assertEqual([feature.name for feature in features], ["x"])
+        self.assertEqual(features[0].rows_checked, 10)
+        # The same seed samples the same rows
+        again, _ = infer_feature_types(
+            dataset, sample_size=10, chunk_size=64, random_state=0
+        )
+        self.assertEqual(
+            [(feature.name, feature.type) for feature in again],
+            [(feature.name, feature.type) for feature in features],
+        )
+        everything, _ = infer_feature_types(dataset, sample_size=5000)
+        self.assertEqual(everything[0].confidence, 1.0)
+
+    def test_csv_sample_reads_leading_chunks(self):
+        df = pd.DataFrame({"x": range(1000)})
+        dataset = Dataset.from_dataframe(
+            df, "csv", name="csv", asset_path="csv"
+        )
+        with patch.object(CSVFormat, "decode") as decode:
+            features, _ = infer_feature_types(
+                dataset, sample_size=10, chunk_size=64, max_chunks=2,
+                random_state=0,
+            )
+            decode.assert_not_called()
+        self.assertEqual(features[0].rows_checked, 10)
+        self.assertLess(features[0].confidence, 1)
+        # A csv that fits in the leading chunks is checked entirely
+        features, _ = infer_feature_types(
+            dataset, sample_size=1000, chunk_size=600, max_chunks=2
+        )
+        self.assertEqual(features[0].confidence, 1.0)
+
+    def test_confidence_per_column(self):
+        df = pd.DataFrame({
+            "x": range(100),
+            "y": ["a"] * 90 + list(range(10)),
+            "z": ["a"] * 50 + list(range(50)),
+        })
+        dataset = Dataset.from_dataframe(
+            df, "csv", name="mixed", asset_path="mixed"
+        )
+        features, _ = infer_feature_types(dataset, sample_size=100)
+        # Half numbers and half strings fits neither type
+        self.assertEqual(
+            [(feature.name, feature.type) for feature in features],
+            [("x", "numerical"), ("y", "categorical")],
+        )
+        self.assertEqual(features[0].confidence, 1.0)
+        self.assertAlmostEqual(features[1].confidence, 0.9)
+        features, _ = infer_feature_types(
+            dataset, sample_size=100, n_chunks=1, chunk_size=50
+        )
+        self.assertAlmostEqual(features[0].confidence, 51 / 52)
+        self.assertAlmostEqual(features[1].confidence, 51 / 52)
+        self.assertEqual(features[2].type, "categorical")
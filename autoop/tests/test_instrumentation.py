@@ -0,0 +1,111 @@
+import json
+import unittest
+
+import pandas as pd
+
+from autoop.core.ml.dataset import Dataset
+from autoop.core.ml.feature import Feature
+from autoop.core.ml.instrumentation import (
+    Instrumentation,
+    StageEvent,
+    StageHook,
+)
+from autoop.core.ml.metric import MeanSquaredError
+from autoop.core.ml.model import MultipleLinearRegression
+from autoop.core.ml.pipeline import Pipeline
+
+
+class RecordingHook(StageHook):
+    def __init__(self):
+        self.calls = []
+
+    def on_stage_start(self, stage):
+        self.calls.append(("start", stage))
+
+    def on_stage_end(self, event):
+        self.calls.append(("end", event.stage))
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_stage(self):
+        hook = RecordingHook()
+        instrumentation = Instrumentation(hooks=[hook], trace_memory=True)
+        with instrumentation.stage("allocate"):
+            data = [0] * 1_000_000
+        self.assertEqual(len(data), 1_000_000)
+        event = instrumentation.events[0]
+        self.assertIsInstance(event, StageEvent)
+        self.assertEqual(event.stage, "allocate")
+        self.assertGreater(event.wall_time, 0)
+        self.assertGreaterEqual(event.cpu_time, 0)
+        self.assertGreater(event.peak_traced_memory, 8_000_000)
+        self.assertEqual(hook.calls, [("start", "allocate"),
+                                      ("end", "allocate")])
+
+    def test_stage_raises(self):
+        hook = RecordingHook()
+        instrumentation = Instrumentation(hooks=[hook])
+        with self.assertRaises(KeyError):
+            with instrumentation.stage("fail"):
+                raise KeyError()
+        self.assertEqual(hook.calls[-1], ("end", "fail"))
+        self.assertIsNone(instrumentation.events[0].peak_traced_memory)
+
+    def test_summary(self):
+        instrumentation = Instrumentation()
+        for stage in ["a", "b", "a"]:
+            with instrumentation.stage(stage):
+                pass
+        summary = instrumentation.summary()
+        self.assertEqual(list(summary), ["a", "b"])
+        self.assertEqual(summary["a"]["calls"], 2)
+
+    def test_traces(self):
+        instrumentation = Instrumentation()
+        with instrumentation.stage("train"):
+            pass
+        events = json.loads(instrumentation.to_json())
+        self.assertEqual(events[0]["stage"], "train")
+        chrome = json.loads(instrumentation.to_chrome_trace())
+        self.assertEqual(chrome["traceEvents"][0]["ph"], "X")
+        self.assertEqual(chrome["traceEvents"][0]["name"], "train")
+        artifact = instrumentation.to_artifact(
+            "trace", "traces/train", format="chrome"
+        )
+        self.assertEqual(artifact.type, "trace")
+        self.assertEqual(json.loads(artifact.read()), chrome)
+        with self.assertRaises(ValueError):
+            instrumentation.to_artifact("trace", "traces/train", format="csv")
+
+    def test_pipeline_stages(self):
+        hook = RecordingHook()
+        pipeline = Pipeline(
+            dataset=Dataset.from_dataframe(
+                pd.read_csv("test_assets/iris.csv"),
+                name="iris",
+                asset_path="iris.csv",
+            ),
+            model=MultipleLinearRegression(),
+            input_features=[Feature(name="sepal_width", type="numerical")],
+            target_feature=Feature(name="petal_length", type="numerical"),
+            metrics=[MeanSquaredError()],
+            instrumentation=Instrumentation(hooks=[hook]),
+        )
+        results = pipeline.execute()
+        stages = ["prepare", "train", "evaluate test", "evaluate train"]
+        self.assertEqual(
+            [stage for kind, stage in hook.calls if kind == "end"], stages
+        )
+        self.assertEqual(list(results["stages"]), stages)
+        self.assertEqual(
+            results["timings"]["train"],
+            results["stages"]["train"]["wall_time"],
+        )
+        # A second execution only reports its own stages
+        self.assertEqual(
+            pipeline.execute()["stages"]["train"]["calls"], 1
+        )
+        artifacts = pipeline.get_artifacts("iris", trace_format="json")
+        self.assertEqual(artifacts[-1].type, "trace")
+        self.assertEqual(len(json.loads(artifacts[-1].read())), 8)
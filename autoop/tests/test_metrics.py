@@ -14,9 +14,11 @@ from autoop.core.ml.metric import (
     Accuracy,
     MeanAbsoluteError,
     MeanSquaredError,
+    MetricContext,
     Precision,
     Recall,
     RSquared,
+    evaluate_batches,
 )
 from autoop.core.ml.model.model import Model, ParametersDict
 
@@ -69,3 +71,67 @@ class TestMeanAbsoluteError(unittest.TestCase):
 
         self.assertAlmostEqual(mabs(ground_truth, predictions), mean_absolute_error(ground_truth, predictions), 4)
 
+
+
+class TestOneHotClassificationMetrics(unittest.TestCase):
+    def testValue(self):
+        labels_true: np.ndarray = np.array([2, 2, 3, 4, 0, 3])
+        labels_pred: np.ndarray = np.array([3, 2, 4, 2, 0, 3])
+        ground_truth = np.eye(5)[labels_true]
+        predictions = np.eye(5)[labels_pred]
+
+        for metric in (Accuracy(), Precision(), Recall()):
+            self.assertAlmostEqual(
+                metric(ground_truth, predictions),
+                metric(labels_true, labels_pred),
+            )
+
+
+class TestMetricContext(unittest.TestCase):
+    def testSharedStatistics(self):
+        ground_truth: np.ndarray = np.array([6, 2, 3, 1])
+        predictions: np.ndarray = np.array([3, 2, 4, 2])
+        context = MetricContext(ground_truth, predictions)
+
+        for metric in (Accuracy(), Precision(), Recall(), MeanSquaredError(),
+                       MeanAbsoluteError(), RSquared()):
+            self.assertAlmostEqual(
+                metric.evaluate(context), metric(ground_truth, predictions)
+            )
+        self.assertIs(context.confusion_matrix, context.confusion_matrix)
+
+    def testColumnGroundTruth(self):
+        ground_truth: np.ndarray = np.array([[6], [2], [3], [1]])
+        predictions: np.ndarray = np.array([3, 2, 4, 2])
+        self.assertEqual(MeanSquaredError()(ground_truth, predictions), 2.75)
+
+
+class TestStreamingMetrics(unittest.TestCase):
+    def testClassification(self):
+        rng = np.random.default_rng(0)
+        ground_truth = rng.integers(0, 5, 1000)
+        predictions = rng.integers(0, 6, 1000)
+        for metric in (Accuracy(), Precision(), Recall()):
+            # Batches of 7 rows, such that not every label occurs in each
+            for start in range(0, 1000, 7):
+                metric.update(
+                    ground_truth[start:start + 7],
+                    predictions[start:start + 7],
+                )
+            self.assertAlmostEqual(
+                metric.result(), metric(ground_truth, predictions)
+            )
+
+    def testRegression(self):
+        rng = np.random.default_rng(0)
+        ground_truth = rng.normal(1e6, 1, (1000, 1))
+        predictions = ground_truth + rng.normal(0, 0.5, (1000, 1))
+        batches = [
+            (ground_truth[start:start + 64], predictions[start:start + 64])
+            for start in range(0, 1000, 64)
+        ]
+        metrics = [MeanSquaredError(), MeanAbsoluteError(), RSquared()]
+        for metric, result in evaluate_batches(metrics, batches):
+            self.assertAlmostEqual(
+                result, metric(ground_truth, predictions), places=6
+            )
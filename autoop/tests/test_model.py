@@ -1,15 +1,30 @@
+import tempfile
 import unittest
+from functools import partial
 
 import numpy as np
 
-from autoop.core.ml.model import MultipleLinearRegression, get_model
+from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.model import (
+    CLASSIFICATION_MODELS,
+    REGRESSION_MODELS,
+    MultipleLinearRegression,
+    get_model,
+)
 from autoop.core.ml.model.classification import (
+    WrapGaussianNaiveBayes,
     WrapKNearestNeighbors,
     WrapRadiusNeighor,
     WrapRandomForest,
+    WrapSGDClassifier,
 )
 from autoop.core.ml.model.model import Model, ParametersDict
-from autoop.core.ml.model.regression import WrapElasticNet, WrapLogisticRegression
+from autoop.core.ml.model.regression import (
+    WrapElasticNet,
+    WrapLogisticRegression,
+    WrapSGDRegressor,
+)
+from autoop.core.storage import LocalStorage
 
 
 class ConcreteModel(Model):
@@ -90,6 +105,25 @@ class TestModel(unittest.TestCase):
         with self.assertRaises(AttributeError):
             model.parameters = bad_parameters
 
+    def test_partial_fit_unsupported(self):
+        model = ConcreteModel(type="numerical")
+        self.assertFalse(model.supports_partial_fit)
+        with self.assertRaises(NotImplementedError):
+            model.partial_fit([[1]], [[1]])
+
+    def test_from_memory_mapped_artifact(self):
+        model = ConcreteModel(type="numerical", parameters={"slope": 0.5})
+        storage = LocalStorage(tempfile.mkdtemp())
+        storage.save(model.to_artifact().data, "models/concrete")
+        artifact = Artifact(
+            type="model", name="concrete", asset_path="models/concrete",
+            loader=partial(storage.load, "models/concrete"),
+            view_loader=partial(storage.load_view, "models/concrete"),
+        )
+        recovered_model = ConcreteModel.from_artifact(artifact)
+        self.assertEqual(recovered_model.parameters, model.parameters)
+        self.assertFalse(artifact.is_loaded)
+
 class TestMultipleLinearRegression(unittest.TestCase):
     def setUp(self):
         self.X = [
@@ -142,6 +176,17 @@ class TestLogisticRegression(unittest.TestCase):
             [6, 6, 3],
         ]
 
+    def test_classifies_one_hot_target(self):
+        model = WrapLogisticRegression()
+        self.assertEqual(model.type, "classification")
+        self.assertIn(WrapLogisticRegression, CLASSIFICATION_MODELS.values())
+        self.assertNotIn(WrapLogisticRegression, REGRESSION_MODELS.values())
+        y_one_hot = np.eye(3)[[0, 1, 2]]
+        model.fit(self.X, y_one_hot)
+        prediction = model.predict(self.X)
+        self.assertEqual(prediction.shape, (3, 3))
+        np.testing.assert_array_equal(prediction.sum(axis=1), 1)
+
 def test_fit_and_predict(self):
     model = WrapLogisticRegression()
     model.fit(self.X, self.y)
@@ -362,3 +407,95 @@ def test_get_model(self):
 
 
 # TODO: test setting hyperparameters
+
+
+class TestIncrementalModels(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(300, 3))
+        labels = np.argmax(self.X, axis=1)
+        self.y_one_hot = np.eye(3)[labels]
+        self.y_numerical = (self.X @ np.array([[1.0], [2.0], [-1.0]]))
+
+    def test_supports_partial_fit(self):
+        for Model in [WrapSGDRegressor, WrapSGDClassifier,
+                      WrapGaussianNaiveBayes]:
+            self.assertTrue(Model().supports_partial_fit)
+        self.assertFalse(MultipleLinearRegression().supports_partial_fit)
+
+    def test_registered(self):
+        self.assertEqual(get_model("SGD Regressor"), WrapSGDRegressor)
+        self.assertEqual(get_model("SGD Classifier"), WrapSGDClassifier)
+        self.assertEqual(get_model("Naive Bayes"), WrapGaussianNaiveBayes)
+
+    def test_classifiers_partial_fit_one_hot(self):
+        for Model in [WrapSGDClassifier, WrapGaussianNaiveBayes]:
+            model = Model()
+            # The first batch misses a class, which must still be known
+            first = self.y_one_hot[:, 2] == 0
+            model.partial_fit(self.X[first], self.y_one_hot[first])
+            for start in range(0, 300, 100):
+                model.partial_fit(
+                    self.X[start:start + 100],
+                    self.y_one_hot[start:start + 100],
+                )
+            prediction = model.predict(self.X)
+            self.assertEqual(prediction.shape, self.y_one_hot.shape)
+            accuracy = np.mean(
+                prediction.argmax(axis=1) == self.y_one_hot.argmax(axis=1)
+            )
+            self.assertGreater(accuracy, 0.8)
+
+    def test_classifiers_partial_fit_new_label(self):
+        labels = self.y_one_hot.argmax(axis=1)
+        # Label 2 first appears in the second batch
+        first = labels != 2
+        for Model in [WrapSGDClassifier, WrapGaussianNaiveBayes]:
+            model = Model()
+            model.partial_fit(self.X[first], labels[first])
+            with self.assertRaises(ValueError):
+                model.partial_fit(self.X, labels)
+
+            model = Model()
+            model.partial_fit(self.X[first], labels[first], classes=[0, 1, 2])
+            model.partial_fit(self.X, labels)
+            prediction = model.predict(self.X)
+            self.assertEqual(prediction.shape, labels.shape)
+            self.assertGreater(np.mean(prediction == labels), 0.8)
+
+    def test_naive_bayes_partial_fit_matches_fit(self):
+        batched = WrapGaussianNaiveBayes()
+        for start in range(0, 300, 50):
+            batched.partial_fit(
+                self.X[start:start + 50], self.y_one_hot[start:start + 50]
+            )
+        full = WrapGaussianNaiveBayes()
+        full.fit(self.X, self.y_one_hot)
+        np.testing.assert_allclose(
+            batched.parameters["theta"], full.parameters["theta"]
+        )
+        np.testing.assert_allclose(
+            batched.parameters["var"], full.parameters["var"]
+        )
+
+    def test_sgd_regressor_partial_fit(self):
+        model = WrapSGDRegressor(hyper_parameters={"random_state": 0})
+        for _ in range(20):
+            for start in range(0, 300, 100):
+                model.partial_fit(
+                    self.X[start:start + 100],
+                    self.y_numerical[start:start + 100],
+                )
+        prediction = model.predict(self.X)
+        self.assertEqual(prediction.shape, self.y_numerical.shape)
+        np.testing.assert_allclose(
+            model.parameters["coef"], [1.0, 2.0, -1.0], atol=0.1
+        )
+
+    def test_update_after_artifact(self):
+        model = WrapSGDClassifier(hyper_parameters={"random_state": 0})
+        model.partial_fit(self.X[:150], self.y_one_hot[:150])
+        new_model = WrapSGDClassifier.from_artifact(model.to_artifact())
+        new_model.partial_fit(self.X[150:], self.y_one_hot[150:])
+        self.assertEqual(new_model.predict(self.X).shape, (300, 3))
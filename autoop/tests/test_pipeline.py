@@ -1,21 +1,37 @@
+import tempfile
 import unittest
+from functools import partial
+from unittest.mock import patch
 
+import numpy as np
 import pandas as pd
 from sklearn.datasets import fetch_openml
+from sklearn.metrics import precision_score, r2_score, recall_score
 
 from autoop.core.ml.dataset import Dataset
 from autoop.core.ml.feature import Feature
 from autoop.core.ml.metric import (
     CLASSIFICATION_METRICS,
     REGRESSION_METRICS,
+    Accuracy,
     MeanSquaredError,
+    Precision,
+    Recall,
+    RSquared,
 )
 from autoop.core.ml.model import (
     CLASSIFICATION_MODELS,
     REGRESSION_MODELS,
     MultipleLinearRegression,
+    WrapElasticNet,
+    WrapGaussianNaiveBayes,
+    WrapRandomForest,
+    WrapSGDRegressor,
 )
+from autoop.core.ml.model.model import Model
 from autoop.core.ml.pipeline import Pipeline
+from autoop.core.storage import LocalStorage
+from autoop.functional.preprocessing import preprocess_dataset
 from autoop.functional.feature import detect_feature_types
 
 
@@ -65,10 +81,10 @@ class TestPipeline(unittest.TestCase):
         self.pipeline.preprocess_features()
         self.pipeline._split_data()
         self.assertEqual(
-            self.pipeline._train_X[0].shape[0], int(0.8 * self.ds_size)
+            self.pipeline._train_X.shape[0], int(0.8 * self.ds_size)
         )
         self.assertEqual(
-            self.pipeline._test_X[0].shape[0],
+            self.pipeline._test_X.shape[0],
             self.ds_size - int(0.8 * self.ds_size),
         )
 
@@ -87,3 +103,341 @@ class TestPipeline(unittest.TestCase):
         self.assertIsNotNone(self.pipeline._train_predictions)
         self.assertIsNotNone(self.pipeline._metrics_results)
         self.assertEqual(len(self.pipeline._metrics_results), 1)
+
+
+class TestStreamingPipeline(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dataset = Dataset.from_dataframe(
+            pd.read_csv("test_assets/adult.csv"),
+            name="adult",
+            asset_path="adult.csv",
+        )
+        self.input_features = [
+            Feature(name="education.num", type="numerical"),
+            Feature(name="hours.per.week", type="numerical"),
+            Feature(name="sex", type="categorical"),
+        ]
+
+    def test_execute_streaming(self):
+        pipeline = Pipeline(
+            dataset=self.dataset,
+            model=WrapSGDRegressor(hyper_parameters={"random_state": 0}),
+            input_features=self.input_features,
+            target_feature=Feature(name="age", type="numerical"),
+            metrics=[MeanSquaredError()],
+            split=0.8,
+        )
+        results = pipeline.execute_streaming(chunk_size=1000)
+        self.assertEqual(len(results["metrics"]), 1)
+        self.assertLess(results["metrics"][0][1], 1.0)  # Scaled target
+        self.assertEqual(len(pipeline._artifacts), 4)
+
+    def test_execute_streaming_needs_partial_fit(self):
+        pipeline = Pipeline(
+            dataset=self.dataset,
+            model=MultipleLinearRegression(),
+            input_features=self.input_features,
+            target_feature=Feature(name="age", type="numerical"),
+            metrics=[MeanSquaredError()],
+        )
+        with self.assertRaises(ValueError):
+            pipeline.execute_streaming()
+
+
+class FailingModel(Model):
+    def __init__(self):
+        super().__init__(type="regression")
+
+    def fit(self, X, y):
+        raise RuntimeError("does not converge")
+
+    def predict(self, X):
+        pass
+
+
+class TestModelRace(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.pipeline = Pipeline(
+            dataset=Dataset.from_dataframe(
+                pd.read_csv("test_assets/adult.csv").head(5000),
+                name="adult",
+                asset_path="adult.csv",
+            ),
+            model=MultipleLinearRegression(),
+            input_features=[
+                Feature(name="education.num", type="numerical"),
+                Feature(name="hours.per.week", type="numerical"),
+                Feature(name="sex", type="categorical"),
+            ],
+            target_feature=Feature(name="age", type="numerical"),
+            metrics=[MeanSquaredError()],
+            split=0.8,
+        )
+
+    def test_leaderboard(self):
+        models = [
+            WrapElasticNet(),
+            FailingModel(),
+            MultipleLinearRegression(),
+            WrapSGDRegressor(hyper_parameters={"random_state": 0}),
+        ]
+        leaderboard = self.pipeline.race(models, max_workers=2)
+        self.assertEqual(len(leaderboard), 4)
+        self.assertIn("does not converge", leaderboard[-1]["error"])
+        errors = [
+            entry["metrics"][0][1] for entry in leaderboard[:-1]
+        ]  # Mean squared error, lower is better
+        self.assertEqual(errors, sorted(errors))
+        self.assertIsInstance(leaderboard[0]["metrics"][0][0], MeanSquaredError)
+
+        # Same result as executing the pipeline with the model itself
+        best = leaderboard[0]["model"]
+        pipeline = Pipeline(
+            dataset=self.pipeline._dataset,
+            model=type(best)(hyper_parameters=best.hyper_parameters),
+            input_features=self.pipeline._input_features,
+            target_feature=self.pipeline._target_feature,
+            metrics=[MeanSquaredError()],
+            split=0.8,
+        )
+        results = pipeline.execute()
+        self.assertAlmostEqual(
+            results["metrics"][0][1], leaderboard[0]["metrics"][0][1]
+        )
+
+    def test_race_checks_model_type(self):
+        with self.assertRaises(ValueError):
+            self.pipeline.race([WrapRandomForest()])
+
+
+class TestCrossValidation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # Sorted by class, such that unstratified consecutive folds miss
+        # classes
+        df = pd.read_csv("test_assets/iris.csv").sort_values("species")
+        self.dataset = Dataset.from_dataframe(
+            df, name="iris", asset_path="iris.csv"
+        )
+        self.input_features = [
+            Feature(name=name, type="numerical")
+            for name in ["sepal_length", "sepal_width",
+                         "petal_length", "petal_width"]
+        ]
+
+    def test_stratified_k_fold(self):
+        pipeline = Pipeline(
+            dataset=self.dataset,
+            model=WrapRandomForest(hyper_parameters={"random_state": 0}),
+            input_features=self.input_features,
+            target_feature=Feature(name="species", type="categorical"),
+            metrics=[Accuracy()],
+        )
+        results = pipeline.cross_validate(
+            n_folds=5, n_repeats=2, random_state=0, max_workers=2
+        )
+        self.assertEqual(len(results["folds"]), 10)
+        self.assertEqual(
+            [(fold["repeat"], fold["fold"]) for fold in results["folds"]],
+            [(repeat, fold) for repeat in range(2) for fold in range(5)],
+        )
+        metric, mean, std = results["metrics"][0]
+        self.assertIsInstance(metric, Accuracy)
+        self.assertGreater(mean, 0.9)
+        accuracies = [fold["metrics"][0][1] for fold in results["folds"]]
+        self.assertAlmostEqual(mean, sum(accuracies) / 10)
+
+    def test_stratified_split(self):
+        pipeline = Pipeline(
+            dataset=self.dataset,
+            model=WrapRandomForest(hyper_parameters={"random_state": 0}),
+            input_features=self.input_features,
+            target_feature=Feature(name="species", type="categorical"),
+            metrics=[Accuracy()],
+            split_strategy="stratified",
+            random_state=0,
+        )
+        pipeline.preprocess_features()
+        pipeline._split_data()
+        # Every species is in both sets, although the rows are sorted
+        self.assertEqual(pipeline._train_X.shape[0], 120)
+        self.assertTrue((pipeline._train_y.sum(axis=0) == 40).all())
+        self.assertTrue((pipeline._test_y.sum(axis=0) == 10).all())
+        self.assertGreater(pipeline.execute()["metrics"][0][1], 0.9)
+
+    def test_stratified_split_needs_categories(self):
+        with self.assertRaises(ValueError):
+            Pipeline(
+                dataset=self.dataset,
+                model=MultipleLinearRegression(),
+                input_features=self.input_features[1:],
+                target_feature=self.input_features[0],
+                metrics=[MeanSquaredError()],
+                split_strategy="stratified",
+            )
+
+    def test_k_fold_regression(self):
+        pipeline = Pipeline(
+            dataset=self.dataset,
+            model=MultipleLinearRegression(),
+            input_features=self.input_features[1:],
+            target_feature=self.input_features[0],
+            metrics=[MeanSquaredError()],
+        )
+        results = pipeline.cross_validate(n_folds=3, max_workers=2)
+        self.assertEqual(len(results["folds"]), 3)
+        self.assertTrue(all(
+            fold["error"] is None for fold in results["folds"]
+        ))
+        self.assertLess(results["metrics"][0][1], 0.5)  # Scaled target
+
+
+class TestTrainEvaluation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dataset = Dataset.from_dataframe(
+            pd.read_csv("test_assets/iris.csv"),
+            name="iris",
+            asset_path="iris.csv",
+        )
+
+    def pipeline(self, **kwargs) -> Pipeline:
+        return Pipeline(
+            dataset=self.dataset,
+            model=WrapRandomForest(hyper_parameters={"random_state": 0}),
+            input_features=[
+                Feature(name="sepal_length", type="numerical"),
+                Feature(name="petal_length", type="numerical"),
+            ],
+            target_feature=Feature(name="species", type="categorical"),
+            metrics=[Accuracy()],
+            split_strategy="shuffled",
+            random_state=0,
+            **kwargs,
+        )
+
+    def test_skip_train_evaluation(self):
+        pipeline = self.pipeline(train_evaluation=0)
+        with patch.object(
+            pipeline.model, "predict", wraps=pipeline.model.predict
+        ) as predict:
+            results = pipeline.execute()
+        self.assertIsNone(results["train_predictions"])
+        self.assertEqual(len(results["test_predictions"]), 30)
+        self.assertEqual(predict.call_count, 1)
+
+    def test_subsample_train_evaluation(self):
+        results = self.pipeline(train_evaluation=0.25).execute()
+        self.assertEqual(len(results["train_predictions"]), 30)
+
+    def test_invalid_train_evaluation(self):
+        with self.assertRaises(ValueError):
+            self.pipeline(train_evaluation=1.5)
+
+    def test_cached(self):
+        pipeline = self.pipeline()
+        with patch(
+            "autoop.core.ml.pipeline.preprocess_dataset",
+            wraps=preprocess_dataset,
+        ) as preprocess, patch.object(
+            pipeline.model, "predict", wraps=pipeline.model.predict
+        ) as predict:
+            first = pipeline.execute()
+            pipeline._evaluate()  # Same model, so no new predictions
+            self.assertEqual(predict.call_count, 2)
+            second = pipeline.execute()  # Trains again, same matrices
+            self.assertEqual(predict.call_count, 4)
+            self.assertEqual(preprocess.call_count, 1)
+            self.dataset.save(pd.read_csv("test_assets/iris.csv").head(50))
+            pipeline.execute()
+            self.assertEqual(preprocess.call_count, 2)
+        self.assertEqual(first["metrics"], second["metrics"])
+
+    def test_cached_without_loading_data(self):
+        storage = LocalStorage(tempfile.mkdtemp())
+        storage.save(self.dataset.data, "iris")
+        self.dataset = Dataset(
+            name="iris",
+            asset_path="iris",
+            loader=partial(storage.load, "iris"),
+            view_loader=partial(storage.load_view, "iris"),
+        )
+        pipeline = self.pipeline()
+        with patch(
+            "autoop.core.ml.pipeline.preprocess_dataset",
+            wraps=preprocess_dataset,
+        ) as preprocess:
+            pipeline.execute()
+            pipeline.execute()
+            self.assertEqual(preprocess.call_count, 1)
+        # The data was only read through memory maps
+        self.assertFalse(self.dataset.is_loaded)
+
+
+class TestSplitResults(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dataset = Dataset.from_dataframe(
+            pd.read_csv("test_assets/iris.csv"),
+            name="iris",
+            asset_path="iris.csv",
+        )
+
+    def test_regression(self):
+        pipeline = Pipeline(
+            dataset=self.dataset,
+            model=MultipleLinearRegression(),
+            input_features=[Feature(name="sepal_width", type="numerical")],
+            target_feature=Feature(name="petal_length", type="numerical"),
+            metrics=[RSquared(), MeanSquaredError()],
+            split_strategy="shuffled",
+            random_state=0,
+        )
+        results = pipeline.execute()
+        self.assertEqual(set(results["splits"]), {"test", "train"})
+        self.assertEqual(results["splits"]["test"]["n_rows"], 30)
+        for split, y in (("test", pipeline._test_y),
+                         ("train", pipeline._train_y)):
+            predictions = results["splits"][split]["predictions"]
+            # R squared is relative to the variance of the ground truth
+            self.assertAlmostEqual(
+                results["splits"][split]["metrics"][0][1],
+                r2_score(y, predictions),
+            )
+        self.assertIs(results["metrics"], results["splits"]["test"]["metrics"])
+        self.assertIs(
+            results["train_metrics"], results["splits"]["train"]["metrics"]
+        )
+        self.assertNotEqual(results["metrics"], results["train_metrics"])
+        self.assertEqual(
+            set(results["timings"]),
+            {"prepare", "train", "evaluate test", "evaluate train"},
+        )
+
+    def test_classification(self):
+        pipeline = Pipeline(
+            dataset=self.dataset,
+            model=WrapGaussianNaiveBayes(),
+            input_features=[Feature(name="sepal_width", type="numerical")],
+            target_feature=Feature(name="species", type="categorical"),
+            metrics=[Precision(), Recall()],
+            split_strategy="stratified",
+            random_state=0,
+            train_evaluation=0,
+        )
+        results = pipeline.execute()
+        self.assertEqual(set(results["splits"]), {"test"})
+        self.assertIsNone(results["train_metrics"])
+        ground_truth = pipeline._test_y.argmax(axis=1)
+        predictions = results["test_predictions"].argmax(axis=1)
+        labels = np.unique(predictions)
+        (_, precision), (_, recall) = results["metrics"]
+        self.assertAlmostEqual(precision, precision_score(
+            ground_truth, predictions, labels=labels, average="macro"
+        ))
+        self.assertAlmostEqual(recall, recall_score(
+            ground_truth, predictions, labels=np.unique(ground_truth),
+            average="macro",
+        ))
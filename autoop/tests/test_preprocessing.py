@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from autoop.core.ml.dataset import Dataset
+from autoop.core.ml.feature import Feature
+from autoop.functional.preprocessing import (
+    preprocess_dataset,
+    preprocess_features,
+)
+
+
+class TestPreprocessing(unittest.TestCase):
+    def setUp(self):
+        self.dataset = Dataset.from_dataframe(
+            pd.read_csv("test_assets/adult.csv"),
+            name="adult",
+            asset_path="adult.csv",
+        )
+        self.input_features = [
+            Feature(type="numerical", name="hours.per.week"),
+            Feature(type="categorical", name="sex"),
+            Feature(type="numerical", name="age"),
+            Feature(type="categorical", name="race"),
+        ]
+        self.target_feature = Feature(type="categorical", name="income")
+
+    def test_same_encoding_as_per_feature(self):
+        X, y, artifacts = preprocess_dataset(
+            self.input_features, self.target_feature, self.dataset
+        )
+        per_feature = preprocess_features(self.input_features, self.dataset)
+        expected_X = np.concatenate([data for _, data, _ in per_feature], 1)
+        expected_y = preprocess_features([self.target_feature], self.dataset)
+        np.testing.assert_allclose(X, expected_X)
+        np.testing.assert_allclose(y, expected_y[0][1])
+        self.assertEqual(len(artifacts), len(self.input_features) + 1)
+        self.assertEqual(X.shape[0], y.shape[0])
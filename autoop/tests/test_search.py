@@ -0,0 +1,153 @@
+import pickle
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy.stats import loguniform
+
+from autoop.core.ml.dataset import Dataset
+from autoop.core.ml.feature import Feature
+from autoop.core.ml.metric import Accuracy, MeanSquaredError
+from autoop.core.ml.model import (
+    MultipleLinearRegression,
+    WrapElasticNet,
+    WrapRandomForest,
+    WrapSGDClassifier,
+)
+from autoop.core.ml.pipeline import Pipeline
+from autoop.core.ml.search import GridSearch, RandomSearch, SuccessiveHalving
+
+
+class TestHyperparameterSearch(unittest.TestCase):
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame(rng.normal(size=(3000, 2)), columns=["a", "b"])
+        df["y"] = 2 * df["a"] - df["b"] + rng.normal(scale=0.5, size=3000)
+        self.pipeline = Pipeline(
+            dataset=Dataset.from_dataframe(
+                df, name="linear", asset_path="linear"
+            ),
+            model=MultipleLinearRegression(),
+            input_features=[
+                Feature(name="a", type="numerical"),
+                Feature(name="b", type="numerical"),
+            ],
+            target_feature=Feature(name="y", type="numerical"),
+            metrics=[MeanSquaredError()],
+            split=0.8,
+        )
+
+    def test_grid_search(self):
+        search = GridSearch(
+            WrapElasticNet, {"alpha": [10.0, 0.01, -1.0]}, max_workers=2
+        )
+        trials = search.run(self.pipeline)
+        self.assertEqual(len(trials), 3)
+        self.assertEqual(search.best["hyper_parameters"], {"alpha": 0.01})
+        self.assertEqual(trials[0], search.best)
+        self.assertIsNotNone(trials[-1]["error"])  # Negative alpha
+
+    def test_random_search(self):
+        search = RandomSearch(
+            WrapElasticNet,
+            {"alpha": loguniform(1e-3, 10), "l1_ratio": [0.1, 0.5, 0.9]},
+            n_candidates=4,
+            random_state=0,
+            max_workers=2,
+        )
+        trials = search.run(self.pipeline)
+        self.assertEqual(len(trials), 4)
+        self.assertEqual(
+            [trial["hyper_parameters"] for trial in search._trials],
+            search.candidates(),  # Seeded
+        )
+
+    def test_successive_halving(self):
+        search = SuccessiveHalving(
+            WrapElasticNet,
+            {"alpha": [0.001, 0.01, 0.1, 1.0, 10.0],
+             "l1_ratio": [0.2, 0.8]},
+            factor=3,
+            max_workers=2,
+        )
+        trials = search.run(self.pipeline)
+        # A fifth of the 2400 train rows is held out for validation
+        self.assertEqual(self.pipeline.fit_size, 1920)
+        first = search.first_budget(10, self.pipeline.fit_size)
+        # 10 candidates on few rows, then the best 4 and the best 2 on
+        # three times more rows each round, and the last one on all rows
+        self.assertEqual(
+            [(trial["round"], trial["n_train"]) for trial in search._trials],
+            [(0, first)] * 10 + [(1, 3 * first)] * 4
+            + [(2, 9 * first)] * 2 + [(3, None)],
+        )
+        self.assertEqual(trials[0], search.best)
+        self.assertIsNone(search.best["n_train"])
+        self.assertLessEqual(search.best["hyper_parameters"]["alpha"], 0.01)
+
+    def test_rounds_on_sorted_classes(self):
+        # Sorted by class like iris: a prefix of the rows has one class
+        df = pd.read_csv("test_assets/iris.csv")
+        pipeline = Pipeline(
+            dataset=Dataset.from_dataframe(df, name="iris", asset_path="i"),
+            model=WrapSGDClassifier(),
+            input_features=[
+                Feature(name=name, type="numerical")
+                for name in df.columns[:4]
+            ],
+            target_feature=Feature(name="species", type="categorical"),
+            metrics=[Accuracy()],
+            split=0.8,
+            split_strategy="stratified",
+            random_state=0,
+        )
+        search = SuccessiveHalving(
+            WrapSGDClassifier,
+            {"alpha": [1e-4, 1e-3, 1e-2], "random_state": [0]},
+            random_state=0,
+            max_workers=2,
+        )
+        trials = search.run(pipeline)
+        # The first round fits on a third of the train rows
+        self.assertEqual(trials[-1]["round"], 0)
+        self.assertEqual(trials[-1]["n_train"], 32)
+        for trial in trials:
+            self.assertIsNone(trial["error"])
+            self.assertGreater(trial["metrics"][0][1], 0.5)
+
+    def test_ranks_on_validation_rows(self):
+        search = GridSearch(
+            WrapElasticNet, {"alpha": [0.01]}, validation=0.25,
+            random_state=0,
+        )
+        trial = search.run(self.pipeline)[0]
+        self.assertEqual(self.pipeline.fit_size, 1800)
+        # The same fit, scored on the held-out quarter of the train split
+        # instead of on the test split
+        order = np.random.default_rng(0).permutation(2400)
+        validation, fit = np.sort(order[:600]), np.sort(order[600:])
+        X, y = self.pipeline._train_X, self.pipeline._train_y
+        model = WrapElasticNet(hyper_parameters={"alpha": 0.01})
+        model.fit(X[fit], y[fit])
+        expected = MeanSquaredError()(
+            y[validation], model.predict(X[validation])
+        )
+        self.assertAlmostEqual(trial["metrics"][0][1], expected)
+        with self.assertRaises(ValueError):
+            GridSearch(WrapElasticNet, {"alpha": [0.01]}, validation=1.0)
+
+    def test_trial_artifacts(self):
+        search = GridSearch(WrapElasticNet, {"alpha": [0.1, 1.0]})
+        search.run(self.pipeline)
+        artifacts = search.get_artifacts("tuning")
+        self.assertEqual(len(artifacts), 2)
+        self.assertEqual(artifacts[0].type, "trial")
+        record = pickle.loads(artifacts[1].read())
+        self.assertEqual(record["hyper_parameters"], {"alpha": 1.0})
+        self.assertEqual(record["metrics"][0][0], "MeanSquaredError")
+
+    def test_model_type_checked(self):
+        search = GridSearch(WrapRandomForest, {"n_estimators": [10]})
+        with self.assertRaises(ValueError):
+            search.run(self.pipeline)
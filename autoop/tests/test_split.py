@@ -0,0 +1,92 @@
+import unittest
+
+import numpy as np
+
+from autoop.functional.split import (
+    k_fold,
+    stratified_k_fold,
+    stratified_permutation,
+    train_test_indices,
+)
+
+
+class TestSplit(unittest.TestCase):
+
+    def test_k_fold_partitions_rows(self):
+        for shuffle in (False, True):
+            folds = k_fold(103, 5, shuffle=shuffle, random_state=0)
+            self.assertEqual(len(folds), 5)
+            self.assertEqual([len(fold) for fold in folds],
+                             [21, 21, 21, 20, 20])
+            np.testing.assert_array_equal(
+                np.sort(np.concatenate(folds)), np.arange(103)
+            )
+
+    def test_k_fold_seeded(self):
+        first = k_fold(50, 3, random_state=1)
+        second = k_fold(50, 3, random_state=1)
+        for a, b in zip(first, second):
+            np.testing.assert_array_equal(a, b)
+        np.testing.assert_array_equal(k_fold(6, 3, shuffle=False)[1], [2, 3])
+
+    def test_stratified_k_fold(self):
+        # Sorted by class, as csv files often are
+        labels = np.repeat([0, 1, 2], [60, 30, 10])
+        one_hot = np.eye(3)[labels]
+        folds = stratified_k_fold(one_hot, 5, random_state=0)
+        np.testing.assert_array_equal(
+            np.sort(np.concatenate(folds)), np.arange(100)
+        )
+        for fold in folds:
+            np.testing.assert_array_equal(
+                np.bincount(labels[fold], minlength=3), [12, 6, 2]
+            )
+
+    def test_invalid_number_of_folds(self):
+        with self.assertRaises(ValueError):
+            k_fold(10, 1)
+        with self.assertRaises(ValueError):
+            stratified_k_fold(np.arange(3), 4)
+
+    def test_sequential_split_is_a_view(self):
+        X = np.arange(20.0).reshape(10, 2)
+        train, test = train_test_indices(X, 0.8)
+        self.assertTrue(np.shares_memory(X[train], X))
+        self.assertEqual(len(X[train]), 8)
+        self.assertEqual(len(X[test]), 2)
+
+    def test_shuffled_split(self):
+        train, test = train_test_indices(np.zeros(100), 0.7, "shuffled", 0)
+        self.assertEqual(len(train), 70)
+        np.testing.assert_array_equal(
+            np.sort(np.concatenate([train, test])), np.arange(100)
+        )
+        again, _ = train_test_indices(np.zeros(100), 0.7, "shuffled", 0)
+        np.testing.assert_array_equal(train, again)
+        self.assertFalse(np.array_equal(train, np.arange(70)))
+
+    def test_stratified_split(self):
+        labels = np.repeat([0, 1, 2], [60, 30, 10])
+        train, test = train_test_indices(
+            np.eye(3)[labels], 0.8, "stratified", 0
+        )
+        np.testing.assert_array_equal(np.bincount(labels[train]), [48, 24, 8])
+        np.testing.assert_array_equal(np.bincount(labels[test]), [12, 6, 2])
+
+    def test_stratified_permutation(self):
+        labels = np.repeat([0, 1, 2], [60, 30, 10])
+        rows = stratified_permutation(np.eye(3)[labels], random_state=0)
+        np.testing.assert_array_equal(np.sort(rows), np.arange(100))
+        # Every prefix has about the fractions of the whole
+        for n_rows in (10, 20, 50):
+            counts = np.bincount(labels[rows[:n_rows]], minlength=3)
+            np.testing.assert_allclose(
+                counts, [0.6 * n_rows, 0.3 * n_rows, 0.1 * n_rows], atol=1
+            )
+        np.testing.assert_array_equal(
+            rows, stratified_permutation(labels, random_state=0)
+        )
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            train_test_indices(np.zeros(10), 0.8, "random")
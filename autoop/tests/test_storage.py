@@ -1,15 +1,32 @@
+import os
+import pickle
 import random
+import stat
 import tempfile
 import unittest
+from unittest.mock import patch
 
-from autoop.core.storage import LocalStorage, NotFoundError
+from autoop.core.compression import (
+    CODECS,
+    compress,
+    get_codec,
+    is_compressed,
+)
+from autoop.core.storage import (
+    BLOBS_PREFIX,
+    CompressedStorage,
+    ContentAddressedStorage,
+    LocalStorage,
+    REFS_PREFIX,
+    NotFoundError,
+)
 
 
 class TestStorage(unittest.TestCase):
 
     def setUp(self):
-        temp_dir = tempfile.mkdtemp()
-        self.storage = LocalStorage(temp_dir)
+        self.directory = tempfile.mkdtemp()
+        self.storage = LocalStorage(self.directory)
 
     def test_init(self):
         self.assertIsInstance(self.storage, LocalStorage)
@@ -47,3 +64,253 @@ class TestStorage(unittest.TestCase):
         keys = self.storage.list("test")
         keys = ["/".join(key.split("/")[-2:]) for key in keys]
         self.assertEqual(set(keys), set(random_keys))
+
+    def test_load_view(self):
+        self.storage.save(b"mapped data", "test/path")
+        view = self.storage.load_view("test/path")
+        self.assertEqual(bytes(view), b"mapped data")
+        self.assertTrue(view.readonly)
+        # Saving writes a new file, the old mapping stays valid
+        self.storage.save(b"new", "test/path")
+        self.assertEqual(bytes(view), b"mapped data")
+        self.assertEqual(bytes(self.storage.load_view("test/path")), b"new")
+        self.storage.save(b"", "test/empty")
+        self.assertEqual(bytes(self.storage.load_view("test/empty")), b"")
+        with self.assertRaises(NotFoundError):
+            self.storage.load_view("test/otherpath")
+
+    def test_list_returns_loadable_keys(self):
+        self.storage.save(b"data", "test/nested/path")
+        self.assertEqual(self.storage.list("test"), ["test/nested/path"])
+        self.assertEqual(self.storage.load("test/nested/path"), b"data")
+
+    def test_open_writer_and_reader(self):
+        with self.storage.open_writer("test/path") as writer:
+            writer.write(b"first ")
+            writer.write(b"second")
+        with self.storage.open_reader("test/path") as reader:
+            self.assertEqual(reader.read(5), b"first")
+            self.assertEqual(reader.read(), b" second")
+        self.storage.save_chunks([b"a" * 10, b"b" * 10], "test/chunks")
+        self.assertEqual(
+            list(self.storage.load_chunks("test/chunks", chunk_size=15)),
+            [b"a" * 10 + b"b" * 5, b"b" * 5],
+        )
+        with self.assertRaises(NotFoundError):
+            self.storage.open_reader("test/otherpath")
+
+    def test_written_files_have_default_permissions(self):
+        self.storage.save(b"data", "test/saved")
+        with open(os.path.join(self.directory, "plain"), "wb") as file:
+            file.write(b"data")
+        expected = os.stat(os.path.join(self.directory, "plain")).st_mode
+        saved = os.stat(os.path.join(self.directory, "test", "saved"))
+        self.assertEqual(stat.S_IMODE(saved.st_mode), stat.S_IMODE(expected))
+
+    def test_failed_write_keeps_old_data(self):
+        self.storage.save(b"old", "test/path")
+        with self.assertRaises(ValueError):
+            with self.storage.open_writer("test/path") as writer:
+                writer.write(b"half of the new data")
+                raise ValueError()
+        self.assertEqual(self.storage.load("test/path"), b"old")
+        # No temporary files are left behind
+        self.assertEqual(self.storage.list("test"), ["test/path"])
+
+
+class TestContentAddressedStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.local = LocalStorage(tempfile.mkdtemp())
+        self.storage = ContentAddressedStorage(self.local)
+
+    def blobs(self):
+        try:
+            return self.local.list(BLOBS_PREFIX)
+        except NotFoundError:
+            return []
+
+    def test_deduplicates(self):
+        self.storage.save(b"same data", "datasets/a")
+        self.storage.save(b"same data", "datasets/b")
+        self.storage.save(b"other data", "datasets/c")
+        self.assertEqual(len(self.blobs()), 2)
+        self.assertEqual(self.storage.load("datasets/b"), b"same data")
+        self.assertEqual(self.storage.load("datasets/c"), b"other data")
+        digest = self.storage.digest("datasets/a")
+        self.assertEqual(digest, self.storage.digest("datasets/b"))
+        self.assertEqual(self.storage.references(digest), 2)
+        self.assertEqual(
+            self.storage.list("datasets"),
+            ["datasets/a", "datasets/b", "datasets/c"],
+        )
+
+    def test_saving_same_data_writes_nothing(self):
+        self.storage.save(b"data", "key")
+        with patch.object(self.local, "save") as save:
+            self.storage.save(b"data", "key")
+            save.assert_not_called()
+            self.storage.save(b"data", "other key")
+            # Only the pointer of the new key
+            self.assertEqual(save.call_count, 1)
+
+    def test_delete_keeps_shared_blob(self):
+        self.storage.save(b"data", "a")
+        self.storage.save(b"data", "b")
+        self.storage.delete("a")
+        self.assertEqual(self.storage.load("b"), b"data")
+        with self.assertRaises(NotFoundError):
+            self.storage.load("a")
+        self.storage.delete("b")
+        self.assertEqual(self.blobs(), [])
+
+    def test_overwrite_releases_old_blob(self):
+        self.storage.save(b"old", "key")
+        self.storage.save(b"new", "key")
+        self.assertEqual(self.storage.load("key"), b"new")
+        self.assertEqual(len(self.blobs()), 1)
+
+    def test_references_survive_reopening(self):
+        self.storage.save(b"data", "a")
+        self.storage.save(b"data", "b")
+        reopened = ContentAddressedStorage(self.local)
+        self.assertEqual(reopened.list(""), ["a", "b"])
+        reopened.delete("a")
+        self.assertEqual(reopened.load("b"), b"data")
+
+    def test_reads_data_stored_before_wrapping(self):
+        self.local.save(b"legacy", "datasets/legacy")
+        self.assertEqual(self.storage.load("datasets/legacy"), b"legacy")
+        self.assertEqual(self.storage.list("datasets"), ["datasets/legacy"])
+        self.storage.delete("datasets/legacy")
+        with self.assertRaises(NotFoundError):
+            self.storage.load("datasets/legacy")
+
+    def test_saving_over_data_stored_before_wrapping(self):
+        self.local.save(b"legacy", "datasets/iris.csv")
+        self.storage.save(b"new", "datasets/iris.csv")
+        self.assertEqual(self.storage.list("datasets"), ["datasets/iris.csv"])
+        self.assertEqual(self.storage.load("datasets/iris.csv"), b"new")
+        self.storage.delete("datasets/iris.csv")
+        with self.assertRaises(NotFoundError):
+            self.storage.load("datasets/iris.csv")
+        self.assertEqual(self.storage.list("datasets"), [])
+
+    def test_delete_removes_left_behind_data(self):
+        # As if the process stopped between writing a pointer and removing
+        # the data stored before wrapping
+        self.storage.save(b"new", "key")
+        self.local.save(b"legacy", "key")
+        self.assertEqual(self.storage.list(""), ["key"])
+        self.storage.delete("key")
+        with self.assertRaises(NotFoundError):
+            self.storage.load("key")
+
+    def test_load_view(self):
+        self.storage.save(b"data", "a")
+        self.local.save(b"legacy", "b")
+        self.assertEqual(bytes(self.storage.load_view("a")), b"data")
+        self.assertEqual(bytes(self.storage.load_view("b")), b"legacy")
+
+    def test_open_writer_deduplicates(self):
+        self.storage.save(b"data" * 1000, "a")
+        with patch.object(self.local, "open_writer") as open_writer:
+            with self.storage.open_writer("b") as writer:
+                for _ in range(1000):
+                    writer.write(b"data")
+            # Only the pointer of the new key
+            open_writer.assert_called_once_with(f"{REFS_PREFIX}/b")
+        with self.storage.open_writer("c") as writer:
+            writer.write(b"other data")
+        self.assertEqual(len(self.blobs()), 2)
+        self.assertEqual(self.storage.load("b"), b"data" * 1000)
+        with self.storage.open_reader("c") as reader:
+            self.assertEqual(reader.read(), b"other data")
+
+    def test_collect_garbage(self):
+        self.storage.save(b"kept", "key")
+        self.local.save(b"orphan", f"{BLOBS_PREFIX}/ab/cdef")
+        self.assertEqual(self.storage.collect_garbage(), 1)
+        self.assertEqual(len(self.blobs()), 1)
+        self.assertEqual(self.storage.load("key"), b"kept")
+
+
+class TestCompressedStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.local = LocalStorage(tempfile.mkdtemp())
+        self.storage = CompressedStorage(self.local)
+
+    def test_round_trip_compresses(self):
+        data = b"a,b\n1,2\n" * 10000
+        self.storage.save(data, "datasets/csv")
+        self.assertEqual(self.storage.load("datasets/csv"), data)
+        stored = self.local.load("datasets/csv")
+        self.assertTrue(is_compressed(stored))
+        self.assertLess(len(stored), len(data) / 5)
+        self.assertEqual(self.storage.list("datasets"), ["datasets/csv"])
+
+    def test_codec_per_kind(self):
+        storage = CompressedStorage(
+            self.local, codecs={"text": None, "pickle": "lzma"}
+        )
+        text = b"a,b\n1,2\n" * 10000
+        model = pickle.dumps(list(range(10000)))
+        storage.save(text, "text")
+        storage.save(model, "model")
+        self.assertEqual(self.local.load("text"), text)
+        self.assertEqual(self.local.load("model")[4], CODECS["lzma"].id)
+        self.assertEqual(storage.load("model"), model)
+
+    def test_small_and_incompressible_data_is_stored_as_is(self):
+        noise = random_bytes(4096)
+        self.storage.save(b"small", "small")
+        self.storage.save(noise, "noise")
+        self.assertEqual(self.local.load("small"), b"small")
+        self.assertEqual(self.local.load("noise"), noise)
+
+    def test_data_that_looks_compressed(self):
+        data = compress(b"x" * 5000, get_codec("zlib"))
+        self.storage.save(data, "key")
+        self.assertEqual(self.storage.load("key"), data)
+
+    def test_load_view(self):
+        data = b"a,b\n1,2\n" * 10000
+        self.storage.save(data, "compressed")
+        self.storage.save(b"small", "small")
+        self.assertEqual(bytes(self.storage.load_view("compressed")), data)
+        view = self.storage.load_view("small")
+        self.assertEqual(bytes(view), b"small")
+        self.assertTrue(view.readonly)
+
+    def test_reads_uncompressed_data(self):
+        self.local.save(b"a,b\n1,2\n" * 1000, "legacy")
+        self.assertEqual(self.storage.load("legacy"), b"a,b\n1,2\n" * 1000)
+        with self.storage.open_reader("legacy") as reader:
+            self.assertEqual(reader.read(4), b"a,b\n")
+            self.assertEqual(len(reader.read()), 8 * 1000 - 4)
+
+    def test_stream_round_trip(self):
+        storage = CompressedStorage(self.local, chunk_size=1000)
+        chunks = [b"a,b\n1,2\n" * 100 for _ in range(50)]
+        storage.save_chunks(chunks, "datasets/csv")
+        self.assertTrue(is_compressed(self.local.load("datasets/csv")))
+        self.assertEqual(storage.load("datasets/csv"), b"".join(chunks))
+        self.assertEqual(
+            b"".join(storage.load_chunks("datasets/csv", chunk_size=64)),
+            b"".join(chunks),
+        )
+        # Streams shorter than the minimum size are stored as is
+        storage.save_chunks([b"small"], "small")
+        self.assertEqual(self.local.load("small"), b"small")
+        with storage.open_reader("small") as reader:
+            self.assertEqual(reader.read(), b"small")
+
+    def test_append(self):
+        self.storage.append(b"line\n" * 300, "journal")
+        self.storage.append(b"line\n" * 300, "journal")
+        self.assertEqual(self.storage.load("journal"), b"line\n" * 600)
+
+
+def random_bytes(size: int) -> bytes:
+    return bytes(random.getrandbits(8) for _ in range(size))